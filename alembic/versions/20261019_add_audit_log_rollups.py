@@ -0,0 +1,42 @@
+"""Add audit log hourly and daily statistics rollups
+
+Revision ID: 20261019_audit_log_rollups
+Revises: 20261019_partition_audit_logs
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_audit_log_rollups'
+down_revision = '20261019_partition_audit_logs'
+branch_labels = None
+depends_on = None
+
+
+ROLLUP_TABLES = ('audit_log_hourly_stats', 'audit_log_daily_stats')
+
+
+def upgrade() -> None:
+    for table in ROLLUP_TABLES:
+        op.create_table(
+            table,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('bucket', sa.DateTime(), nullable=False),
+            sa.Column('action', sa.String(), nullable=False),
+            sa.Column('resource_type', sa.String(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('username', sa.String(), nullable=False),
+            sa.Column('entity_id', sa.Integer(), nullable=True),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(f'ix_{table}_bucket', table, ['bucket'])
+
+
+def downgrade() -> None:
+    for table in reversed(ROLLUP_TABLES):
+        op.drop_index(f'ix_{table}_bucket', table_name=table)
+        op.drop_table(table)
@@ -0,0 +1,58 @@
+"""Add email thread index (Message-ID to ticket)
+
+Revision ID: 20261019_email_thread_index
+Revises: 20261019_imap_uid_state
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_email_thread_index'
+down_revision = '20261019_imap_uid_state'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'email_thread_index',
+        sa.Column('message_id', sa.String(), nullable=False),
+        sa.Column('ticket_id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['ticket_id'], ['tickets.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('message_id')
+    )
+    op.create_index('ix_email_thread_index_ticket_id', 'email_thread_index', ['ticket_id'])
+
+    # Backfill from notifications sent, emails that created tickets and email replies
+    op.execute("""
+        INSERT INTO email_thread_index (message_id, ticket_id, source, created_at)
+        SELECT DISTINCT ON (message_id) message_id, ticket_id, 'sent', created_at
+        FROM sent_emails
+        WHERE ticket_id IS NOT NULL AND status = 'sent'
+        ORDER BY message_id, created_at
+        ON CONFLICT (message_id) DO NOTHING
+    """)
+    op.execute("""
+        INSERT INTO email_thread_index (message_id, ticket_id, source, created_at)
+        SELECT email_message_id, id, 'received', created_at
+        FROM tickets
+        WHERE email_message_id IS NOT NULL
+        ON CONFLICT (message_id) DO NOTHING
+    """)
+    op.execute("""
+        INSERT INTO email_thread_index (message_id, ticket_id, source, created_at)
+        SELECT email_message_id, ticket_id, 'received', created_at
+        FROM ticket_comments
+        WHERE email_message_id IS NOT NULL
+        ON CONFLICT (message_id) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_email_thread_index_ticket_id', table_name='email_thread_index')
+    op.drop_table('email_thread_index')
@@ -0,0 +1,51 @@
+"""Add export_jobs table for background exports
+
+Revision ID: 20261019_export_jobs
+Revises: 2dc7de557a1c
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_export_jobs'
+down_revision = '2dc7de557a1c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'export_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.String(), nullable=True),
+        sa.Column('export_type', sa.String(), nullable=False),
+        sa.Column('format', sa.String(), nullable=False, server_default='csv'),
+        sa.Column('filters', JSONB(), nullable=True),
+        sa.Column('status', sa.String(), server_default='pending'),
+        sa.Column('filename', sa.String(), nullable=True),
+        sa.Column('row_count', sa.Integer(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('requested_by_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['requested_by_id'], ['users.id'], ondelete='CASCADE')
+    )
+    op.create_index('ix_export_jobs_id', 'export_jobs', ['id'])
+    op.create_index('ix_export_jobs_status', 'export_jobs', ['status'])
+    op.create_index('ix_export_jobs_requested_by_id', 'export_jobs', ['requested_by_id'])
+    op.create_index('ix_export_jobs_expires_at', 'export_jobs', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_export_jobs_expires_at', table_name='export_jobs')
+    op.drop_index('ix_export_jobs_requested_by_id', table_name='export_jobs')
+    op.drop_index('ix_export_jobs_status', table_name='export_jobs')
+    op.drop_index('ix_export_jobs_id', table_name='export_jobs')
+    op.drop_table('export_jobs')
@@ -0,0 +1,26 @@
+"""Add IMAP UID sync state to email configurations
+
+Revision ID: 20261019_imap_uid_state
+Revises: 20261019_m365_delta_link
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_imap_uid_state'
+down_revision = '20261019_m365_delta_link'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('email_configurations', sa.Column('imap_uid_validity', sa.BigInteger(), nullable=True))
+    op.add_column('email_configurations', sa.Column('imap_last_uid', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('email_configurations', 'imap_last_uid')
+    op.drop_column('email_configurations', 'imap_uid_validity')
@@ -0,0 +1,24 @@
+"""Add Microsoft 365 delta link to email configurations
+
+Revision ID: 20261019_m365_delta_link
+Revises: 20261019_webhook_delivery_ctl
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_m365_delta_link'
+down_revision = '20261019_webhook_delivery_ctl'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('email_configurations', sa.Column('m365_delta_link', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('email_configurations', 'm365_delta_link')
@@ -0,0 +1,29 @@
+"""Add per-subnet scan engine and probe ports
+
+Revision ID: 20261019_subnet_scan_engine
+Revises: 20261019_subnet_scan_upsert
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_subnet_scan_engine'
+down_revision = '20261019_subnet_scan_upsert'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'subnets',
+        sa.Column('scan_engine', sa.String(20), nullable=False, server_default='nmap')
+    )
+    op.add_column('subnets', sa.Column('scan_ports', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('subnets', 'scan_ports')
+    op.drop_column('subnets', 'scan_engine')
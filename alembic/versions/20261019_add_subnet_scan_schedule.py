@@ -0,0 +1,50 @@
+"""Add subnet scan schedules and the IP address change log
+
+Revision ID: 20261019_subnet_scan_schedule
+Revises: 20261019_subnet_scan_engine
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_subnet_scan_schedule'
+down_revision = '20261019_subnet_scan_engine'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('subnets', sa.Column('scan_interval_minutes', sa.Integer(), nullable=True))
+    op.add_column('subnets', sa.Column('rescan_after_minutes', sa.Integer(), nullable=True))
+    op.add_column('subnets', sa.Column('scan_rescan_cutoff', sa.DateTime(), nullable=True))
+
+    op.create_table(
+        'ip_address_changes',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column(
+            'subnet_id', sa.Integer(),
+            sa.ForeignKey('subnets.id', ondelete='CASCADE'), nullable=False
+        ),
+        sa.Column('address', postgresql.INET(), nullable=False),
+        sa.Column('change_type', sa.String(20), nullable=False),
+        sa.Column('old_value', sa.String(), nullable=True),
+        sa.Column('new_value', sa.String(), nullable=True),
+        sa.Column('detected_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        'ix_ip_address_changes_subnet_detected', 'ip_address_changes', ['subnet_id', 'detected_at']
+    )
+    op.create_index('ix_ip_address_changes_change_type', 'ip_address_changes', ['change_type'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ip_address_changes_change_type', table_name='ip_address_changes')
+    op.drop_index('ix_ip_address_changes_subnet_detected', table_name='ip_address_changes')
+    op.drop_table('ip_address_changes')
+    op.drop_column('subnets', 'scan_rescan_cutoff')
+    op.drop_column('subnets', 'rescan_after_minutes')
+    op.drop_column('subnets', 'scan_interval_minutes')
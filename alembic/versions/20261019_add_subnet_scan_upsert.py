@@ -0,0 +1,30 @@
+"""Add subnet/address unique constraint and subnet scan checkpoints
+
+Revision ID: 20261019_subnet_scan_upsert
+Revises: 20261019_email_thread_index
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_subnet_scan_upsert'
+down_revision = '20261019_email_thread_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_unique_constraint(
+        'uq_ip_addresses_subnet_address', 'ip_addresses', ['subnet_id', 'address']
+    )
+    op.add_column('subnets', sa.Column('scan_started_at', sa.DateTime(), nullable=True))
+    op.add_column('subnets', sa.Column('scan_checkpoint', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('subnets', 'scan_checkpoint')
+    op.drop_column('subnets', 'scan_started_at')
+    op.drop_constraint('uq_ip_addresses_subnet_address', 'ip_addresses', type_='unique')
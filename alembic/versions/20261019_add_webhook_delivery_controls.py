@@ -0,0 +1,45 @@
+"""Add webhook circuit breaker, batching and concurrency settings
+
+Revision ID: 20261019_webhook_delivery_ctl
+Revises: 20261019_webhook_outbox
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_webhook_delivery_ctl'
+down_revision = '20261019_webhook_outbox'
+branch_labels = None
+depends_on = None
+
+
+WEBHOOK_COLUMNS = (
+    ('max_concurrency', sa.Integer(), '4'),
+    ('batch_size', sa.Integer(), '1'),
+    ('batch_window_seconds', sa.Integer(), '0'),
+    ('circuit_failure_threshold', sa.Integer(), '5'),
+    ('circuit_cooldown_seconds', sa.Integer(), '60'),
+)
+
+
+def upgrade() -> None:
+    for name, type_, default in WEBHOOK_COLUMNS:
+        op.add_column('webhooks', sa.Column(name, type_, nullable=True, server_default=default))
+    op.add_column('webhooks', sa.Column('circuit_open_until', sa.DateTime(), nullable=True))
+
+    # Latency stats read one webhook's recent deliveries
+    op.create_index(
+        'ix_webhook_deliveries_webhook_created',
+        'webhook_deliveries',
+        ['webhook_id', 'created_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_deliveries_webhook_created', table_name='webhook_deliveries')
+    op.drop_column('webhooks', 'circuit_open_until')
+    for name, _, _ in reversed(WEBHOOK_COLUMNS):
+        op.drop_column('webhooks', name)
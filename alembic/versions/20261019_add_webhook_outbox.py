@@ -0,0 +1,46 @@
+"""Add webhook outbox
+
+Revision ID: 20261019_webhook_outbox
+Revises: 20261019_audit_log_rollups
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_webhook_outbox'
+down_revision = '20261019_audit_log_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'webhook_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('webhook_id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('payload', JSONB(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempt_count', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['webhook_id'], ['webhooks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_webhook_outbox_id', 'webhook_outbox', ['id'])
+    op.create_index('ix_webhook_outbox_webhook_id', 'webhook_outbox', ['webhook_id'])
+    op.create_index('ix_webhook_outbox_status_next_attempt', 'webhook_outbox', ['status', 'next_attempt_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_outbox_status_next_attempt', table_name='webhook_outbox')
+    op.drop_index('ix_webhook_outbox_webhook_id', table_name='webhook_outbox')
+    op.drop_index('ix_webhook_outbox_id', table_name='webhook_outbox')
+    op.drop_table('webhook_outbox')
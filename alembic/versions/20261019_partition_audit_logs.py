@@ -0,0 +1,123 @@
+"""Partition audit_logs by month
+
+Revision ID: 20261019_partition_audit_logs
+Revises: 20261019_export_jobs
+Create Date: 2026-10-19
+
+Converts audit_logs into a table range-partitioned by month on timestamp,
+so retention can drop whole partitions instead of deleting rows.
+
+The existing table is renamed, a partitioned table is created in its place
+with monthly partitions covering all existing rows, the rows are copied and
+the old table is dropped. The id sequence is kept so ids keep increasing.
+The copy rewrites the whole table: run it during a maintenance window on
+large installations.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+from backend.core.audit_partitions import (
+    ensure_partitions,
+    is_partitioned,
+    month_start,
+)
+
+
+# revision identifiers, used by Alembic.
+revision = '20261019_partition_audit_logs'
+down_revision = '20261019_export_jobs'
+branch_labels = None
+depends_on = None
+
+
+AUDIT_LOG_COLUMNS = (
+    "id, timestamp, user_id, username, action, resource_type, resource_id, "
+    "entity_id, ip_address, changes, extra_data"
+)
+
+AUDIT_LOG_INDEXES = (
+    ('ix_audit_logs_id', ['id'], {}),
+    ('ix_audit_logs_timestamp', ['timestamp'], {}),
+    ('ix_audit_logs_user_id', ['user_id'], {}),
+    ('ix_audit_logs_action', ['action'], {}),
+    ('ix_audit_logs_resource_type', ['resource_type'], {}),
+    ('ix_audit_logs_changes_gin', ['changes'], {'postgresql_using': 'gin'}),
+    ('ix_audit_logs_extra_data_gin', ['extra_data'], {'postgresql_using': 'gin'}),
+)
+
+
+def _audit_log_columns():
+    return [
+        sa.Column('id', sa.Integer(), nullable=False,
+                  server_default=sa.text("nextval('audit_logs_id_seq'::regclass)")),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('resource_type', sa.String(), nullable=False),
+        sa.Column('resource_id', sa.String(), nullable=True),
+        sa.Column('entity_id', sa.Integer(), nullable=True),
+        sa.Column('ip_address', sa.String(), nullable=True),
+        sa.Column('changes', JSONB(), nullable=True),
+        sa.Column('extra_data', JSONB(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['entity_id'], ['entities.id'], ondelete='SET NULL'),
+    ]
+
+
+def _rename_to_legacy() -> None:
+    """Move the current table (and names it owns) out of the way."""
+    op.rename_table('audit_logs', 'audit_logs_legacy')
+    op.execute("ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey")
+    for name, _, _ in AUDIT_LOG_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def _finish_from_legacy() -> None:
+    """Copy rows from the legacy table, hand over the id sequence and drop it."""
+    op.execute(f"INSERT INTO audit_logs ({AUDIT_LOG_COLUMNS}) SELECT {AUDIT_LOG_COLUMNS} FROM audit_logs_legacy")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+    op.drop_table('audit_logs_legacy')
+    for name, columns, kwargs in AUDIT_LOG_INDEXES:
+        op.create_index(name, 'audit_logs', columns, **kwargs)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # Fresh databases get the partitioned table from create_all
+    if is_partitioned(conn):
+        ensure_partitions(conn)
+        return
+
+    oldest = conn.execute(sa.text("SELECT min(timestamp) FROM audit_logs")).scalar()
+
+    _rename_to_legacy()
+    op.create_table(
+        'audit_logs',
+        *_audit_log_columns(),
+        sa.PrimaryKeyConstraint('id', 'timestamp', name='audit_logs_pkey'),
+        postgresql_partition_by='RANGE (timestamp)'
+    )
+
+    # Partitions for every month holding data, plus the upcoming months
+    start = month_start(oldest.date()) if oldest else None
+    ensure_partitions(conn, start=start)
+
+    _finish_from_legacy()
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if not is_partitioned(conn):
+        return
+
+    _rename_to_legacy()
+    op.create_table(
+        'audit_logs',
+        *_audit_log_columns(),
+        sa.PrimaryKeyConstraint('id', name='audit_logs_pkey')
+    )
+    # Dropping the partitioned legacy table also drops its partitions
+    _finish_from_legacy()
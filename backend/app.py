@@ -18,7 +18,8 @@ from backend.core.config import get_settings
 from backend.core.logging import setup_logging
 from backend.core.database import init_db, SessionLocal
 from backend.core.security import get_current_superadmin_user
-from backend.core.middleware import add_audit_middleware
+from backend.core.middleware import add_audit_middleware, add_rate_limit_middleware
+from backend.core.audit_writer import audit_writer
 from backend.core import setup as setup_services
 from backend import models
 from backend.routers import (
@@ -87,6 +88,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         logger.error(f"Redis warmup failed: {e}")
         # Don't fail startup - the health check will detect this
 
+    # Start the batched audit log writer (drained on shutdown)
+    audit_writer.start()
+
     logger.info("Inframate API started successfully.")
 
     # Create default admin user if not exists (idempotent)
@@ -100,6 +104,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # ===== SHUTDOWN =====
     logger.info("Shutting down Inframate API...")
 
+    # Flush queued audit events before closing connections
+    await audit_writer.stop(timeout=settings.audit_shutdown_timeout)
+
     # Close Redis connection
     if hasattr(app.state, 'redis_client') and app.state.redis_client:
         try:
@@ -123,6 +130,11 @@ def create_app() -> FastAPI:
         lifespan=lifespan  # Modern lifecycle management
     )
 
+    # General API rate limit (added first so it sits inside CORS and
+    # 429 responses still carry CORS headers)
+    if settings.api_rate_limit_enabled:
+        add_rate_limit_middleware(app)
+
     # CORS Middleware
     app.add_middleware(
         CORSMiddleware,
@@ -130,7 +142,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         allow_headers=["Authorization", "Content-Type", "X-CSRF-Token"],
-        expose_headers=["X-CSRF-Token"],
+        expose_headers=["X-CSRF-Token", "Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining"],
     )
 
     # Audit Logging Middleware for POST/PUT/DELETE actions
@@ -3,7 +3,9 @@ Audit Logging Utilities
 Centralized audit trail for all critical operations.
 """
 import logging
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 from backend import models
 
@@ -92,3 +94,182 @@ def get_audit_logs(
         query = query.filter(models.AuditLog.entity_id == entity_id)
 
     return query.order_by(models.AuditLog.timestamp.desc()).limit(limit).offset(offset).all()
+
+
+# ==================== AUDIT STATISTICS ROLLUPS ====================
+# Hourly and daily counts per (action, resource_type, user, entity) are kept
+# in rollup tables so statistics never scan the raw audit log. Hourly rows
+# are rebuilt for complete hours only; the hours after the last rollup are
+# counted live from audit_logs (a partition-pruned range scan).
+
+# Already rolled-up hours that are rebuilt on each run (late-arriving events)
+AUDIT_ROLLUP_REBUILD_HOURS = 2
+
+_ROLLUP_COLUMNS = ("bucket", "action", "resource_type", "user_id", "username", "entity_id", "count")
+
+
+def _floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ceil_hour(value: datetime) -> datetime:
+    floored = _floor_hour(value)
+    return floored if floored == value else floored + timedelta(hours=1)
+
+
+def _ceil_day(value: datetime) -> datetime:
+    floored = _floor_day(value)
+    return floored if floored == value else floored + timedelta(days=1)
+
+
+def get_rollup_watermark(db: Session) -> Optional[datetime]:
+    """End of the last rolled-up hour, or None if nothing was rolled up yet."""
+    last_bucket = db.query(func.max(models.AuditLogHourlyStat.bucket)).scalar()
+    return last_bucket + timedelta(hours=1) if last_bucket else None
+
+
+def refresh_audit_rollups(db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Rebuild hourly rollups for every complete hour since the last run
+    (re-doing the last AUDIT_ROLLUP_REBUILD_HOURS), then rebuild the daily
+    rollups for the days those hours belong to. Idempotent.
+
+    The caller commits.
+    """
+    log = models.AuditLog
+    hourly = models.AuditLogHourlyStat
+    daily = models.AuditLogDailyStat
+
+    now = (now or datetime.now(timezone.utc)).replace(tzinfo=None)
+    end = _floor_hour(now)
+
+    watermark = get_rollup_watermark(db)
+    if watermark:
+        start = watermark - timedelta(hours=AUDIT_ROLLUP_REBUILD_HOURS)
+    else:
+        oldest = db.query(func.min(log.timestamp)).scalar()
+        if oldest is None:
+            return {"hours": 0, "days": 0}
+        start = _floor_hour(oldest)
+    if start >= end:
+        return {"hours": 0, "days": 0}
+
+    # Hourly: replace the window's buckets with fresh counts
+    db.query(hourly).filter(hourly.bucket >= start, hourly.bucket < end).delete(synchronize_session=False)
+    hour = func.date_trunc("hour", log.timestamp)
+    db.execute(insert(hourly).from_select(
+        list(_ROLLUP_COLUMNS),
+        select(
+            hour, log.action, log.resource_type, log.user_id, log.username, log.entity_id, func.count()
+        ).where(
+            log.timestamp >= start, log.timestamp < end
+        ).group_by(hour, log.action, log.resource_type, log.user_id, log.username, log.entity_id)
+    ))
+
+    # Daily: rebuild every day touched by the window from the hourly rows
+    day_start, day_end = _floor_day(start), _ceil_day(end)
+    db.query(daily).filter(daily.bucket >= day_start, daily.bucket < day_end).delete(synchronize_session=False)
+    day = func.date_trunc("day", hourly.bucket)
+    db.execute(insert(daily).from_select(
+        list(_ROLLUP_COLUMNS),
+        select(
+            day, hourly.action, hourly.resource_type, hourly.user_id, hourly.username, hourly.entity_id,
+            func.sum(hourly.count)
+        ).where(
+            hourly.bucket >= day_start, hourly.bucket < day_end
+        ).group_by(day, hourly.action, hourly.resource_type, hourly.user_id, hourly.username, hourly.entity_id)
+    ))
+
+    return {
+        "hours": int((end - start) / timedelta(hours=1)),
+        "days": int((day_end - day_start) / timedelta(days=1)),
+    }
+
+
+def _count_by_action_and_resource(db: Session, table, time_column, count_column, start, end, entity_id):
+    """(action, resource_type, count) rows for one source table over [start, end)."""
+    query = db.query(table.action, table.resource_type, count_column)
+    if start is not None:
+        query = query.filter(time_column >= start)
+    if end is not None:
+        query = query.filter(time_column < end)
+    if entity_id:
+        query = query.filter(table.entity_id == entity_id)
+    return query.group_by(table.action, table.resource_type).all()
+
+
+def get_audit_statistics(
+    db: Session,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    entity_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Audit log counts by action and resource type over [from_date, to_date).
+
+    Whole days come from the daily rollup, partial days from the hourly
+    rollup and anything after the last rollup from audit_logs itself.
+    Rolled-up bounds are resolved to the hour (from_date is rounded down,
+    to_date up).
+    """
+    log = models.AuditLog
+    hourly = models.AuditLogHourlyStat
+    daily = models.AuditLogDailyStat
+
+    start = _floor_hour(from_date) if from_date else None
+    end = _ceil_hour(to_date) if to_date else None
+    watermark = get_rollup_watermark(db)
+
+    rows = []
+    if watermark is None:
+        # No rollups yet: count everything live
+        rows += _count_by_action_and_resource(db, log, log.timestamp, func.count(log.id), start, end, entity_id)
+    else:
+        oldest_hour = db.query(func.min(hourly.bucket)).scalar()
+        rolled_start = max(start, oldest_hour) if start else oldest_hour
+        rolled_end = min(end, watermark) if end else watermark
+
+        if rolled_start < rolled_end:
+            days_start, days_end = _ceil_day(rolled_start), _floor_day(rolled_end)
+            hourly_count = func.sum(hourly.count)
+            if days_start < days_end:
+                rows += _count_by_action_and_resource(
+                    db, daily, daily.bucket, func.sum(daily.count), days_start, days_end, entity_id
+                )
+                rows += _count_by_action_and_resource(
+                    db, hourly, hourly.bucket, hourly_count, rolled_start, days_start, entity_id
+                )
+                rows += _count_by_action_and_resource(
+                    db, hourly, hourly.bucket, hourly_count, days_end, rolled_end, entity_id
+                )
+            else:
+                rows += _count_by_action_and_resource(
+                    db, hourly, hourly.bucket, hourly_count, rolled_start, rolled_end, entity_id
+                )
+
+        # Hours not rolled up yet
+        if end is None or end > watermark:
+            rows += _count_by_action_and_resource(
+                db, log, log.timestamp, func.count(log.id), max(start, watermark) if start else watermark, end, entity_id
+            )
+
+    by_action: Dict[str, int] = {}
+    by_resource: Dict[str, int] = {}
+    total = 0
+    for action, resource_type, count in rows:
+        count = int(count or 0)
+        if not count:
+            continue
+        by_action[action] = by_action.get(action, 0) + count
+        by_resource[resource_type] = by_resource.get(resource_type, 0) + count
+        total += count
+
+    return {
+        "total_logs": total,
+        "by_action": by_action,
+        "by_resource": by_resource,
+    }
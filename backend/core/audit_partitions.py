@@ -0,0 +1,170 @@
+"""
+Audit log partition management.
+
+``audit_logs`` is range-partitioned by month on ``timestamp``. Each month
+lives in its own partition named ``audit_logs_yYYYYmMM``; a default
+partition catches rows outside every defined range. Retention detaches and
+drops whole partitions instead of deleting rows.
+
+All helpers take a SQLAlchemy connection (or session) and issue
+PostgreSQL DDL; the caller owns the transaction.
+"""
+import logging
+import re
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+AUDIT_LOGS_TABLE = "audit_logs"
+AUDIT_LOGS_DEFAULT_PARTITION = "audit_logs_default"
+
+# Future monthly partitions kept ready ahead of the current month
+AUDIT_PARTITION_MONTHS_AHEAD = 3
+
+_PARTITION_NAME_RE = re.compile(r"^audit_logs_y(\d{4})m(\d{2})$")
+
+
+def month_start(value: date) -> date:
+    """First day of the month containing ``value``."""
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    """First day of the month ``months`` after the month of ``value``."""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{AUDIT_LOGS_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn) -> bool:
+    """Whether audit_logs is a partitioned table."""
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace"
+    ), {"table": AUDIT_LOGS_TABLE}).scalar())
+
+
+def list_monthly_partitions(conn) -> List[Tuple[str, date]]:
+    """Attached monthly partitions as (name, month start), oldest first."""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table AND p.relnamespace = 'public'::regnamespace"
+    ), {"table": AUDIT_LOGS_TABLE}).scalars().all()
+
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def _default_partition_exists(conn) -> bool:
+    return bool(conn.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"),
+        {"name": AUDIT_LOGS_DEFAULT_PARTITION}
+    ).scalar())
+
+
+def create_default_partition(conn) -> None:
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {AUDIT_LOGS_DEFAULT_PARTITION} "
+        f"PARTITION OF {AUDIT_LOGS_TABLE} DEFAULT"
+    ))
+
+
+def create_month_partition(conn, month: date) -> str:
+    """
+    Create the partition for one month.
+
+    Rows for that month already sitting in the default partition are moved
+    into the new partition (PostgreSQL refuses to create it otherwise).
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    bounds = {"lower": lower, "upper": upper}
+
+    has_default = _default_partition_exists(conn)
+    stray_rows = has_default and conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {AUDIT_LOGS_DEFAULT_PARTITION} "
+        f"WHERE timestamp >= :lower AND timestamp < :upper)"
+    ), bounds).scalar()
+
+    if stray_rows:
+        conn.execute(text(f"ALTER TABLE {AUDIT_LOGS_TABLE} DETACH PARTITION {AUDIT_LOGS_DEFAULT_PARTITION}"))
+
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {AUDIT_LOGS_TABLE} "
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    ))
+
+    if stray_rows:
+        moved = conn.execute(text(
+            f"WITH moved AS ("
+            f"DELETE FROM {AUDIT_LOGS_DEFAULT_PARTITION} "
+            f"WHERE timestamp >= :lower AND timestamp < :upper RETURNING *"
+            f") INSERT INTO {AUDIT_LOGS_TABLE} SELECT * FROM moved"
+        ), bounds).rowcount
+        conn.execute(text(
+            f"ALTER TABLE {AUDIT_LOGS_TABLE} ATTACH PARTITION {AUDIT_LOGS_DEFAULT_PARTITION} DEFAULT"
+        ))
+        logger.info(f"Moved {moved} audit log rows from the default partition into {name}")
+
+    return name
+
+
+def ensure_partitions(
+    conn,
+    months_ahead: int = AUDIT_PARTITION_MONTHS_AHEAD,
+    start: Optional[date] = None,
+    today: Optional[date] = None
+) -> List[str]:
+    """
+    Make sure monthly partitions exist from ``start`` (default: current month)
+    through ``months_ahead`` months in the future, plus the default partition.
+
+    Returns the names of the partitions that were created.
+    """
+    today = today or datetime.utcnow().date()
+    month = month_start(start or today)
+    last = add_months(month_start(today), months_ahead)
+    existing = {name for name, _ in list_monthly_partitions(conn)}
+
+    if not _default_partition_exists(conn):
+        create_default_partition(conn)
+
+    created = []
+    while month <= last:
+        if partition_name(month) not in existing:
+            created.append(create_month_partition(conn, month))
+        month = add_months(month, 1)
+    return created
+
+
+def drop_partitions_before(conn, cutoff: datetime) -> List[str]:
+    """
+    Detach and drop every monthly partition whose whole range ends on or
+    before ``cutoff``. Retention is therefore month-granular: rows are kept
+    until their entire month falls outside the retention window.
+
+    Returns the names of the dropped partitions.
+    """
+    cutoff_date = cutoff.date() if isinstance(cutoff, datetime) else cutoff
+    dropped = []
+    for name, month in list_monthly_partitions(conn):
+        if add_months(month, 1) > cutoff_date:
+            break
+        conn.execute(text(f"ALTER TABLE {AUDIT_LOGS_TABLE} DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    return dropped
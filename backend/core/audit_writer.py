@@ -0,0 +1,165 @@
+"""
+Batched audit log writer.
+
+Audit events produced by the request middleware are put on a bounded
+in-process queue and written by a background task using multi-row inserts,
+so request handling never waits for an audit database round trip.
+
+The writer is started and stopped by the application lifespan; stopping it
+flushes every queued event before the process exits.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Columns every queued event must provide (executemany requires uniform keys)
+AUDIT_EVENT_FIELDS = (
+    "timestamp", "user_id", "username", "action", "resource_type",
+    "resource_id", "entity_id", "ip_address", "changes", "extra_data",
+)
+
+# Queued to tell the writer task to flush and exit
+_STOP = object()
+
+
+def write_audit_events(events: List[Dict[str, Any]]) -> int:
+    """
+    Insert audit events in a single multi-row statement.
+
+    Synchronous; called from a worker thread. Returns the number of rows
+    written (0 if the insert failed).
+    """
+    # Import here to avoid circular imports
+    from sqlalchemy import insert
+    from backend.core.database import SessionLocal
+    from backend import models
+
+    if not events:
+        return 0
+
+    rows = [{field: event.get(field) for field in AUDIT_EVENT_FIELDS} for event in events]
+    for row in rows:
+        # Part of the primary key (audit_logs is partitioned by timestamp)
+        if row["timestamp"] is None:
+            row["timestamp"] = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        db.execute(insert(models.AuditLog), rows)
+        db.commit()
+        logger.debug(f"Audit writer: flushed {len(rows)} events")
+        return len(rows)
+    except Exception as e:
+        logger.error(f"Failed to write {len(rows)} audit log entries: {e}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+
+class AuditLogWriter:
+    """
+    Background writer draining a bounded queue of audit events.
+
+    A batch is written when it reaches ``batch_size`` events or when
+    ``flush_interval`` seconds have passed since its first event, whichever
+    comes first. When the queue is full (or the writer is not running),
+    ``enqueue`` returns False and the caller should write the event itself.
+    """
+
+    def __init__(self, max_queue_size: int, batch_size: int, flush_interval: float):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the writer task on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run(), name="audit-log-writer")
+        logger.info(
+            f"Audit log writer started (batch size {self.batch_size}, "
+            f"flush interval {self.flush_interval}s)"
+        )
+
+    def enqueue(self, event: Dict[str, Any]) -> bool:
+        """Queue an event without blocking. Returns False if it was not accepted."""
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            logger.warning("Audit log queue full, writing event synchronously")
+            return False
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """Flush all queued events and stop the writer task."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            logger.info("Audit log writer stopped, queue flushed")
+        except asyncio.TimeoutError:
+            logger.error(
+                f"Audit log writer did not flush within {timeout}s, "
+                f"{self._queue.qsize()} events lost"
+            )
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            event = await self._queue.get()
+            if event is _STOP:
+                break
+
+            batch = [event]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                # Take whatever is already queued before waiting
+                if self._queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        event = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    event = self._queue.get_nowait()
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+
+            try:
+                await run_in_threadpool(write_audit_events, batch)
+            except Exception as e:
+                # Keep the writer alive whatever happens to one batch
+                logger.error(f"Audit log writer error: {e}")
+
+
+_settings = get_settings()
+
+audit_writer = AuditLogWriter(
+    max_queue_size=_settings.audit_queue_size,
+    batch_size=_settings.audit_batch_size,
+    flush_interval=_settings.audit_flush_interval,
+)
@@ -3,6 +3,8 @@ Redis caching utilities for API responses.
 """
 import json
 import logging
+import time
+import uuid
 from typing import Optional, Any, Callable
 from functools import wraps
 import redis
@@ -178,3 +180,63 @@ def build_cache_key(prefix: str, *args, **kwargs) -> str:
         if v is not None:
             parts.append(f"{k}={v}")
     return ":".join(parts)
+
+
+# ==================== CONCURRENCY SLOTS ====================
+# A limit shared by all processes: a Redis sorted set of slot tokens scored
+# by expiry, so slots held by a dead process free themselves.
+
+ACQUIRE_SLOT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+_acquire_slot_script = None
+
+
+def acquire_slot(key: str, limit: int, lease_seconds: int) -> Optional[str]:
+    """
+    Take one of ``limit`` slots of ``key`` for up to ``lease_seconds``.
+
+    Returns a token to release, "" when no limit applies (or Redis is
+    unavailable: fail open), or None when all slots are busy.
+    """
+    global _acquire_slot_script
+
+    if not limit or limit < 1:
+        return ""
+    client = get_redis_client()
+    if not client:
+        return ""
+
+    token = uuid.uuid4().hex
+    now = time.time()
+    try:
+        if _acquire_slot_script is None:
+            _acquire_slot_script = client.register_script(ACQUIRE_SLOT_SCRIPT)
+        acquired = _acquire_slot_script(
+            keys=[key],
+            args=[now, limit, now + lease_seconds, token, lease_seconds]
+        )
+    except Exception as e:
+        logger.warning(f"Concurrency limiter unavailable for {key}: {e}")
+        return ""
+    return token if int(acquired) == 1 else None
+
+
+def release_slot(key: str, token: str) -> None:
+    """Release a slot taken with acquire_slot (no-op for the "" token)."""
+    if not token:
+        return
+    client = get_redis_client()
+    if not client:
+        return
+    try:
+        client.zrem(key, token)
+    except Exception as e:
+        logger.warning(f"Could not release slot of {key}: {e}")
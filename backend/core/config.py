@@ -127,6 +127,11 @@ class Settings(BaseSettings):
     refresh_token_expire_days: int = Field(default=7, ge=1, le=30)  # 7 days for refresh tokens
     min_password_length: int = Field(default=8, ge=6, le=128)
 
+    # Authenticated principal cache (see core/principal_cache.py)
+    principal_cache_ttl: int = Field(default=300, ge=10, le=3600)  # Redis tier, seconds
+    principal_cache_local_ttl: float = Field(default=5.0, ge=0.0, le=60.0)  # In-process tier, seconds
+    principal_cache_size: int = Field(default=1024, ge=16, le=100000)  # In-process entries
+
     # Cookie Settings for Refresh Tokens
     cookie_secure: bool = Field(default=True, description="Use secure cookies (HTTPS only)")
     cookie_samesite: str = Field(default="lax", description="SameSite cookie attribute (strict, lax, none)")
@@ -144,6 +149,9 @@ class Settings(BaseSettings):
     # Rate Limiting
     rate_limit_window: int = Field(default=60, ge=10, le=600)
     rate_limit_max_requests: int = Field(default=5, ge=1, le=100)
+    api_rate_limit_enabled: bool = Field(default=True, description="Rate limit all /api requests per user or IP")
+    api_rate_limit_max_requests: int = Field(default=300, ge=10, le=100000)  # Per minute
+    api_rate_limit_lease_size: int = Field(default=10, ge=1, le=1000)  # Requests granted per Redis call
 
     # CORS
     allowed_origins: str = Field(
@@ -159,6 +167,16 @@ class Settings(BaseSettings):
     script_execution_timeout: int = Field(default=300, ge=30, le=3600)
     max_output_size: int = Field(default=1048576, ge=1024)  # 1MB
 
+    # Background Exports
+    export_dir: str = Field(default="/exports")
+    export_retention_hours: int = Field(default=24, ge=1, le=720)
+
+    # Audit Log Writer (batched, off the request path)
+    audit_queue_size: int = Field(default=10000, ge=100, le=1000000)
+    audit_batch_size: int = Field(default=500, ge=1, le=10000)
+    audit_flush_interval: float = Field(default=1.0, ge=0.05, le=60.0)  # seconds
+    audit_shutdown_timeout: float = Field(default=10.0, ge=1.0, le=120.0)  # seconds
+
     # SSH/WinRM
     ssh_timeout: int = Field(default=30, ge=5, le=120)
     ssh_banner_timeout: int = Field(default=30, ge=5, le=120)
@@ -3,18 +3,153 @@ Microsoft 365 Graph API client for email operations.
 
 Supports sending and receiving emails via shared mailboxes
 using OAuth2 client credentials flow.
+
+Clients are cheap to create: HTTP connections (HTTP/2 when available) are
+pooled per event loop and shared by every client, and access tokens are
+cached until shortly before they expire - in process and in Redis
+(encrypted), so API and worker processes share one token per app
+registration instead of authenticating for every request or poll.
 """
 
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import time
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Optional, Tuple
 import httpx
 
+from backend.core.cache import get_redis_client
+
 logger = logging.getLogger(__name__)
 
 # Microsoft Graph API endpoints
 GRAPH_API_URL = "https://graph.microsoft.com/v1.0"
 TOKEN_URL_TEMPLATE = "https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token"
 
+# Tokens are refreshed this many seconds before they expire
+TOKEN_EXPIRY_MARGIN = 300
+TOKEN_CACHE_PREFIX = "m365:token"
+
+# Graph accepts at most 20 requests per JSON batch
+GRAPH_BATCH_LIMIT = 20
+# Longest Retry-After honoured inline for throttled (429/503) requests
+GRAPH_MAX_RETRY_AFTER = 30
+
+# First delta sync of a folder only looks back this far
+DELTA_INITIAL_LOOKBACK_DAYS = 7
+
+MESSAGE_LIST_FIELDS = "id,subject,from,receivedDateTime,isRead,internetMessageId"
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class DeltaTokenExpired(Exception):
+    """The stored delta link is no longer valid; a full resync is required."""
+
+
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """
+    Seconds to wait from a Retry-After header, given either as seconds or
+    as an HTTP-date; ``default`` when missing or unparsable.
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# ==================== SHARED CONNECTIONS AND TOKENS ====================
+
+class _GraphConnections:
+    """HTTP connection pool and token refresh locks for one event loop."""
+
+    def __init__(self):
+        self.http = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=120)
+        )
+        self.token_locks: Dict[str, asyncio.Lock] = {}
+
+
+# httpx.AsyncClient is bound to the loop it is used on: one pool per loop
+# (the API has a single long-lived loop; a worker task uses one per run)
+_connections: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _GraphConnections]" = weakref.WeakKeyDictionary()
+
+# In-process token cache: cache key -> (access token, expires at epoch seconds)
+_local_tokens: Dict[str, Tuple[str, float]] = {}
+
+
+def _get_connections() -> _GraphConnections:
+    loop = asyncio.get_running_loop()
+    connections = _connections.get(loop)
+    if connections is None or connections.http.is_closed:
+        connections = _GraphConnections()
+        _connections[loop] = connections
+    return connections
+
+
+async def close_graph_connections() -> None:
+    """Close the running loop's connection pool (call before closing a short-lived loop)."""
+    connections = _connections.pop(asyncio.get_running_loop(), None)
+    if connections is not None:
+        await connections.http.aclose()
+
+
+def _read_shared_token(cache_key: str) -> Optional[Tuple[str, float]]:
+    client = get_redis_client()
+    if not client:
+        return None
+    try:
+        cached = client.hgetall(cache_key)
+        if not cached:
+            return None
+        from backend.core.security import decrypt_value
+        return decrypt_value(cached["token"]), float(cached["expires_at"])
+    except Exception as e:
+        logger.warning(f"M365 token cache read failed: {e}")
+        return None
+
+
+def _write_shared_token(cache_key: str, token: str, expires_at: float) -> None:
+    client = get_redis_client()
+    if not client:
+        return
+    try:
+        from backend.core.security import encrypt_value
+        pipe = client.pipeline()
+        pipe.hset(cache_key, mapping={"token": encrypt_value(token), "expires_at": expires_at})
+        pipe.expireat(cache_key, int(expires_at))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"M365 token cache write failed: {e}")
+
+
+def _delete_shared_token(cache_key: str) -> None:
+    client = get_redis_client()
+    if not client:
+        return
+    try:
+        client.delete(cache_key)
+    except Exception as e:
+        logger.warning(f"M365 token cache delete failed: {e}")
+
 
 class Microsoft365Client:
     """
@@ -68,28 +203,69 @@ class Microsoft365Client:
         self.client_secret = client_secret
         self.mailbox = mailbox
         self._access_token: Optional[str] = None
+        self._token_expires_at = 0.0
+
+        # One cache entry per app registration (the secret is part of the key
+        # so a rotated secret never reuses a token issued for the old one)
+        fingerprint = hashlib.sha256(
+            f"{tenant_id}:{client_id}:{client_secret}".encode()
+        ).hexdigest()[:24]
+        self._cache_key = f"{TOKEN_CACHE_PREFIX}:{fingerprint}"
+
+    def _cached_token(self) -> Optional[str]:
+        """A token valid for at least TOKEN_EXPIRY_MARGIN seconds, from any cache tier."""
+        now = time.time()
+        if self._access_token and self._token_expires_at - TOKEN_EXPIRY_MARGIN > now:
+            return self._access_token
+
+        for source in (lambda: _local_tokens.get(self._cache_key), lambda: _read_shared_token(self._cache_key)):
+            cached = source()
+            if cached and cached[1] - TOKEN_EXPIRY_MARGIN > now:
+                self._access_token, self._token_expires_at = cached
+                _local_tokens[self._cache_key] = cached
+                return self._access_token
+        return None
+
+    def _invalidate_token(self) -> None:
+        self._access_token = None
+        self._token_expires_at = 0.0
+        _local_tokens.pop(self._cache_key, None)
+        _delete_shared_token(self._cache_key)
 
     async def _get_access_token(self) -> str:
         """
         Get OAuth2 access token using client credentials flow.
 
+        Cached tokens are reused; concurrent callers on the same loop share
+        a single token request.
+
         Returns:
             Access token string
 
         Raises:
             Exception: If authentication fails
         """
-        token_url = TOKEN_URL_TEMPLATE.format(tenant_id=self.tenant_id)
+        token = self._cached_token()
+        if token:
+            return token
 
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-            "scope": "https://graph.microsoft.com/.default"
-        }
+        connections = _get_connections()
+        lock = connections.token_locks.setdefault(self._cache_key, asyncio.Lock())
+        async with lock:
+            token = self._cached_token()
+            if token:
+                return token
+
+            token_url = TOKEN_URL_TEMPLATE.format(tenant_id=self.tenant_id)
+
+            data = {
+                "grant_type": "client_credentials",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "scope": "https://graph.microsoft.com/.default"
+            }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(token_url, data=data)
+            response = await connections.http.post(token_url, data=data)
 
             if response.status_code != 200:
                 error_data = response.json()
@@ -98,16 +274,19 @@ class Microsoft365Client:
                 raise Exception(f"Microsoft 365 authentication failed: {error_desc}")
 
             token_data = response.json()
+            expires_at = time.time() + int(token_data.get("expires_in", 3599))
             self._access_token = token_data["access_token"]
+            self._token_expires_at = expires_at
+            _local_tokens[self._cache_key] = (self._access_token, expires_at)
+            _write_shared_token(self._cache_key, self._access_token, expires_at)
             return self._access_token
 
     async def _get_headers(self) -> Dict[str, str]:
         """Get authorization headers for API requests."""
-        if not self._access_token:
-            await self._get_access_token()
+        token = await self._get_access_token()
 
         return {
-            "Authorization": f"Bearer {self._access_token}",
+            "Authorization": f"Bearer {token}",
             "Content-Type": "application/json"
         }
 
@@ -116,16 +295,19 @@ class Microsoft365Client:
         method: str,
         endpoint: str,
         json_data: Optional[Dict] = None,
-        retry_on_401: bool = True
+        retry_on_401: bool = True,
+        extra_headers: Optional[Dict[str, str]] = None
     ) -> Dict[str, Any]:
         """
         Make authenticated request to Graph API.
 
         Args:
             method: HTTP method (GET, POST, PATCH, DELETE)
-            endpoint: API endpoint (relative to base URL)
+            endpoint: API endpoint (relative to base URL), or an absolute
+                      @odata.nextLink / @odata.deltaLink URL
             json_data: Optional JSON body
             retry_on_401: Whether to retry after refreshing token on 401
+            extra_headers: Optional additional request headers
 
         Returns:
             Response JSON data
@@ -133,40 +315,80 @@ class Microsoft365Client:
         Raises:
             Exception: If request fails
         """
-        url = f"{GRAPH_API_URL}/{endpoint}"
+        if method not in ("GET", "POST", "PATCH", "DELETE"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        url = endpoint if endpoint.startswith("https://") else f"{GRAPH_API_URL}/{endpoint}"
         headers = await self._get_headers()
+        if extra_headers:
+            headers.update(extra_headers)
 
-        async with httpx.AsyncClient() as client:
-            if method == "GET":
-                response = await client.get(url, headers=headers)
-            elif method == "POST":
-                response = await client.post(url, headers=headers, json=json_data)
-            elif method == "PATCH":
-                response = await client.patch(url, headers=headers, json=json_data)
-            elif method == "DELETE":
-                response = await client.delete(url, headers=headers)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+        http = _get_connections().http
+        response = await http.request(method, url, headers=headers, json=json_data)
 
-            # Handle token expiration
-            if response.status_code == 401 and retry_on_401:
-                self._access_token = None
-                return await self._make_request(method, endpoint, json_data, retry_on_401=False)
+        # Throttled: honour a short Retry-After once
+        if response.status_code in (429, 503):
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after <= GRAPH_MAX_RETRY_AFTER:
+                await asyncio.sleep(retry_after)
+                response = await http.request(method, url, headers=headers, json=json_data)
 
-            if response.status_code >= 400:
-                try:
-                    error_data = response.json()
-                    error_msg = error_data.get("error", {}).get("message", response.text)
-                except Exception:
-                    error_msg = response.text
-                logger.error(f"M365 API error: {response.status_code} - {error_msg}")
-                raise Exception(f"Microsoft 365 API error: {error_msg}")
+        # Handle token expiration
+        if response.status_code == 401 and retry_on_401:
+            self._invalidate_token()
+            return await self._make_request(method, endpoint, json_data, False, extra_headers)
+
+        if response.status_code >= 400:
+            try:
+                error_data = response.json()
+                error = error_data.get("error", {})
+                error_msg = error.get("message", response.text)
+                error_code = error.get("code", "")
+            except Exception:
+                error_msg = response.text
+                error_code = ""
+            if response.status_code == 410 or error_code in ("syncStateNotFound", "resyncRequired"):
+                raise DeltaTokenExpired(error_msg)
+            logger.error(f"M365 API error: {response.status_code} - {error_msg}")
+            raise Exception(f"Microsoft 365 API error: {error_msg}")
+
+        # Some endpoints return no content (204)
+        if response.status_code == 204:
+            return {}
+
+        return response.json()
+
+    async def batch(self, requests: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Run requests through the JSON batching endpoint ($batch), 20 per call.
 
-            # Some endpoints return no content (204)
-            if response.status_code == 204:
-                return {}
+        Args:
+            requests: Dicts with "id", "method" and "url" (relative to the
+                      API version, e.g. "/users/x/messages/y"), and
+                      optionally "body"
 
-            return response.json()
+        Returns:
+            Responses by request id: {"status": int, "body": dict}
+        """
+        responses: Dict[str, Dict[str, Any]] = {}
+
+        for start in range(0, len(requests), GRAPH_BATCH_LIMIT):
+            chunk = []
+            for request in requests[start:start + GRAPH_BATCH_LIMIT]:
+                item = {"id": str(request["id"]), "method": request["method"], "url": request["url"]}
+                if request.get("body") is not None:
+                    item["body"] = request["body"]
+                    item["headers"] = {"Content-Type": "application/json"}
+                chunk.append(item)
+
+            result = await self._make_request("POST", "$batch", {"requests": chunk})
+            for response in result.get("responses", []):
+                responses[response["id"]] = {
+                    "status": int(response.get("status", 500)),
+                    "body": response.get("body") or {}
+                }
+
+        return responses
 
     async def send_email(
         self,
@@ -263,7 +485,7 @@ class Microsoft365Client:
             params.append("$filter=isRead eq false")
 
         # Select only needed fields for list view
-        params.append("$select=id,subject,from,receivedDateTime,isRead,internetMessageId")
+        params.append(f"$select={MESSAGE_LIST_FIELDS}")
 
         endpoint = f"{endpoint}?{'&'.join(params)}"
         result = await self._make_request("GET", endpoint)
@@ -296,6 +518,89 @@ class Microsoft365Client:
         endpoint = f"users/{self.mailbox}/messages/{message_id}"
         return await self._make_request("PATCH", endpoint, {"isRead": True})
 
+    async def get_messages(self, message_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get full messages in $batch calls.
+
+        Returns:
+            Message objects by message ID (messages that failed are omitted)
+        """
+        responses = await self.batch([
+            {"id": message_id, "method": "GET", "url": f"/users/{self.mailbox}/messages/{message_id}"}
+            for message_id in message_ids
+        ])
+        messages = {}
+        for message_id, response in responses.items():
+            if response["status"] == 200:
+                messages[message_id] = response["body"]
+            else:
+                logger.warning(f"M365 get message {message_id} failed: HTTP {response['status']}")
+        return messages
+
+    async def mark_many_as_read(self, message_ids: List[str]) -> List[str]:
+        """
+        Mark messages as read in $batch calls.
+
+        Returns:
+            IDs of messages that could not be updated
+        """
+        responses = await self.batch([
+            {
+                "id": message_id,
+                "method": "PATCH",
+                "url": f"/users/{self.mailbox}/messages/{message_id}",
+                "body": {"isRead": True}
+            }
+            for message_id in message_ids
+        ])
+        return [message_id for message_id, response in responses.items() if response["status"] >= 400]
+
+    async def list_message_changes(
+        self,
+        folder: str = "inbox",
+        delta_link: Optional[str] = None,
+        page_size: int = 50
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Messages added or changed in a folder since ``delta_link``.
+
+        Without a delta link, a new sync starts with the messages received
+        in the last DELTA_INITIAL_LOOKBACK_DAYS days.
+
+        Args:
+            folder: Mail folder ID or well-known name
+            delta_link: @odata.deltaLink returned by the previous call
+            page_size: Messages per page
+
+        Returns:
+            (changed messages, new delta link). Deleted messages are
+            returned with an "@removed" key.
+
+        Raises:
+            DeltaTokenExpired: If ``delta_link`` can no longer be used
+        """
+        if delta_link:
+            url = delta_link
+        else:
+            since = time.strftime(
+                "%Y-%m-%dT%H:%M:%SZ",
+                time.gmtime(time.time() - DELTA_INITIAL_LOOKBACK_DAYS * 86400)
+            )
+            url = (
+                f"users/{self.mailbox}/mailFolders/{folder}/messages/delta"
+                f"?$select={MESSAGE_LIST_FIELDS}&$filter=receivedDateTime ge {since}"
+            )
+
+        headers = {"Prefer": f"odata.maxpagesize={page_size}"}
+        messages: List[Dict[str, Any]] = []
+        while True:
+            result = await self._make_request("GET", url, extra_headers=headers)
+            messages.extend(result.get("value", []))
+            if "@odata.nextLink" in result:
+                url = result["@odata.nextLink"]
+                continue
+            return messages, result.get("@odata.deltaLink", delta_link)
+
     async def delete_message(self, message_id: str) -> None:
         """
         Delete message.
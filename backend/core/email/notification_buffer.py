@@ -0,0 +1,158 @@
+"""
+Ticket email notification buffering.
+
+Ticket events are not emailed one by one: each event is appended to a
+Redis list per (ticket, recipient) and sent once that list's digest window
+(the ``email_notification_digest_seconds`` setting, counted from its first
+event) has passed. A single event is sent with its own template; several
+events on the same ticket are coalesced into one "ticket_digest" email.
+Recipients with the same pending events share one notification, so each
+email is rendered once.
+
+With a window of 0, or when Redis is unavailable, events are sent right away.
+"""
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.core.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+DIGEST_WINDOW_SETTING = "email_notification_digest_seconds"
+DIGEST_EVENTS_PREFIX = "email:digest:events:"
+# Sorted set of pending (ticket, recipient) lists, scored by send time
+DIGEST_DUE_KEY = "email:digest:due"
+DIGEST_FLUSH_SCHEDULED_KEY = "email:digest:flush_scheduled"
+# (ticket, recipient) lists sent per flush
+DIGEST_FLUSH_LIMIT = 1000
+# Pending events expire if no flush runs for this long
+DIGEST_EVENTS_TTL = 86400
+
+
+def get_digest_window(db: Session) -> int:
+    """Configured digest window in seconds (0 disables buffering)."""
+    from backend.routers.settings import get_setting_value
+
+    try:
+        return max(0, int(get_setting_value(db, DIGEST_WINDOW_SETTING, "60")))
+    except (TypeError, ValueError):
+        return 60
+
+
+def schedule_flush(countdown: float) -> None:
+    """Queue a flush in ``countdown`` seconds unless one is already queued."""
+    client = get_redis_client()
+    if not client:
+        return
+    countdown = max(1, int(countdown))
+    if client.set(DIGEST_FLUSH_SCHEDULED_KEY, "1", nx=True, ex=countdown):
+        from worker.tasks import flush_ticket_notifications_task
+        flush_ticket_notifications_task.apply_async(countdown=countdown)
+
+
+def queue_ticket_email(
+    db: Session,
+    email_type: str,
+    ticket_id: int,
+    recipients: List[str],
+    comment_id: Optional[int] = None
+) -> None:
+    """
+    Buffer a ticket email for each recipient (or send it now if the digest
+    window is 0 or Redis is unavailable).
+    """
+    window = get_digest_window(db)
+    client = get_redis_client() if window else None
+
+    if client:
+        event = json.dumps({"email_type": email_type, "comment_id": comment_id})
+        due_at = time.time() + window
+        try:
+            pipe = client.pipeline()
+            for recipient in recipients:
+                member = f"{ticket_id}:{recipient}"
+                pipe.rpush(DIGEST_EVENTS_PREFIX + member, event)
+                pipe.expire(DIGEST_EVENTS_PREFIX + member, window + DIGEST_EVENTS_TTL)
+                # NX: the window starts with the first pending event
+                pipe.zadd(DIGEST_DUE_KEY, {member: due_at}, nx=True)
+            pipe.execute()
+            schedule_flush(window)
+            return
+        except Exception as e:
+            logger.warning(f"Could not buffer email notification, sending now: {e}")
+
+    from worker.tasks import send_ticket_email_task
+
+    send_ticket_email_task.delay(
+        email_type=email_type,
+        ticket_id=ticket_id,
+        recipients=recipients,
+        extra_data={"comment_id": comment_id} if comment_id else None
+    )
+
+
+def _coalesce(ticket_id: int, events: List[dict]) -> dict:
+    """One notification for a recipient's pending events on a ticket."""
+    unique = list({(e["email_type"], e.get("comment_id")): e for e in events}.values())
+    if len(unique) == 1:
+        comment_id = unique[0].get("comment_id")
+        return {
+            "email_type": unique[0]["email_type"],
+            "ticket_id": ticket_id,
+            "extra_data": {"comment_id": comment_id} if comment_id else None,
+        }
+    return {
+        "email_type": "ticket_digest",
+        "ticket_id": ticket_id,
+        "extra_data": {"events": unique},
+    }
+
+
+def pop_due_notifications(limit: int = DIGEST_FLUSH_LIMIT) -> List[dict]:
+    """
+    Remove due event lists from Redis and coalesce them into notifications
+    (send_ticket_emails_batch_task format), one per distinct ticket update
+    with all of its recipients.
+    """
+    client = get_redis_client()
+    if not client:
+        return []
+
+    members = client.zrangebyscore(DIGEST_DUE_KEY, "-inf", time.time(), start=0, num=limit)
+    if not members:
+        return []
+
+    # MULTI/EXEC: an event pushed meanwhile is either popped here or starts a new window
+    pipe = client.pipeline()
+    for member in members:
+        pipe.lrange(DIGEST_EVENTS_PREFIX + member, 0, -1)
+        pipe.delete(DIGEST_EVENTS_PREFIX + member)
+    pipe.zrem(DIGEST_DUE_KEY, *members)
+    results = pipe.execute()
+
+    notifications: Dict[str, dict] = {}
+    for index, member in enumerate(members):
+        events = [json.loads(event) for event in results[index * 2]]
+        if not events:
+            continue
+        ticket_id, recipient = member.split(":", 1)
+        notification = _coalesce(int(ticket_id), events)
+        key = json.dumps(notification, sort_keys=True)
+        notifications.setdefault(key, {**notification, "recipients": []})["recipients"].append(recipient)
+
+    return list(notifications.values())
+
+
+def next_flush_in() -> Optional[float]:
+    """Seconds until the next pending list is due (None if nothing is pending)."""
+    client = get_redis_client()
+    if not client:
+        return None
+    first = client.zrange(DIGEST_DUE_KEY, 0, 0, withscores=True)
+    if not first:
+        return None
+    return max(0.0, first[0][1] - time.time())
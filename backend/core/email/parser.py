@@ -12,6 +12,8 @@ from html import unescape
 
 from sqlalchemy.orm import Session
 
+from .thread_index import extract_message_ids, find_ticket_by_thread
+
 logger = logging.getLogger(__name__)
 
 # Regex pattern for ticket number in subject line
@@ -153,27 +155,6 @@ class EmailParser:
 
         return text.strip()
 
-    def find_ticket_by_message_id(self, message_id: str) -> Optional[int]:
-        """
-        Find ticket by matching a sent email's Message-ID.
-
-        Args:
-            message_id: Message-ID header value
-
-        Returns:
-            Ticket ID or None
-        """
-        from backend.models import SentEmail
-
-        sent_email = self.db.query(SentEmail).filter(
-            SentEmail.message_id == message_id
-        ).first()
-
-        if sent_email and sent_email.ticket_id:
-            return sent_email.ticket_id
-
-        return None
-
     def find_ticket_by_number(self, ticket_number: str) -> Optional[int]:
         """
         Find ticket by ticket number.
@@ -196,27 +177,6 @@ class EmailParser:
 
         return None
 
-    def find_ticket_by_email_message_id(self, message_id: str) -> Optional[int]:
-        """
-        Find ticket that was created from a specific email.
-
-        Args:
-            message_id: Original email Message-ID
-
-        Returns:
-            Ticket ID or None
-        """
-        from backend.models import Ticket
-
-        ticket = self.db.query(Ticket).filter(
-            Ticket.email_message_id == message_id
-        ).first()
-
-        if ticket:
-            return ticket.id
-
-        return None
-
     def find_user_by_email(self, email_address: str) -> Optional[int]:
         """
         Find user by email address.
@@ -249,10 +209,9 @@ def detect_ticket_from_email(
 
     Detection order:
     1. X-Ticket-ID header (if present)
-    2. In-Reply-To header -> match SentEmail.message_id
-    3. References header -> match any SentEmail.message_id
-    4. Subject line -> extract TKT-YYYYMMDD-XXXX pattern
-    5. In-Reply-To -> match Ticket.email_message_id (original email that created ticket)
+    2. In-Reply-To and References headers -> email thread index (Message-IDs
+       of notifications sent and emails received, see thread_index)
+    3. Subject line -> extract TKT-YYYYMMDD-XXXX pattern
 
     Args:
         db: Database session
@@ -295,27 +254,15 @@ def detect_ticket_from_email(
         except ValueError:
             pass
 
-    # 2. Check In-Reply-To header
-    if not ticket_id and in_reply_to:
-        found_id = parser.find_ticket_by_message_id(in_reply_to)
+    # 2. In-Reply-To / References -> email thread index (one query, Redis cached)
+    if not ticket_id and (in_reply_to or references):
+        found_id = find_ticket_by_thread(db, extract_message_ids(in_reply_to, references))
         if found_id:
             ticket_id = found_id
             is_reply = True
-            logger.info(f"Found ticket via In-Reply-To header: {ticket_id}")
-
-    # 3. Check References header
-    if not ticket_id and references:
-        # References can contain multiple Message-IDs separated by spaces
-        ref_ids = references.split()
-        for ref_id in ref_ids:
-            found_id = parser.find_ticket_by_message_id(ref_id.strip())
-            if found_id:
-                ticket_id = found_id
-                is_reply = True
-                logger.info(f"Found ticket via References header: {ticket_id}")
-                break
+            logger.info(f"Found ticket via In-Reply-To/References headers: {ticket_id}")
 
-    # 4. Check subject line for ticket number
+    # 3. Check subject line for ticket number
     if not ticket_id:
         ticket_number = parser.extract_ticket_number_from_subject(subject)
         if ticket_number:
@@ -325,14 +272,6 @@ def detect_ticket_from_email(
                 is_reply = True
                 logger.info(f"Found ticket via subject ticket number: {ticket_id}")
 
-    # 5. Check if In-Reply-To matches original email that created a ticket
-    if not ticket_id and in_reply_to:
-        found_id = parser.find_ticket_by_email_message_id(in_reply_to)
-        if found_id:
-            ticket_id = found_id
-            is_reply = True
-            logger.info(f"Found ticket via original email Message-ID: {ticket_id}")
-
     # Prepare clean content
     if body_text:
         clean_content = body_text
@@ -10,13 +10,46 @@ import email
 from email.header import decode_header
 from email.utils import parseaddr
 import logging
-from typing import List, Optional, Dict, Any
+import os
+import re
+from typing import Iterator, List, NamedTuple, Optional, Dict, Any, Tuple
 from datetime import datetime, timezone
 
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# Bytes fetched per IMAP message at most (the rest, usually attachments, is skipped)
+IMAP_MAX_MESSAGE_BYTES = int(os.environ.get("IMAP_MAX_MESSAGE_BYTES", str(5 * 1024 * 1024)))
+# UIDs per UID FETCH / UID STORE command
+IMAP_FETCH_BATCH = 50
+
+_UID_RE = re.compile(rb"UID (\d+)")
+_SIZE_RE = re.compile(rb"RFC822\.SIZE (\d+)")
+
+
+def _uid_set(uids: List[int]) -> str:
+    return ",".join(str(uid) for uid in uids)
+
+
+def _chunks(items: List[int], size: int) -> Iterator[List[int]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class FetchResult(NamedTuple):
+    """
+    New emails of one mailbox poll.
+
+    A fetch changes neither the configuration nor the mailbox: the caller
+    stores ``sync_state`` (configuration column -> new value) with the
+    emails, and marks ``read_ids`` as read once they are committed. A poll
+    that is interrupted or fails to store its emails is simply repeated.
+    """
+    emails: List[Dict[str, Any]]
+    sync_state: Dict[str, Any]
+    read_ids: list  # IMAP UIDs or Graph message IDs
+
 
 class EmailReceiver:
     """
@@ -24,18 +57,22 @@ class EmailReceiver:
 
     Usage:
         receiver = EmailReceiver(email_config)
-        emails = await receiver.fetch_new_emails()
+        result = await receiver.fetch_new_emails()
+        # store result.emails and result.sync_state, commit, then
+        await receiver.mark_fetched_as_read(result)
     """
 
-    def __init__(self, config):
+    def __init__(self, config, timeout: Optional[float] = None):
         """
         Initialize receiver with email configuration.
 
         Args:
             config: EmailConfiguration model instance
+            timeout: Optional socket timeout in seconds for IMAP operations
         """
         self.config = config
         self.provider = config.provider_type
+        self.timeout = timeout
 
     def _decode_header_value(self, value: str) -> str:
         """Decode email header value (handles encoded headers)."""
@@ -111,98 +148,182 @@ class EmailReceiver:
                 headers[key] = self._decode_header_value(value)
         return headers
 
-    def fetch_imap(self, mark_as_read: bool = True) -> List[Dict[str, Any]]:
-        """
-        Fetch new emails via IMAP.
-
-        Args:
-            mark_as_read: Whether to mark fetched emails as read
-
-        Returns:
-            List of email dictionaries with parsed content
-        """
-        emails = []
+    def _parse_message(self, raw_email: bytes, uid: int) -> Dict[str, Any]:
+        """Parse a raw RFC 822 message into an email dictionary."""
+        msg = email.message_from_bytes(raw_email)
+
+        # Extract sender
+        from_header = msg.get("From", "")
+        from_name, from_email_addr = parseaddr(from_header)
+        from_name = self._decode_header_value(from_name)
+
+        # Extract recipient
+        to_header = msg.get("To", "")
+        _, to_email_addr = parseaddr(to_header)
+
+        # Extract subject
+        subject = self._decode_header_value(msg.get("Subject", ""))
+
+        # Extract body
+        body_text, body_html = self._extract_body(msg)
+
+        # Extract headers
+        headers = self._extract_headers(msg)
+
+        return {
+            "message_id": headers.get("Message-ID", f"<imap-{uid}@unknown>"),
+            "in_reply_to": headers.get("In-Reply-To"),
+            "references": headers.get("References"),
+            "from_email": from_email_addr,
+            "from_name": from_name,
+            "to_email": to_email_addr,
+            "subject": subject,
+            "body_text": body_text,
+            "body_html": body_html,
+            "raw_headers": headers,
+            "received_at": datetime.now(timezone.utc)
+        }
+
+    def connect_imap(self) -> imaplib.IMAP4:
+        """Open and authenticate an IMAP connection."""
+        if self.config.imap_use_ssl:
+            imap = imaplib.IMAP4_SSL(self.config.imap_host, self.config.imap_port, timeout=self.timeout)
+        else:
+            imap = imaplib.IMAP4(self.config.imap_host, self.config.imap_port, timeout=self.timeout)
 
         try:
-            # Connect to IMAP server
-            if self.config.imap_use_ssl:
-                imap = imaplib.IMAP4_SSL(self.config.imap_host, self.config.imap_port)
-            else:
-                imap = imaplib.IMAP4(self.config.imap_host, self.config.imap_port)
-
-            # Login
             imap.login(
                 self.config.imap_username or self.config.smtp_username,
                 self.config.imap_password or self.config.smtp_password
             )
+        except Exception:
+            imap.shutdown()
+            raise
+        return imap
 
-            # Select folder
-            folder = self.config.imap_folder or "INBOX"
-            imap.select(folder)
+    def select_imap_folder(self, imap: imaplib.IMAP4) -> Optional[int]:
+        """Select the monitored folder; returns its UIDVALIDITY (None if not reported)."""
+        folder = self.config.imap_folder or "INBOX"
+        status, _ = imap.select(folder)
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"Cannot select folder {folder}")
 
-            # Search for unread emails
-            status, messages = imap.search(None, "UNSEEN")
-            if status != "OK":
-                logger.warning(f"IMAP search failed: {status}")
-                return emails
+        _, data = imap.response("UIDVALIDITY")
+        try:
+            return int(data[-1])
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    def _search_new_uids(self, imap: imaplib.IMAP4, uid_validity: Optional[int]) -> List[int]:
+        """UIDs of unread messages above the last UID seen in this folder."""
+        last_uid = self.config.imap_last_uid or 0
+        if last_uid and uid_validity is not None and uid_validity == self.config.imap_uid_validity:
+            criteria = ("UID", f"{last_uid + 1}:*", "UNSEEN")
+        else:
+            # First poll, or the folder was recreated and its UIDs renumbered
+            last_uid = 0
+            criteria = ("UNSEEN",)
 
-            message_ids = messages[0].split()
-            logger.info(f"Found {len(message_ids)} unread emails in {folder}")
+        status, data = imap.uid("SEARCH", None, *criteria)
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"IMAP search failed: {status}")
 
-            for msg_id in message_ids:
-                try:
-                    # Fetch email
-                    status, msg_data = imap.fetch(msg_id, "(RFC822)")
-                    if status != "OK":
-                        continue
+        # "n:*" always matches the newest message, even when its UID is below n
+        return sorted(uid for uid in map(int, data[0].split()) if uid > last_uid)
 
-                    # Parse email
-                    raw_email = msg_data[0][1]
-                    msg = email.message_from_bytes(raw_email)
+    def _fetch_messages(self, imap: imaplib.IMAP4, uids: List[int]) -> Dict[int, Tuple[bytes, int]]:
+        """
+        Fetch messages with one UID FETCH per IMAP_FETCH_BATCH UIDs.
 
-                    # Extract sender
-                    from_header = msg.get("From", "")
-                    from_name, from_email_addr = parseaddr(from_header)
-                    from_name = self._decode_header_value(from_name)
+        BODY.PEEK leaves messages unread (they are marked read only once
+        parsed) and the partial fetch caps each message at
+        IMAP_MAX_MESSAGE_BYTES, so large attachments are never downloaded
+        in full; the text parts come first in practically every message.
 
-                    # Extract recipient
-                    to_header = msg.get("To", "")
-                    _, to_email_addr = parseaddr(to_header)
+        Returns {uid: (raw message, full size in bytes)}.
+        """
+        messages = {}
+        fetch_items = f"(UID RFC822.SIZE BODY.PEEK[]<0.{IMAP_MAX_MESSAGE_BYTES}>)"
 
-                    # Extract subject
-                    subject = self._decode_header_value(msg.get("Subject", ""))
+        for batch in _chunks(uids, IMAP_FETCH_BATCH):
+            status, data = imap.uid("FETCH", _uid_set(batch), fetch_items)
+            if status != "OK":
+                logger.warning(f"IMAP fetch failed for UIDs {_uid_set(batch)}: {status}")
+                continue
 
-                    # Extract body
-                    body_text, body_html = self._extract_body(msg)
+            for index, item in enumerate(data):
+                if not isinstance(item, tuple):
+                    continue
+                meta = item[0]
+                # Some servers send UID/RFC822.SIZE after the literal
+                if index + 1 < len(data) and isinstance(data[index + 1], bytes):
+                    meta += data[index + 1]
+                uid = _UID_RE.search(meta)
+                if not uid:
+                    continue
+                size = _SIZE_RE.search(meta)
+                messages[int(uid.group(1))] = (item[1], int(size.group(1)) if size else len(item[1]))
 
-                    # Extract headers
-                    headers = self._extract_headers(msg)
+        return messages
 
-                    email_data = {
-                        "message_id": headers.get("Message-ID", f"<imap-{msg_id.decode()}@unknown>"),
-                        "in_reply_to": headers.get("In-Reply-To"),
-                        "references": headers.get("References"),
-                        "from_email": from_email_addr,
-                        "from_name": from_name,
-                        "to_email": to_email_addr,
-                        "subject": subject,
-                        "body_text": body_text,
-                        "body_html": body_html,
-                        "raw_headers": headers,
-                        "received_at": datetime.now(timezone.utc)
-                    }
+    def fetch_imap(self, mark_as_read: bool = True) -> FetchResult:
+        """
+        Fetch new emails via IMAP.
 
-                    emails.append(email_data)
+        Fetching is incremental by UID: only unread messages above the last
+        UID seen are searched for, as long as the folder's UIDVALIDITY is
+        unchanged. Messages are fetched in multi-UID commands. The new UID
+        state does not advance past a message that could not be fetched.
 
-                    # Mark as read if requested
-                    if mark_as_read:
-                        imap.store(msg_id, "+FLAGS", "\\Seen")
+        Args:
+            mark_as_read: Whether to return the fetched UIDs to mark as read
 
-                except Exception as e:
-                    logger.error(f"Failed to process email {msg_id}: {e}")
+        Returns:
+            FetchResult with the parsed emails
+        """
+        emails = []
+        stored = []
+        sync_state = {}
 
-            imap.close()
-            imap.logout()
+        try:
+            imap = self.connect_imap()
+            try:
+                folder = self.config.imap_folder or "INBOX"
+                uid_validity = self.select_imap_folder(imap)
+                uids = self._search_new_uids(imap, uid_validity)
+                logger.info(f"Found {len(uids)} new unread emails in {folder}")
+
+                messages = self._fetch_messages(imap, uids) if uids else {}
+                for uid in uids:
+                    if uid not in messages:
+                        continue
+                    raw_email, size = messages[uid]
+                    if size > len(raw_email):
+                        logger.info(f"IMAP message {uid} is {size} bytes, fetched the first {len(raw_email)}")
+                    try:
+                        emails.append(self._parse_message(raw_email, uid))
+                        stored.append(uid)
+                    except Exception as e:
+                        logger.error(f"Failed to process email {uid}: {e}")
+
+                same_folder = uid_validity == self.config.imap_uid_validity
+                failed = set(uids) - set(stored)
+                if uids:
+                    last_uid = (min(failed) - 1) if failed else uids[-1]
+                    if same_folder:
+                        last_uid = max(last_uid, self.config.imap_last_uid or 0)
+                    sync_state["imap_last_uid"] = last_uid
+                elif not same_folder:
+                    # UIDs of the old folder mean nothing in the new one
+                    sync_state["imap_last_uid"] = None
+                sync_state["imap_uid_validity"] = uid_validity
+
+                imap.close()
+            finally:
+                try:
+                    imap.logout()
+                except Exception:
+                    pass
 
         except imaplib.IMAP4.error as e:
             logger.error(f"IMAP error: {e}")
@@ -211,38 +332,86 @@ class EmailReceiver:
             logger.error(f"Failed to fetch IMAP emails: {e}")
             raise
 
-        return emails
+        return FetchResult(emails, sync_state, stored if mark_as_read else [])
 
-    async def fetch_m365(self, mark_as_read: bool = True) -> List[Dict[str, Any]]:
+    def mark_imap_read(self, uids: List[int], uid_validity: Optional[int]) -> None:
         """
-        Fetch new emails via Microsoft 365 Graph API.
-
-        Args:
-            mark_as_read: Whether to mark fetched emails as read
+        Mark fetched messages as read, in multi-UID STORE commands.
 
-        Returns:
-            List of email dictionaries with parsed content
+        Nothing is marked if the folder's UIDVALIDITY changed since the
+        fetch (the UIDs may now belong to other messages).
         """
+        imap = self.connect_imap()
+        try:
+            if self.select_imap_folder(imap) != uid_validity:
+                logger.warning("IMAP folder UIDVALIDITY changed since the fetch, not marking messages as read")
+                return
+            for batch in _chunks(uids, IMAP_FETCH_BATCH):
+                imap.uid("STORE", _uid_set(batch), "+FLAGS.SILENT", "(\\Seen)")
+            imap.close()
+        finally:
+            try:
+                imap.logout()
+            except Exception:
+                pass
+
+    def _m365_client(self):
         from .microsoft365 import Microsoft365Client
 
-        client = Microsoft365Client(
+        return Microsoft365Client(
             tenant_id=self.config.m365_tenant_id,
             client_id=self.config.m365_client_id,
             client_secret=self.config.m365_client_secret,
             mailbox=self.config.m365_mailbox
         )
 
-        # Fetch unread messages
-        messages = await client.list_messages(filter_unread=True)
+    async def mark_m365_read(self, message_ids: List[str]) -> None:
+        """Mark fetched messages as read in $batch calls."""
+        failed = await self._m365_client().mark_many_as_read(message_ids)
+        if failed:
+            logger.warning(f"Could not mark {len(failed)} M365 messages as read")
+
+    async def fetch_m365(self, mark_as_read: bool = True) -> FetchResult:
+        """
+        Fetch new emails via Microsoft 365 Graph API.
+
+        Uses a delta query on the monitored folder, so each poll only sees
+        messages added or changed since the previous one. Full messages are
+        fetched in $batch calls. The new delta link only advances when every
+        message was fetched.
+
+        Args:
+            mark_as_read: Whether to return the fetched message IDs to mark as read
+
+        Returns:
+            FetchResult with the parsed emails
+        """
+        from .microsoft365 import DeltaTokenExpired
+
+        client = self._m365_client()
+        folder = self.config.m365_folder_id or "inbox"
+
+        try:
+            changes, delta_link = await client.list_message_changes(folder, self.config.m365_delta_link)
+        except DeltaTokenExpired:
+            logger.warning(f"M365 delta sync expired for {self.config.m365_mailbox}, resyncing")
+            changes, delta_link = await client.list_message_changes(folder)
+
+        # Deleted messages and read-state changes (including our own mark-as-read) are skipped
+        unread_ids = list(dict.fromkeys(
+            msg["id"] for msg in changes
+            if "@removed" not in msg and msg.get("isRead") is False
+        ))
+        full_messages = await client.get_messages(unread_ids) if unread_ids else {}
         emails = []
 
-        for msg in messages:
+        for message_id in unread_ids:
+            full_msg = full_messages.get(message_id)
+            if full_msg is None:
+                continue
             try:
-                # Get full message with body
-                full_msg = await client.get_message(msg["id"])
-
                 email_data = {
-                    "message_id": full_msg.get("internetMessageId", f"<m365-{msg['id']}@outlook.com>"),
+                    "message_id": full_msg.get("internetMessageId", f"<m365-{message_id}@outlook.com>"),
                     "in_reply_to": full_msg.get("inReplyTo"),
                     "references": full_msg.get("conversationId"),  # M365 uses conversation threading
                     "from_email": full_msg.get("from", {}).get("emailAddress", {}).get("address", ""),
@@ -260,21 +429,22 @@ class EmailReceiver:
 
                 emails.append(email_data)
 
-                # Mark as read
-                if mark_as_read:
-                    await client.mark_as_read(msg["id"])
-
             except Exception as e:
-                logger.error(f"Failed to process M365 message {msg.get('id')}: {e}")
+                logger.error(f"Failed to process M365 message {message_id}: {e}")
 
-        return emails
+        # Messages that could not be fetched are seen again by the next poll
+        sync_state = {}
+        if len(full_messages) == len(unread_ids):
+            sync_state["m365_delta_link"] = delta_link
 
-    async def fetch_new_emails(self, mark_as_read: bool = True) -> List[Dict[str, Any]]:
+        return FetchResult(emails, sync_state, list(full_messages) if mark_as_read else [])
+
+    async def fetch_new_emails(self, mark_as_read: bool = True) -> FetchResult:
         """
         Fetch new emails using configured provider.
 
         Returns:
-            List of email dictionaries
+            FetchResult with the parsed emails
         """
         if self.provider == "microsoft_365":
             return await self.fetch_m365(mark_as_read=mark_as_read)
@@ -282,6 +452,15 @@ class EmailReceiver:
             # IMAP is synchronous
             return self.fetch_imap(mark_as_read=mark_as_read)
 
+    async def mark_fetched_as_read(self, result: FetchResult) -> None:
+        """Mark the messages of a fetch as read, once its emails are stored."""
+        if not result.read_ids:
+            return
+        if self.provider == "microsoft_365":
+            await self.mark_m365_read(result.read_ids)
+        else:
+            self.mark_imap_read(result.read_ids, result.sync_state.get("imap_uid_validity"))
+
 
 def get_active_inbound_configs(db: Session) -> List:
     """
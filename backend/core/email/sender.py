@@ -11,11 +11,13 @@ import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formataddr, formatdate, make_msgid
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
 from sqlalchemy.orm import Session
 
+from .smtp_pool import smtp_pool
+
 logger = logging.getLogger(__name__)
 
 
@@ -93,7 +95,7 @@ class EmailSender:
 
         return headers
 
-    def send_smtp(
+    def build_smtp_message(
         self,
         to_email: str,
         subject: str,
@@ -103,25 +105,12 @@ class EmailSender:
         ticket_number: Optional[str] = None,
         in_reply_to: Optional[str] = None,
         references: Optional[str] = None
-    ) -> str:
+    ) -> Tuple[str, str]:
         """
-        Send email via SMTP.
-
-        Args:
-            to_email: Recipient email address
-            subject: Email subject
-            body_html: HTML body content
-            body_text: Plain text body content
-            ticket_id: Optional ticket ID for headers
-            ticket_number: Optional ticket number for headers
-            in_reply_to: Optional Message-ID for threading
-            references: Optional References header for threading
+        Build an RFC 5322 message for SMTP delivery.
 
         Returns:
-            Generated Message-ID
-
-        Raises:
-            Exception: If sending fails
+            Tuple of (Message-ID, serialized message)
         """
         # Generate Message-ID
         message_id = self._generate_message_id(ticket_id)
@@ -152,23 +141,46 @@ class EmailSender:
         for key, value in headers.items():
             msg[key] = value
 
+        return message_id, msg.as_string()
+
+    def send_smtp(
+        self,
+        to_email: str,
+        subject: str,
+        body_html: Optional[str] = None,
+        body_text: Optional[str] = None,
+        ticket_id: Optional[int] = None,
+        ticket_number: Optional[str] = None,
+        in_reply_to: Optional[str] = None,
+        references: Optional[str] = None
+    ) -> str:
+        """
+        Send email via SMTP, over a pooled connection.
+
+        Args:
+            to_email: Recipient email address
+            subject: Email subject
+            body_html: HTML body content
+            body_text: Plain text body content
+            ticket_id: Optional ticket ID for headers
+            ticket_number: Optional ticket number for headers
+            in_reply_to: Optional Message-ID for threading
+            references: Optional References header for threading
+
+        Returns:
+            Generated Message-ID
+
+        Raises:
+            Exception: If sending fails
+        """
+        message_id, message = self.build_smtp_message(
+            to_email, subject, body_html, body_text,
+            ticket_id, ticket_number, in_reply_to, references
+        )
+
         # Send via SMTP
         try:
-            if self.config.smtp_use_tls:
-                server = smtplib.SMTP(self.config.smtp_host, self.config.smtp_port)
-                server.starttls()
-            else:
-                server = smtplib.SMTP(self.config.smtp_host, self.config.smtp_port)
-
-            if self.config.smtp_username and self.config.smtp_password:
-                server.login(self.config.smtp_username, self.config.smtp_password)
-
-            server.sendmail(
-                self.config.from_email,
-                [to_email],
-                msg.as_string()
-            )
-            server.quit()
+            smtp_pool.send(self.config, self.config.from_email, [to_email], message)
 
             logger.info(f"Email sent via SMTP: {message_id} to {to_email}")
             return message_id
@@ -282,6 +294,46 @@ class EmailSender:
             )
 
 
+    async def send_many(self, emails: List[Dict[str, Any]]) -> List[Tuple[Optional[str], Optional[str]]]:
+        """
+        Send several emails with this configuration.
+
+        Args:
+            emails: Keyword arguments for ``send`` (to_email, subject, ...)
+
+        Returns:
+            One (Message-ID, None) or (None, error message) per email, in order
+        """
+        results: List[Tuple[Optional[str], Optional[str]]] = []
+
+        if self.provider == "microsoft_365":
+            for email_kwargs in emails:
+                try:
+                    results.append((await self.send_m365(**email_kwargs), None))
+                except Exception as e:
+                    results.append((None, str(e)))
+            return results
+
+        # SMTP: every message goes over the configuration's pooled connections
+        built = [self.build_smtp_message(**email_kwargs) for email_kwargs in emails]
+        try:
+            errors = smtp_pool.send_many(
+                self.config,
+                [
+                    (self.config.from_email, [email_kwargs["to_email"]], message)
+                    for email_kwargs, (_, message) in zip(emails, built)
+                ]
+            )
+        except smtplib.SMTPAuthenticationError as e:
+            logger.error(f"SMTP authentication failed: {e}")
+            return [(None, f"SMTP authentication failed: {e}")] * len(emails)
+
+        for (message_id, _), error in zip(built, errors):
+            results.append((message_id, None) if error is None else (None, f"SMTP error: {error}"))
+        logger.info(f"Email batch sent via SMTP: {errors.count(None)}/{len(emails)} delivered")
+        return results
+
+
 def get_active_email_config(db: Session, entity_id: Optional[int] = None):
     """
     Get active email configuration for sending.
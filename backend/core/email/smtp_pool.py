@@ -0,0 +1,189 @@
+"""
+SMTP connection pool.
+
+Connections are kept open per email configuration and reused across
+messages, so a burst of notifications costs one TLS handshake and LOGIN
+per connection instead of one per email. The pool lives in the process
+(each Celery worker process has its own).
+
+- A connection idle for more than SMTP_NOOP_AFTER seconds is checked with
+  NOOP before reuse; one idle longer than SMTP_MAX_IDLE is closed.
+- A connection is retired after SMTP_MAX_MESSAGES_PER_CONNECTION messages
+  (servers commonly limit messages per session).
+- If the server dropped the connection, the message is retried once on a
+  new connection.
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SMTP_TIMEOUT = int(os.environ.get("SMTP_TIMEOUT", "30"))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.environ.get("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+SMTP_MAX_IDLE_CONNECTIONS = int(os.environ.get("SMTP_MAX_IDLE_CONNECTIONS", "2"))
+SMTP_NOOP_AFTER = 30
+SMTP_MAX_IDLE = 300
+
+
+def is_connection_error(error: Exception) -> bool:
+    """True if the session is unusable (as opposed to the message being refused)."""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == 421  # Service not available, closing channel
+    # SMTPException subclasses OSError: anything else from smtplib is a refusal
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class _PooledConnection:
+    """An open SMTP session and its usage counters."""
+
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    """Idle SMTP connections per configuration (host, port, credentials, TLS)."""
+
+    def __init__(self, max_idle: int = SMTP_MAX_IDLE_CONNECTIONS):
+        self.max_idle = max_idle
+        self._idle: Dict[str, List[_PooledConnection]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(config) -> str:
+        # Credentials are part of the key so edited settings never reuse an old session
+        raw = "|".join(str(value) for value in (
+            config.id, config.smtp_host, config.smtp_port, config.smtp_use_tls,
+            config.smtp_username, config.smtp_password,
+        ))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @staticmethod
+    def _connect(config) -> _PooledConnection:
+        server = smtplib.SMTP(config.smtp_host, config.smtp_port, timeout=SMTP_TIMEOUT)
+        try:
+            if config.smtp_use_tls:
+                server.starttls()
+            if config.smtp_username and config.smtp_password:
+                server.login(config.smtp_username, config.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return _PooledConnection(server)
+
+    @staticmethod
+    def _is_usable(conn: _PooledConnection) -> bool:
+        idle = time.monotonic() - conn.last_used
+        if idle > SMTP_MAX_IDLE:
+            return False
+        if idle > SMTP_NOOP_AFTER:
+            try:
+                return conn.server.noop()[0] == 250
+            except Exception:
+                return False
+        return True
+
+    def _checkout(self, key: str, config) -> _PooledConnection:
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                conn = idle.pop() if idle else None
+            if conn is None:
+                return self._connect(config)
+            if self._is_usable(conn):
+                return conn
+            conn.close()
+
+    def _checkin(self, key: str, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        if conn.messages_sent >= SMTP_MAX_MESSAGES_PER_CONNECTION:
+            conn.close()
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self, config) -> Iterator[_PooledConnection]:
+        """
+        Borrow a connection; it returns to the pool unless the block raised
+        a connection error.
+        """
+        key = self._key(config)
+        conn = self._checkout(key, config)
+        try:
+            yield conn
+        except Exception as e:
+            if is_connection_error(e):
+                conn.close()
+            else:
+                # The message was refused; the session itself is still fine
+                self._checkin(key, conn)
+            raise
+        else:
+            self._checkin(key, conn)
+
+    def send(self, config, from_addr: str, to_addrs: List[str], message: str) -> None:
+        """Send one message, reconnecting once if the pooled session was dropped."""
+        for attempt in (1, 2):
+            try:
+                with self.connection(config) as conn:
+                    conn.server.sendmail(from_addr, to_addrs, message)
+                    conn.messages_sent += 1
+                return
+            except Exception as e:
+                if attempt == 2 or not is_connection_error(e):
+                    raise
+                logger.info(f"SMTP connection to {config.smtp_host} lost ({e}), reconnecting")
+
+    def send_many(self, config, messages: List[Tuple[str, List[str], str]]) -> List[Optional[Exception]]:
+        """
+        Send (from_addr, to_addrs, message) tuples over pooled connections.
+
+        Returns one entry per message: None if sent, else the exception.
+        A refused message does not stop the others.
+        """
+        results: List[Optional[Exception]] = []
+        for from_addr, to_addrs, message in messages:
+            try:
+                self.send(config, from_addr, to_addrs, message)
+                results.append(None)
+            except smtplib.SMTPAuthenticationError:
+                raise
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+
+smtp_pool = SMTPConnectionPool()
+atexit.register(smtp_pool.close_all)
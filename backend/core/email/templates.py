@@ -3,23 +3,52 @@ Email template rendering module using Jinja2.
 
 Provides functions to render HTML and plain text email templates
 for various ticket notification types.
+
+Templates are compiled once per process (``precompile_templates`` runs at
+worker startup; set EMAIL_TEMPLATE_CACHE_DIR to also keep Jinja's compiled
+bytecode on disk). Contexts built with ``build_ticket_email_context`` hold
+only plain values, so rendering never lazy-loads from the database and
+identical renders (same template, same ticket revision and data) are
+memoized across recipients and tasks.
 """
 
 import os
+import json
 import logging
-from typing import Dict, Any, Optional, Tuple
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from pathlib import Path
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
 
 logger = logging.getLogger(__name__)
 
 # Template directory
 TEMPLATE_DIR = Path(__file__).parent.parent.parent / "templates" / "email"
 
+# Optional directory for compiled template bytecode (shared across restarts)
+TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get("EMAIL_TEMPLATE_CACHE_DIR")
+
+# Rendered emails kept per process
+RENDER_CACHE_SIZE = 256
+
+# Fields exposed to templates
+TICKET_FIELDS = (
+    "id", "ticket_number", "title", "description", "ticket_type", "category",
+    "status", "priority", "resolution", "resolved_at", "sla_due_date",
+    "created_at", "updated_at",
+)
+USER_FIELDS = ("id", "username", "email")
+COMMENT_FIELDS = ("id", "content", "created_at")
+
 # Initialize Jinja2 environment
 _env: Optional[Environment] = None
 
+_render_cache: "OrderedDict[tuple, Tuple[str, str]]" = OrderedDict()
+_render_cache_lock = threading.Lock()
+
 
 def get_template_env() -> Environment:
     """
@@ -34,11 +63,19 @@ def get_template_env() -> Environment:
         # Ensure template directory exists
         TEMPLATE_DIR.mkdir(parents=True, exist_ok=True)
 
+        bytecode_cache = None
+        if TEMPLATE_BYTECODE_CACHE_DIR:
+            os.makedirs(TEMPLATE_BYTECODE_CACHE_DIR, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(TEMPLATE_BYTECODE_CACHE_DIR)
+
         _env = Environment(
             loader=FileSystemLoader(str(TEMPLATE_DIR)),
             autoescape=select_autoescape(["html", "xml"]),
             trim_blocks=True,
-            lstrip_blocks=True
+            lstrip_blocks=True,
+            # Templates ship with the code: no per-render mtime checks
+            auto_reload=False,
+            bytecode_cache=bytecode_cache
         )
 
         # Add custom filters
@@ -48,6 +85,86 @@ def get_template_env() -> Environment:
     return _env
 
 
+def precompile_templates() -> int:
+    """
+    Compile every email template into the environment's cache.
+
+    Returns:
+        Number of templates compiled
+    """
+    env = get_template_env()
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def _get(obj, name: str, default: Any = "") -> Any:
+    """Read a field from a model instance or a context dict."""
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def _to_dict(obj, fields: Iterable[str]) -> Optional[Dict[str, Any]]:
+    if obj is None:
+        return None
+    return {field: getattr(obj, field, None) for field in fields}
+
+
+def build_ticket_email_context(
+    ticket,
+    comment=None,
+    updates: Optional[List[Tuple[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Build a template context of plain values from (prefetched) models.
+
+    Load ``ticket.requester``, ``ticket.assigned_to`` and ``comment.user``
+    with the ticket/comment query (e.g. joinedload) to avoid extra queries.
+
+    Args:
+        ticket: Ticket model instance
+        comment: Optional TicketComment for comment notifications
+        updates: Optional (email_type, comment or None) pairs for ticket_digest
+
+    Returns:
+        Context dict for render_email_template
+    """
+    context: Dict[str, Any] = {
+        "ticket": _to_dict(ticket, TICKET_FIELDS),
+        "requester": _to_dict(ticket.requester, USER_FIELDS),
+        "assigned_to": _to_dict(ticket.assigned_to, USER_FIELDS),
+    }
+    if comment is not None:
+        context["comment"] = _to_dict(comment, COMMENT_FIELDS)
+        context["comment_author"] = _to_dict(comment.user, USER_FIELDS)
+    if updates is not None:
+        context["updates"] = [
+            {
+                "email_type": email_type,
+                "comment": _to_dict(update_comment, COMMENT_FIELDS),
+                "comment_author": _to_dict(update_comment.user, USER_FIELDS) if update_comment else None,
+            }
+            for email_type, update_comment in updates
+        ]
+    return context
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    # Model instances have no stable key: such contexts are not memoized
+    raise TypeError(f"Unhashable context value: {type(value).__name__}")
+
+
+def _render_key(template_name: str, context: Dict[str, Any], site_name: str, site_url: str) -> Optional[tuple]:
+    try:
+        return (template_name, site_name, site_url, json.dumps(context, sort_keys=True, default=_json_value))
+    except TypeError:
+        return None
+
+
 def format_datetime(value, format: str = "%Y-%m-%d %H:%M") -> str:
     """Format datetime for email display."""
     if value is None:
@@ -76,6 +193,9 @@ def render_email_template(
     """
     Render email template with context.
 
+    Renders of plain-value contexts (see build_ticket_email_context) are
+    memoized; contexts holding model instances are rendered every time.
+
     Args:
         template_name: Name of template (e.g., "ticket_created")
         context: Template context variables
@@ -85,6 +205,14 @@ def render_email_template(
     Returns:
         Tuple of (html_content, text_content)
     """
+    key = _render_key(template_name, context, site_name, site_url)
+    if key is not None:
+        with _render_cache_lock:
+            cached = _render_cache.get(key)
+            if cached is not None:
+                _render_cache.move_to_end(key)
+                return cached
+
     env = get_template_env()
 
     # Add global context
@@ -107,6 +235,12 @@ def render_email_template(
     # Generate plain text version
     text_content = generate_plain_text(template_name, full_context)
 
+    if key is not None:
+        with _render_cache_lock:
+            _render_cache[key] = (html_content, text_content)
+            if len(_render_cache) > RENDER_CACHE_SIZE:
+                _render_cache.popitem(last=False)
+
     return html_content, text_content
 
 
@@ -122,8 +256,8 @@ def render_fallback_html(template_name: str, context: Dict[str, Any]) -> str:
         Simple HTML email content
     """
     ticket = context.get("ticket", {})
-    ticket_number = getattr(ticket, "ticket_number", "N/A") if hasattr(ticket, "ticket_number") else ticket.get("ticket_number", "N/A")
-    title = getattr(ticket, "title", "") if hasattr(ticket, "title") else ticket.get("title", "")
+    ticket_number = _get(ticket, "ticket_number", "N/A")
+    title = _get(ticket, "title")
     site_name = context.get("site_name", "Inframate")
     site_url = context.get("site_url", "")
 
@@ -134,7 +268,8 @@ def render_fallback_html(template_name: str, context: Dict[str, Any]) -> str:
         "comment_added": f"A new comment has been added to ticket {ticket_number}",
         "ticket_resolved": f"Ticket {ticket_number} has been resolved",
         "sla_warning": f"SLA warning: Ticket {ticket_number} is approaching its deadline",
-        "sla_breach": f"SLA breach: Ticket {ticket_number} has exceeded its deadline"
+        "sla_breach": f"SLA breach: Ticket {ticket_number} has exceeded its deadline",
+        "ticket_digest": f"Ticket {ticket_number} has new updates"
     }
 
     message = messages.get(template_name, f"Notification for ticket {ticket_number}")
@@ -165,7 +300,7 @@ def render_fallback_html(template_name: str, context: Dict[str, Any]) -> str:
                 <strong>Ticket:</strong> {ticket_number}<br>
                 <strong>Title:</strong> {title}
             </div>
-            <a href="{site_url}/tickets?id={getattr(ticket, 'id', '') if hasattr(ticket, 'id') else ticket.get('id', '')}" class="button">View Ticket</a>
+            <a href="{site_url}/tickets?id={_get(ticket, 'id')}" class="button">View Ticket</a>
         </div>
         <div class="footer">
             <p>This email was sent by {site_name}.</p>
@@ -189,8 +324,8 @@ def generate_plain_text(template_name: str, context: Dict[str, Any]) -> str:
         Plain text email content
     """
     ticket = context.get("ticket", {})
-    ticket_number = getattr(ticket, "ticket_number", "N/A") if hasattr(ticket, "ticket_number") else ticket.get("ticket_number", "N/A")
-    title = getattr(ticket, "title", "") if hasattr(ticket, "title") else ticket.get("title", "")
+    ticket_number = _get(ticket, "ticket_number", "N/A")
+    title = _get(ticket, "title")
     site_name = context.get("site_name", "Inframate")
     site_url = context.get("site_url", "")
     comment = context.get("comment")
@@ -201,7 +336,8 @@ def generate_plain_text(template_name: str, context: Dict[str, Any]) -> str:
         "comment_added": f"A new comment has been added to your ticket.",
         "ticket_resolved": f"Your ticket has been resolved.",
         "sla_warning": f"SLA warning: This ticket is approaching its deadline.",
-        "sla_breach": f"SLA breach: This ticket has exceeded its deadline."
+        "sla_breach": f"SLA breach: This ticket has exceeded its deadline.",
+        "ticket_digest": f"This ticket has new updates."
     }
 
     message = messages.get(template_name, "Ticket notification")
@@ -217,7 +353,7 @@ Title: {title}
 """
 
     if comment:
-        comment_content = getattr(comment, "content", "") if hasattr(comment, "content") else comment.get("content", "")
+        comment_content = _get(comment, "content")
         text += f"""
 Comment:
 {'-' * 40}
@@ -225,7 +361,22 @@ Comment:
 {'-' * 40}
 """
 
-    ticket_id = getattr(ticket, 'id', '') if hasattr(ticket, 'id') else ticket.get('id', '')
+    # Coalesced updates (ticket_digest)
+    for update in context.get("updates") or []:
+        update_comment = update.get("comment")
+        if update_comment:
+            text += f"""
+Comment:
+{'-' * 40}
+{_get(update_comment, "content")}
+{'-' * 40}
+"""
+        else:
+            text += f"""
+- {messages.get(update["email_type"], update["email_type"])}
+"""
+
+    ticket_id = _get(ticket, "id")
     text += f"""
 View ticket: {site_url}/tickets?id={ticket_id}
 
@@ -259,7 +410,8 @@ def get_email_subject(
         "comment_added": f"Re: [{ticket_number}] {title}",
         "ticket_resolved": f"[{ticket_number}] Ticket Resolved: {title}",
         "sla_warning": f"[{ticket_number}] SLA Warning: {title}",
-        "sla_breach": f"[{ticket_number}] SLA Breach Alert: {title}"
+        "sla_breach": f"[{ticket_number}] SLA Breach Alert: {title}",
+        "ticket_digest": f"Re: [{ticket_number}] Ticket Updates: {title}"
     }
 
     subject = subjects.get(template_name, f"[{ticket_number}] {title}")
@@ -0,0 +1,147 @@
+"""
+Email thread index.
+
+Maps each Message-ID we know of (notifications sent, emails received) to
+its ticket in the email_thread_index table, so a reply is matched to its
+ticket with one indexed query over In-Reply-To and all References. Recent
+Message-IDs are also cached in Redis; entries are cached once the
+transaction that indexed them commits.
+"""
+import logging
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import any_, bindparam, event, String
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from backend.core.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+THREAD_CACHE_PREFIX = "email:thread:"
+# Replies usually arrive within days of the message they answer
+THREAD_CACHE_TTL = 7 * 86400
+# References headers of long threads are capped to the most recent IDs
+MAX_THREAD_MESSAGE_IDS = 50
+
+MESSAGE_ID_PATTERN = re.compile(r"<[^<>\s]+>")
+
+_PENDING_KEY = "email_thread_index_pending"
+
+
+def extract_message_ids(*headers: Optional[str]) -> List[str]:
+    """
+    Message-IDs from In-Reply-To / References values, most recent first.
+
+    References lists a thread oldest first, so each header is read backwards;
+    pass In-Reply-To before References.
+    """
+    message_ids: List[str] = []
+    for header in headers:
+        if not header:
+            continue
+        found = MESSAGE_ID_PATTERN.findall(header) or header.split()
+        message_ids.extend(reversed(found))
+    return list(dict.fromkeys(message_ids))[:MAX_THREAD_MESSAGE_IDS]
+
+
+def index_message_ids(db: Session, message_ids: Dict[str, int], source: str) -> None:
+    """
+    Record Message-ID -> ticket ID entries in the caller's transaction.
+
+    An already indexed Message-ID keeps its ticket.
+
+    Args:
+        message_ids: {message_id: ticket_id}
+        source: "sent" or "received"
+    """
+    from backend.models import EmailThreadIndex
+
+    rows = [
+        {"message_id": message_id, "ticket_id": ticket_id, "source": source}
+        for message_id, ticket_id in message_ids.items()
+        if message_id and ticket_id
+    ]
+    if not rows:
+        return
+
+    db.execute(
+        pg_insert(EmailThreadIndex)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[EmailThreadIndex.message_id])
+    )
+    db.info.setdefault(_PENDING_KEY, {}).update(
+        (row["message_id"], row["ticket_id"]) for row in rows
+    )
+
+
+def _cache_set_many(entries: Dict[str, int]) -> None:
+    client = get_redis_client()
+    if not client or not entries:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for message_id, ticket_id in entries.items():
+            pipe.set(THREAD_CACHE_PREFIX + message_id, ticket_id, ex=THREAD_CACHE_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Email thread cache update failed: {e}")
+
+
+def _cache_get_many(message_ids: List[str]) -> Dict[str, int]:
+    client = get_redis_client()
+    if not client:
+        return {}
+    try:
+        values = client.mget([THREAD_CACHE_PREFIX + message_id for message_id in message_ids])
+    except Exception as e:
+        logger.warning(f"Email thread cache lookup failed: {e}")
+        return {}
+    return {
+        message_id: int(value)
+        for message_id, value in zip(message_ids, values)
+        if value is not None
+    }
+
+
+def find_ticket_by_thread(db: Session, message_ids: List[str]) -> Optional[int]:
+    """
+    Ticket of the first indexed Message-ID (callers pass the most recent first).
+
+    Checks the Redis cache, then resolves the rest with one query.
+    """
+    from backend.models import EmailThreadIndex
+
+    if not message_ids:
+        return None
+
+    found = _cache_get_many(message_ids)
+    for message_id in message_ids:
+        if message_id in found:
+            return found[message_id]
+
+    rows = db.query(EmailThreadIndex.message_id, EmailThreadIndex.ticket_id).filter(
+        EmailThreadIndex.message_id == any_(
+            bindparam("thread_message_ids", message_ids, type_=ARRAY(String))
+        )
+    ).all()
+    if not rows:
+        return None
+
+    found = dict(rows)
+    _cache_set_many(found)
+    for message_id in message_ids:
+        if message_id in found:
+            return found[message_id]
+    return None
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_entries(session) -> None:
+    _cache_set_many(session.info.pop(_PENDING_KEY, None) or {})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_entries(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
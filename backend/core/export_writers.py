@@ -0,0 +1,218 @@
+"""
+Streaming export writers (CSV, XLSX, Parquet, Arrow IPC).
+
+Writers consume an iterable of row dictionaries (or Arrow record batches
+for the columnar formats) in a single pass and never hold the full dataset
+in memory, so they can be fed directly from a server-side cursor.
+"""
+import csv
+import io
+import logging
+import tempfile
+from decimal import Decimal
+from typing import Iterable, Iterator, Optional, BinaryIO
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+
+logger = logging.getLogger(__name__)
+
+# Size (in characters) of the CSV buffer flushed to the client
+CSV_CHUNK_SIZE = 64 * 1024
+
+# Size of the chunks read back from the finished XLSX file
+XLSX_CHUNK_SIZE = 64 * 1024
+# Finished workbooks larger than this are spilled from memory to disk
+XLSX_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# Excel hard limit is 1,048,576 rows including the header
+XLSX_MAX_ROWS = 1048575
+# Column widths are capped (in characters) to keep sheets readable
+XLSX_MAX_COLUMN_WIDTH = 50
+
+# Rows buffered per Parquet row group (larger groups compress and scan better)
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
+
+def iter_csv(rows: Iterable[dict]) -> Iterator[str]:
+    """Serialize rows to CSV, yielding chunks of roughly CSV_CHUNK_SIZE characters."""
+    output = io.StringIO()
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(output, fieldnames=list(row.keys()))
+            writer.writeheader()
+        writer.writerow(row)
+        if output.tell() >= CSV_CHUNK_SIZE:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+
+    if writer is None:
+        yield "No data to export"
+    elif output.tell():
+        yield output.getvalue()
+
+
+def _text_width(text: str) -> int:
+    """Display width of a cell value: length of its longest line."""
+    if "\n" not in text:
+        return len(text)
+    return max(len(line) for line in text.split("\n"))
+
+
+def write_xlsx(rows: Iterable[dict], output: BinaryIO, column_labels: Optional[dict] = None) -> int:
+    """
+    Write rows to an XLSX workbook in a single pass.
+
+    Uses XlsxWriter's ``constant_memory`` mode: each row is flushed to a
+    temporary file as soon as it is written, so memory use does not grow
+    with the number of rows. Formats are created once and shared by every
+    cell, and column widths are tracked while rows are written.
+
+    Strings are always written as text so values starting with ``=`` are
+    never interpreted as formulas.
+
+    Returns the number of data rows written.
+    """
+    wb = xlsxwriter.Workbook(output, {"constant_memory": True})
+    ws = wb.add_worksheet("Export")
+
+    border = {"border": 1, "border_color": "#E5E7EB"}
+    header_format = wb.add_format({
+        "bold": True, "font_color": "#FFFFFF", "bg_color": "#4F46E5",
+        "align": "center", "valign": "vcenter", "text_wrap": True, **border
+    })
+    cell_format = wb.add_format({"valign": "top", "text_wrap": True, **border})
+    alt_format = wb.add_format({"valign": "top", "text_wrap": True, "bg_color": "#F9FAFB", **border})
+
+    columns = None
+    widths = []
+    count = 0
+    for row in rows:
+        if columns is None:
+            columns = list(row.keys())
+            for col_idx, col_key in enumerate(columns):
+                label = str(column_labels.get(col_key, col_key) if column_labels else col_key)
+                ws.write_string(0, col_idx, label, header_format)
+                widths.append(min(_text_width(label), XLSX_MAX_COLUMN_WIDTH))
+            ws.freeze_panes(1, 0)
+
+        if count >= XLSX_MAX_ROWS:
+            logger.warning(f"XLSX export truncated at {XLSX_MAX_ROWS} rows (Excel limit)")
+            break
+
+        count += 1
+        # Alternate row colors, starting with the first data row
+        fmt = alt_format if count % 2 == 1 else cell_format
+        for col_idx, col_key in enumerate(columns):
+            value = row.get(col_key, "")
+            if value is None or value == "":
+                ws.write_blank(count, col_idx, None, fmt)
+            elif isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+                ws.write_number(count, col_idx, float(value), fmt)
+                text_len = len(str(value))
+                if text_len > widths[col_idx]:
+                    widths[col_idx] = min(text_len, XLSX_MAX_COLUMN_WIDTH)
+            else:
+                text = str(value)
+                ws.write_string(count, col_idx, text, fmt)
+                if len(text) > widths[col_idx]:
+                    widths[col_idx] = max(widths[col_idx], min(_text_width(text), XLSX_MAX_COLUMN_WIDTH))
+
+    if columns is None:
+        ws.write_string(0, 0, "No data to export")
+    else:
+        for col_idx, width in enumerate(widths):
+            ws.set_column(col_idx, col_idx, width + 2)
+
+    wb.close()
+    return count
+
+
+def iter_xlsx(rows: Iterable[dict], column_labels: Optional[dict] = None) -> Iterator[bytes]:
+    """
+    Build an XLSX workbook from rows and yield it in chunks.
+
+    The finished file is held in a spooled temporary file that moves to disk
+    once it exceeds XLSX_SPOOL_MAX_SIZE, capping memory for large exports.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_SIZE) as output:
+        write_xlsx(rows, output, column_labels)
+        output.seek(0)
+        while True:
+            chunk = output.read(XLSX_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object for pyarrow writers.
+
+    Written bytes are collected until drained, while ``tell`` keeps reporting
+    the absolute offset (Parquet footers reference row groups by offset).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_parquet(batches: Iterable[pa.RecordBatch], schema: pa.Schema) -> Iterator[bytes]:
+    """
+    Write record batches to a Parquet file, yielding bytes as row groups complete.
+
+    Batches are buffered up to PARQUET_ROW_GROUP_SIZE rows so each row group
+    holds a useful amount of data, which bounds memory to one row group.
+    """
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    pending = []
+    pending_rows = 0
+    try:
+        for batch in batches:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= PARQUET_ROW_GROUP_SIZE:
+                writer.write_table(pa.Table.from_batches(pending, schema=schema))
+                pending = []
+                pending_rows = 0
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, schema=schema))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_arrow_stream(batches: Iterable[pa.RecordBatch], schema: pa.Schema) -> Iterator[bytes]:
+    """Write record batches in the Arrow IPC streaming format, one chunk per batch."""
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
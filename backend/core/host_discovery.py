@@ -0,0 +1,349 @@
+"""
+Native host discovery.
+
+An asyncio alternative to nmap that needs no external binary and no
+privileges: a host is up when it answers a TCP connect on one of the probe
+ports (a refused connection counts too, the host sent a RST). When the
+process may open an ICMP socket (an unprivileged ping socket, or a raw
+socket with CAP_NET_RAW), hosts are pinged as well. Reverse DNS of the
+hosts found is resolved concurrently, at most SCAN_RDNS_CONCURRENCY
+lookups at a time, and MAC addresses are read from the kernel ARP cache.
+
+Results come in batches as hosts answer, so they can be written while the
+rest of the block is still being probed. Loopback ranges work without any
+setup, e.g. ``list(native_discover("127.0.0.0/29"))``.
+"""
+import asyncio
+import ipaddress
+import logging
+import os
+import queue
+import socket
+import struct
+import threading
+from typing import AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+SCAN_PROBE_PORTS = os.environ.get("SCAN_PROBE_PORTS", "22,80,443,445,3389,135,139,53,8080,9100")
+# Seconds to wait for a TCP connect or an echo reply
+SCAN_PROBE_TIMEOUT = float(os.environ.get("SCAN_PROBE_TIMEOUT", "1.0"))
+# Connect attempts in flight at once (bounds open sockets)
+SCAN_PROBE_CONCURRENCY = int(os.environ.get("SCAN_PROBE_CONCURRENCY", "512"))
+SCAN_RDNS_CONCURRENCY = int(os.environ.get("SCAN_RDNS_CONCURRENCY", "32"))
+SCAN_RDNS_TIMEOUT = 2.0
+# "auto" pings when an ICMP socket can be opened, "off" never does
+SCAN_ICMP = os.environ.get("SCAN_ICMP", "auto").lower()
+# Larger blocks (IPv6) cannot be probed address by address
+NATIVE_MAX_ADDRESSES = 65536
+RESULT_BATCH_SIZE = 256
+
+ARP_TABLE_PATH = "/proc/net/arp"
+ARP_FLAG_COMPLETE = 0x2
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+class ScanResult(NamedTuple):
+    """A host seen by a scan."""
+    address: str
+    status: str  # active, available
+    hostname: Optional[str] = None
+    mac_address: Optional[str] = None
+
+
+def parse_probe_ports(value: Optional[str]) -> List[int]:
+    """
+    Ports of a comma-separated list such as "22,80,443".
+
+    Raises ValueError for anything that is not a port number.
+    """
+    ports = []
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        port = int(part)
+        if not 1 <= port <= 65535:
+            raise ValueError(f"Invalid port: {part}")
+        ports.append(port)
+    return list(dict.fromkeys(ports))
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+class IcmpPinger:
+    """
+    ICMP echo over a single socket; replies are matched to the waiting
+    probe by source address.
+    """
+
+    def __init__(self, sock: socket.socket, raw: bool):
+        self.sock = sock
+        self.raw = raw
+        self._ident = os.getpid() & 0xFFFF
+        self._sequence = 0
+        self._waiting: Dict[str, asyncio.Future] = {}
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._on_readable)
+
+    @classmethod
+    def open(cls) -> Optional["IcmpPinger"]:
+        """
+        A pinger on an unprivileged ping socket, else a raw socket, or None
+        if the process may open neither. Must be called within the event loop.
+        """
+        for kind, raw in ((socket.SOCK_DGRAM, False), (socket.SOCK_RAW, True)):
+            try:
+                sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+            except OSError:
+                continue
+            sock.setblocking(False)
+            return cls(sock, raw)
+        return None
+
+    def close(self) -> None:
+        self._loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+    def _on_readable(self) -> None:
+        while True:
+            try:
+                data, (address, _) = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            if self.raw:
+                # Raw sockets deliver the IP header as well
+                data = data[(data[0] & 0x0F) * 4:]
+            if not data or data[0] != ICMP_ECHO_REPLY:
+                continue
+            waiter = self._waiting.get(address)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(True)
+
+    async def ping(self, address: str, timeout: float) -> bool:
+        self._sequence = (self._sequence + 1) & 0xFFFF
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, self._ident, self._sequence)
+        payload = b"inframate"
+        packet = struct.pack(
+            "!BBHHH", ICMP_ECHO_REQUEST, 0, _checksum(header + payload), self._ident, self._sequence
+        ) + payload
+
+        waiter = self._waiting[address] = self._loop.create_future()
+        try:
+            self.sock.sendto(packet, (address, 0))
+            return await asyncio.wait_for(waiter, timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        finally:
+            self._waiting.pop(address, None)
+
+
+async def _tcp_probe(address: str, port: int, timeout: float, limit: asyncio.Semaphore) -> bool:
+    async with limit:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+        except ConnectionRefusedError:
+            return True
+        except (OSError, asyncio.TimeoutError):
+            return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def _is_alive(
+    address: str,
+    ports: Sequence[int],
+    timeout: float,
+    limit: asyncio.Semaphore,
+    pinger: Optional[IcmpPinger]
+) -> bool:
+    """Probe all ports (and ping) at once; True as soon as one answers."""
+    probes = [asyncio.ensure_future(_tcp_probe(address, port, timeout, limit)) for port in ports]
+    if pinger is not None:
+        probes.append(asyncio.ensure_future(pinger.ping(address, timeout)))
+    try:
+        for probe in asyncio.as_completed(probes):
+            if await probe:
+                return True
+        return False
+    finally:
+        for probe in probes:
+            probe.cancel()
+        await asyncio.gather(*probes, return_exceptions=True)
+
+
+async def _reverse_dns(address: str, limit: asyncio.Semaphore) -> Optional[str]:
+    async with limit:
+        try:
+            hostname, _ = await asyncio.wait_for(
+                asyncio.get_running_loop().getnameinfo((address, 0), socket.NI_NAMEREQD),
+                SCAN_RDNS_TIMEOUT
+            )
+        except (OSError, asyncio.TimeoutError):
+            return None
+    return hostname
+
+
+async def discover_hosts(
+    cidr: str,
+    ports: Optional[Sequence[int]] = None,
+    timeout: float = SCAN_PROBE_TIMEOUT,
+    icmp: Optional[bool] = None,
+    resolve: bool = True,
+    addresses: Optional[Sequence[str]] = None
+) -> AsyncIterator[ScanResult]:
+    """
+    Yield the hosts of a CIDR block that answer, as they are found.
+
+    Args:
+        ports: TCP ports to probe (SCAN_PROBE_PORTS by default)
+        icmp: Also ping (default: SCAN_ICMP); ignored if no ICMP socket can be opened
+        resolve: Look up the hostnames of the hosts found
+        addresses: Probe only these addresses instead of the whole block
+    """
+    network = ipaddress.ip_network(cidr, strict=False)
+    if addresses is None and network.num_addresses > NATIVE_MAX_ADDRESSES:
+        raise ValueError(f"{cidr} is too large for the native scanner (more than {NATIVE_MAX_ADDRESSES} addresses)")
+
+    ports = list(ports or parse_probe_ports(SCAN_PROBE_PORTS))
+    if icmp is None:
+        icmp = SCAN_ICMP != "off"
+    pinger = IcmpPinger.open() if icmp and network.version == 4 else None
+    if icmp and pinger is None:
+        logger.debug("ICMP not permitted, discovering hosts with TCP probes only")
+
+    if addresses is None:
+        addresses = [str(host) for host in network.hosts()] or [str(network.network_address)]
+    address_count = len(addresses)
+    addresses = iter(addresses)
+    probe_limit = asyncio.Semaphore(max(1, SCAN_PROBE_CONCURRENCY))
+    rdns_limit = asyncio.Semaphore(max(1, SCAN_RDNS_CONCURRENCY))
+    found: asyncio.Queue = asyncio.Queue()
+    lookups = set()
+
+    async def report(address: str) -> None:
+        hostname = await _reverse_dns(address, rdns_limit) if resolve else None
+        await found.put(ScanResult(address=address, status="active", hostname=hostname))
+
+    async def probe_worker() -> None:
+        # Workers share the iterator, so each address is probed once
+        for address in addresses:
+            if await _is_alive(address, ports, timeout, probe_limit, pinger):
+                lookup = asyncio.ensure_future(report(address))
+                lookups.add(lookup)
+                lookup.add_done_callback(lookups.discard)
+
+    async def probe_all() -> None:
+        try:
+            workers = max(1, SCAN_PROBE_CONCURRENCY // len(ports))
+            await asyncio.gather(*(probe_worker() for _ in range(min(workers, address_count))))
+            while lookups:
+                await asyncio.gather(*list(lookups))
+        finally:
+            await found.put(None)
+
+    runner = asyncio.ensure_future(probe_all())
+    try:
+        while True:
+            result = await found.get()
+            if result is None:
+                break
+            yield result
+        await runner
+    finally:
+        pending = [runner, *lookups]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if pinger is not None:
+            pinger.close()
+
+
+def read_arp_table(path: str = ARP_TABLE_PATH) -> Dict[str, str]:
+    """IPv4 -> MAC of complete entries in the kernel ARP cache (empty off Linux)."""
+    try:
+        with open(path) as arp_file:
+            lines = arp_file.readlines()[1:]
+    except OSError:
+        return {}
+
+    table = {}
+    for line in lines:
+        fields = line.split()
+        if len(fields) >= 4 and int(fields[2], 16) & ARP_FLAG_COMPLETE:
+            table[fields[0]] = fields[3].upper()
+    return table
+
+
+def native_discover(
+    cidr: str,
+    ports: Optional[Sequence[int]] = None,
+    batch_size: int = RESULT_BATCH_SIZE,
+    **options
+) -> Iterator[List[ScanResult]]:
+    """
+    Run discover_hosts in a background event loop and yield its results in
+    batches of up to ``batch_size``; probing continues while the caller
+    processes a batch. Options are passed to discover_hosts.
+    """
+    batches: queue.Queue = queue.Queue()
+    done = object()
+    loop = asyncio.new_event_loop()
+
+    async def produce() -> None:
+        batch: List[ScanResult] = []
+        async for result in discover_hosts(cidr, ports, **options):
+            batch.append(result)
+            if len(batch) >= batch_size:
+                batches.put(batch)
+                batch = []
+        if batch:
+            batches.put(batch)
+
+    task = loop.create_task(produce())
+
+    def run() -> None:
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(task)
+            batches.put(done)
+        except BaseException as e:
+            batches.put(e)
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    thread = threading.Thread(target=run, name=f"discover-{cidr}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = batches.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            arp = read_arp_table()
+            yield [result._replace(mac_address=arp.get(result.address)) for result in item]
+    finally:
+        # Stop probing if the caller stopped early
+        if thread.is_alive() and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # The loop closed meanwhile
+        thread.join()
@@ -0,0 +1,185 @@
+"""
+Free address allocation for subnets.
+
+Free space is computed in Postgres with inet arithmetic: the used addresses
+of a subnet are sorted and the gaps between neighbours (and the subnet's
+first and last usable addresses) are its free ranges. Neither listing
+free ranges nor utilization loads IP rows.
+
+An address is used when it has a row with a status other than "available"
+or is linked to equipment, whichever subnet the row belongs to (subnets
+may overlap, and addresses are unique across them).
+"""
+import ipaddress
+import logging
+from typing import List, Optional
+
+from sqlalchemy import and_, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from backend import models
+
+logger = logging.getLogger(__name__)
+
+# Most addresses one allocation may take
+MAX_ALLOCATION = 1024
+
+USED_CONDITION = "(status <> 'available' OR equipment_id IS NOT NULL)"
+
+# Gaps between consecutive used addresses. The addresses just outside the
+# usable range are added as sentinels, so the first and last free ranges
+# are found like the others.
+FREE_RANGES_SQL = f"""
+    WITH edges AS (
+        SELECT CAST(:before AS inet) AS address
+        UNION
+        SELECT address FROM ip_addresses
+        WHERE address <<= CAST(:cidr AS inet)
+          AND address BETWEEN CAST(:first AS inet) AND CAST(:last AS inet)
+          AND {USED_CONDITION}
+        UNION
+        SELECT CAST(:after AS inet)
+    ),
+    gaps AS (
+        SELECT address + 1 AS range_start, LEAD(address) OVER (ORDER BY address) - 1 AS range_end
+        FROM edges
+    )
+    SELECT host(range_start), host(range_end)
+    FROM gaps
+    WHERE range_end >= range_start
+      AND range_start + (:min_size - 1) <= range_end
+    ORDER BY range_start
+    LIMIT :limit
+"""
+
+UTILIZATION_SQL = f"""
+    SELECT status, count(*) FROM ip_addresses
+    WHERE address <<= CAST(:cidr AS inet)
+      AND address BETWEEN CAST(:first AS inet) AND CAST(:last AS inet)
+      AND {USED_CONDITION}
+    GROUP BY status
+"""
+
+
+class IPAllocationError(Exception):
+    """An allocation or free-range request that cannot be satisfied."""
+
+
+def usable_bounds(network) -> tuple:
+    """
+    First and last assignable addresses, as ``network.hosts()``: IPv4
+    excludes the network and broadcast addresses (except in /31 and /32),
+    IPv6 the Subnet-Router anycast address.
+    """
+    if network.num_addresses <= 2:
+        return network.network_address, network.broadcast_address
+    if network.version == 4:
+        return network.network_address + 1, network.broadcast_address - 1
+    return network.network_address + 1, network.broadcast_address
+
+
+def _range_params(network) -> dict:
+    first, last = usable_bounds(network)
+    try:
+        before, after = first - 1, last + 1
+    except ipaddress.AddressValueError:
+        raise IPAllocationError(f"{network} touches the end of the address space")
+    return {
+        "cidr": str(network),
+        "first": str(first),
+        "last": str(last),
+        "before": str(before),
+        "after": str(after),
+    }
+
+
+def find_free_ranges(db: Session, network, min_size: int = 1, limit: int = 100) -> List[dict]:
+    """
+    Free ranges of a network in address order, as {"start", "end", "size"}.
+
+    Args:
+        min_size: Only ranges of at least this many addresses
+        limit: Most ranges returned
+    """
+    params = {**_range_params(network), "min_size": max(1, min_size), "limit": limit}
+    return [
+        {
+            "start": start,
+            "end": end,
+            "size": int(ipaddress.ip_address(end)) - int(ipaddress.ip_address(start)) + 1,
+        }
+        for start, end in db.execute(text(FREE_RANGES_SQL), params)
+    ]
+
+
+def get_utilization(db: Session, network) -> dict:
+    """Used and free address counts of a network, counted in the database."""
+    first, last = usable_bounds(network)
+    total = int(last) - int(first) + 1
+
+    by_status = dict(db.execute(text(UTILIZATION_SQL), _range_params(network)).all())
+    used = sum(by_status.values())
+
+    return {
+        "total": total,
+        "used": used,
+        "free": total - used,
+        "utilization": round(100.0 * used / total, 2) if total else 0.0,
+        "by_status": by_status,
+    }
+
+
+def allocate_contiguous(
+    db: Session,
+    subnet: models.Subnet,
+    count: int,
+    status: str = "assigned",
+    hostname: Optional[str] = None
+) -> List[models.IPAddress]:
+    """
+    Take the first block of ``count`` consecutive free addresses of the
+    subnet, in the caller's transaction.
+
+    The subnet row stays locked (SELECT ... FOR UPDATE) until the caller
+    commits, so concurrent allocations in the subnet queue up instead of
+    picking the same block. Free rows already in the block are taken over;
+    an address used meanwhile through an overlapping subnet makes the
+    allocation fail.
+
+    Raises:
+        IPAllocationError: No free block of that size, or an invalid count
+    """
+    IPAddress = models.IPAddress
+    if not 1 <= count <= MAX_ALLOCATION:
+        raise IPAllocationError(f"Between 1 and {MAX_ALLOCATION} addresses can be allocated at once")
+
+    db.query(models.Subnet.id).filter(models.Subnet.id == subnet.id).with_for_update().one()
+
+    network = ipaddress.ip_network(str(subnet.cidr), strict=False)
+    ranges = find_free_ranges(db, network, min_size=count, limit=1)
+    if not ranges:
+        raise IPAllocationError(f"No block of {count} free addresses in {network}")
+
+    start = ipaddress.ip_address(ranges[0]["start"])
+    stmt = pg_insert(IPAddress).values([
+        {"address": str(start + offset), "subnet_id": subnet.id, "status": status, "hostname": hostname}
+        for offset in range(count)
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IPAddress.address],
+        set_={
+            "subnet_id": stmt.excluded.subnet_id,
+            "status": stmt.excluded.status,
+            "hostname": stmt.excluded.hostname,
+        },
+        # Only rows that are still free
+        where=and_(IPAddress.status == "available", IPAddress.equipment_id.is_(None))
+    ).returning(IPAddress.id)
+    allocated_ids = db.execute(stmt).scalars().all()
+
+    if len(allocated_ids) != count:
+        raise IPAllocationError(f"Addresses from {start} were allocated meanwhile, try again")
+
+    logger.info(f"Allocated {count} addresses from {start} in subnet {subnet.id}")
+    return db.query(IPAddress).filter(IPAddress.id.in_(allocated_ids)).order_by(IPAddress.address).all()
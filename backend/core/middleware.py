@@ -5,15 +5,19 @@ user management, and security-related actions.
 """
 import logging
 import json
+import math
 from typing import Callable, Optional, Dict, Any
 from datetime import datetime, timezone
 from io import BytesIO
 
 from fastapi import Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.concurrency import run_in_threadpool
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
+from backend.core.audit_writer import audit_writer, write_audit_events
+
 logger = logging.getLogger(__name__)
 
 
@@ -154,12 +158,8 @@ class AuditLoggingMiddleware(BaseHTTPMiddleware):
         client_ip: str,
         user_agent: str
     ):
-        """Log the action to the database with enhanced metadata for critical operations."""
+        """Queue the action for the audit log with enhanced metadata for critical operations."""
         try:
-            # Import here to avoid circular imports
-            from backend.core.database import SessionLocal
-            from backend import models
-
             # Determine action type from HTTP method
             action_map = {
                 "POST": "CREATE",
@@ -284,34 +284,26 @@ class AuditLoggingMiddleware(BaseHTTPMiddleware):
                     f"- Category: {operation_category or 'general'}"
                 )
 
-            # Create audit log entry in a threadpool to avoid blocking the event loop
-            def _write_audit_log_sync():
-                """Synchronous function to write audit log - runs in threadpool."""
-                db = SessionLocal()
-                try:
-                    audit_log = models.AuditLog(
-                        user_id=user_id,
-                        username=username or "anonymous",
-                        action=action,
-                        resource_type=resource_type,
-                        resource_id=resource_id,
-                        ip_address=client_ip,
-                        extra_data=extra_data
-                    )
-                    db.add(audit_log)
-                    db.commit()
-
-                    logger.debug(
-                        f"Audit: {action} {resource_type}/{resource_id or 'N/A'} "
-                        f"by {username or 'anonymous'} from {client_ip}"
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to write audit log: {e}")
-                    db.rollback()
-                finally:
-                    db.close()
+            # Hand the event to the batched background writer; the request
+            # does not wait for the database. Fall back to a direct write
+            # only when the writer is not running or its queue is full.
+            event = {
+                "timestamp": datetime.now(timezone.utc),
+                "user_id": user_id,
+                "username": username or "anonymous",
+                "action": action,
+                "resource_type": resource_type,
+                "resource_id": resource_id,
+                "ip_address": client_ip,
+                "extra_data": extra_data,
+            }
+            if not audit_writer.enqueue(event):
+                await run_in_threadpool(write_audit_events, [event])
 
-            await run_in_threadpool(_write_audit_log_sync)
+            logger.debug(
+                f"Audit: {action} {resource_type}/{resource_id or 'N/A'} "
+                f"by {username or 'anonymous'} from {client_ip}"
+            )
 
         except Exception as e:
             # Don't let audit logging failures affect the request
@@ -321,3 +313,64 @@ class AuditLoggingMiddleware(BaseHTTPMiddleware):
 def add_audit_middleware(app):
     """Add audit logging middleware to the FastAPI app."""
     app.add_middleware(AuditLoggingMiddleware)
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware applying the general "api" rate limit to every /api request.
+
+    Requests are keyed by the authenticated user id (from a valid JWT) or,
+    for anonymous requests, by client IP. Most requests are allowed from the
+    limiter's in-process lease; Redis is only called when the lease is spent.
+    """
+
+    API_PREFIX = "/api/"
+    ACTION = "api"
+
+    def __init__(self, app: ASGIApp):
+        super().__init__(app)
+        from backend.core.rate_limiter import get_rate_limiter
+        self.rate_limiter = get_rate_limiter()
+
+    def _get_identifier(self, request: Request) -> str:
+        """User id from a valid bearer token, otherwise the client IP."""
+        auth_header = request.headers.get("Authorization", "")
+        if auth_header.startswith("Bearer "):
+            from backend.core.security import decode_token
+            payload = decode_token(auth_header[7:])
+            if payload and payload.get("user_id") is not None:
+                return f"user:{payload['user_id']}"
+        client_ip = request.client.host if request.client else "unknown"
+        return f"ip:{client_ip}"
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        if request.method == "OPTIONS" or not request.url.path.startswith(self.API_PREFIX):
+            return await call_next(request)
+
+        identifier = self._get_identifier(request)
+        result = self.rate_limiter.check_local(identifier, self.ACTION)
+        if result is None:
+            # Redis round trip: keep it off the event loop
+            result = await run_in_threadpool(self.rate_limiter.check, identifier, self.ACTION)
+
+        if not result.allowed:
+            retry_after = max(1, math.ceil(result.retry_after))
+            return JSONResponse(
+                status_code=429,
+                content={"detail": f"Too many requests. Try again in {retry_after} seconds."},
+                headers={
+                    "Retry-After": str(retry_after),
+                    "X-RateLimit-Limit": str(result.limit),
+                    "X-RateLimit-Remaining": "0",
+                }
+            )
+
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(result.limit)
+        response.headers["X-RateLimit-Remaining"] = str(result.remaining)
+        return response
+
+
+def add_rate_limit_middleware(app):
+    """Add the general API rate limiting middleware to the FastAPI app."""
+    app.add_middleware(RateLimitMiddleware)
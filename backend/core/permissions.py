@@ -22,8 +22,8 @@ Role Hierarchy:
     - user: Limited access (own resources only)
 """
 
-from typing import List, Optional, Union
-from functools import wraps
+from typing import Callable, FrozenSet, Iterable, List, Optional, Tuple, Union
+from functools import lru_cache, wraps
 from fastapi import HTTPException, Depends
 from backend import models
 
@@ -59,6 +59,79 @@ ALL_PERMISSIONS = {
 }
 
 
+# ==================== COMPILED PERMISSION SETS ====================
+# A principal's role and permissions list are compiled once into a frozenset
+# of granted permissions (wildcards and legacy names already expanded), so a
+# check is a single set lookup. Compiled sets are shared between users with
+# the same role and permissions, and memoized on the user instance.
+
+# Granted-everything marker (superadmin/admin)
+ALL_PERMISSIONS_WILDCARD = "*"
+
+# Attribute holding the per-instance memo: {compiler: (role, permissions, compiled)}
+_COMPILED_ATTR = "_compiled_permissions"
+
+PermissionCompiler = Callable[[str, Tuple[str, ...]], FrozenSet[str]]
+
+
+def _tech_has_permission(permissions: Iterable[str], permission: str) -> bool:
+    """Reference check for tech users: direct, module admin and legacy names."""
+    if permission in permissions:
+        return True
+
+    # Check for admin permission in the same module
+    # e.g., "tickets:admin" grants all "tickets:*" permissions
+    module = permission.split(":")[0]
+    if f"{module}:admin" in permissions:
+        return True
+
+    # Legacy permission format support (e.g., "tickets_admin" -> "tickets:admin")
+    if permission.replace(":", "_") in permissions:
+        return True
+
+    return f"{module}_admin" in permissions
+
+
+@lru_cache(maxsize=1024)
+def compile_permissions(role: str, permissions: Tuple[str, ...]) -> FrozenSet[str]:
+    """
+    Compile a role and permissions list into the set of granted permissions.
+
+    Every known permission (ALL_PERMISSIONS) that the wildcard and legacy
+    rules grant is included, along with the raw entries.
+    """
+    if role in ("superadmin", "admin"):
+        return frozenset({ALL_PERMISSIONS_WILDCARD})
+    if role != "tech":
+        return frozenset()
+
+    granted = set(permissions)
+    granted.update(perm for perm in ALL_PERMISSIONS if _tech_has_permission(permissions, perm))
+    return frozenset(granted)
+
+
+def get_compiled_permissions(
+    user: models.User,
+    compiler: PermissionCompiler = compile_permissions
+) -> FrozenSet[str]:
+    """
+    Compiled permission set for a user, memoized on the instance.
+
+    The memo is rebuilt whenever the user's role or permissions list changes.
+    """
+    memo = user.__dict__.get(_COMPILED_ATTR)
+    if memo is None:
+        memo = {}
+        setattr(user, _COMPILED_ATTR, memo)
+
+    role, permissions = user.role, user.permissions
+    entry = memo.get(compiler)
+    if entry is None or entry[0] != role or entry[1] is not permissions:
+        entry = (role, permissions, compiler(role, tuple(permissions or ())))
+        memo[compiler] = entry
+    return entry[2]
+
+
 # ==================== PERMISSION CHECKING FUNCTIONS ====================
 
 def has_permission(user: models.User, permission: str) -> bool:
@@ -76,43 +149,21 @@ def has_permission(user: models.User, permission: str) -> bool:
         - superadmin and admin roles bypass all permission checks
         - For tech users, checks the permissions JSONB array
         - Supports wildcard admin permissions (e.g., "tickets:admin" grants all tickets:* permissions)
+        - Uses the user's compiled permission set; permissions outside
+          ALL_PERMISSIONS fall back to evaluating the rules directly
     """
     if not user:
         return False
 
-    # Superadmin and admin bypass all permission checks
-    if user.role in ("superadmin", "admin"):
+    granted = get_compiled_permissions(user)
+    if permission in granted or ALL_PERMISSIONS_WILDCARD in granted:
         return True
 
-    # Regular users have no granular permissions
-    if user.role == "user":
+    # Compiled sets are exhaustive for known permissions
+    if permission in ALL_PERMISSIONS or user.role != "tech":
         return False
 
-    # Tech users - check permissions array
-    if user.role == "tech":
-        permissions = user.permissions or []
-
-        # Direct permission check
-        if permission in permissions:
-            return True
-
-        # Check for admin permission in the same module
-        # e.g., "tickets:admin" grants all "tickets:*" permissions
-        module = permission.split(":")[0]
-        admin_permission = f"{module}:admin"
-        if admin_permission in permissions:
-            return True
-
-        # Legacy permission format support (e.g., "tickets_admin" -> "tickets:admin")
-        legacy_permission = permission.replace(":", "_")
-        if legacy_permission in permissions:
-            return True
-
-        legacy_admin = f"{module}_admin"
-        if legacy_admin in permissions:
-            return True
-
-    return False
+    return _tech_has_permission(user.permissions or [], permission)
 
 
 def has_any_permission(user: models.User, permissions: List[str]) -> bool:
@@ -0,0 +1,241 @@
+"""
+Authenticated principal cache.
+
+``get_current_user`` resolves the JWT subject to a user on every request.
+The user's non-secret columns are cached in two tiers, keyed by user id:
+
+- an in-process LRU with a short TTL (no network round trip at all)
+- Redis, shared by every API worker
+
+On a hit the cached columns are attached to the request session as a
+persistent ``User`` without querying the database. Columns left out of the
+cache (password hash, TOTP secret) are loaded lazily if a route touches them,
+and changes to the instance are flushed as usual.
+
+Entries are invalidated after any committed change to a user row and when a
+user's tokens are revoked. Other API workers drop their local copy within
+``principal_cache_local_ttl`` seconds.
+
+Each user also has a generation counter in Redis, bumped by every
+invalidation. It is read before the user row is loaded, and the entry is
+only stored if the generation is unchanged by then: a request that loaded
+the row just before a concurrent change committed cannot cache the old
+row. Without Redis nothing is cached.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from backend.core.cache import cache_get, get_redis_client
+from backend.core.config import get_settings
+from backend import models
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PRINCIPAL_CACHE_PREFIX = "principal"
+PRINCIPAL_GENERATION_PREFIX = "principal:gen"
+# Outlives any cached entry and any in-flight load
+PRINCIPAL_GENERATION_TTL = 86400
+
+# Stores an entry only if the user's generation is still ARGV[1]
+CACHE_IF_CURRENT_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+# User columns cached (never secrets: they would end up in Redis)
+PRINCIPAL_FIELDS = (
+    "id", "username", "email", "is_active", "role", "avatar",
+    "entity_id", "created_at", "mfa_enabled", "permissions",
+)
+
+
+class _LocalLRU:
+    """Small thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: int, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: int) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_local_cache = _LocalLRU(settings.principal_cache_size, settings.principal_cache_local_ttl)
+
+
+_cache_if_current_script = None
+
+
+def _cache_key(user_id: int) -> str:
+    return f"{PRINCIPAL_CACHE_PREFIX}:{user_id}"
+
+
+def _generation_key(user_id: int) -> str:
+    return f"{PRINCIPAL_GENERATION_PREFIX}:{user_id}"
+
+
+def _snapshot(user: models.User) -> Dict[str, Any]:
+    data = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+    if isinstance(data["created_at"], datetime):
+        data["created_at"] = data["created_at"].isoformat()
+    data["permissions"] = list(data["permissions"] or [])
+    return data
+
+
+def get_cached_principal(user_id: int) -> Optional[Dict[str, Any]]:
+    """Cached principal columns for a user, or None on a miss."""
+    data = _local_cache.get(user_id)
+    if data is not None:
+        return data
+
+    data = cache_get(_cache_key(user_id))
+    if data is not None:
+        _local_cache.set(user_id, data)
+    return data
+
+
+def principal_generation(user_id: int) -> Optional[str]:
+    """
+    The user's cache generation, to read before loading the user row and
+    pass to cache_principal. None if Redis is unavailable.
+    """
+    client = get_redis_client()
+    if not client:
+        return None
+    try:
+        return client.get(_generation_key(user_id)) or "0"
+    except Exception as e:
+        logger.warning(f"Principal generation read failed for user_id={user_id}: {e}")
+        return None
+
+
+def cache_principal(user: models.User, generation: Optional[str]) -> bool:
+    """
+    Store a freshly loaded user in both cache tiers, unless it was
+    invalidated since ``generation`` was read (the row may be stale).
+
+    Returns True if the user was cached.
+    """
+    global _cache_if_current_script
+
+    client = get_redis_client()
+    if generation is None or not client:
+        return False
+
+    data = _snapshot(user)
+    try:
+        if _cache_if_current_script is None:
+            _cache_if_current_script = client.register_script(CACHE_IF_CURRENT_SCRIPT)
+        stored = _cache_if_current_script(
+            keys=[_generation_key(user.id), _cache_key(user.id)],
+            args=[generation, json.dumps(data, default=str), settings.principal_cache_ttl]
+        )
+    except Exception as e:
+        logger.warning(f"Principal cache write failed for user_id={user.id}: {e}")
+        return False
+
+    if int(stored) != 1:
+        return False
+    _local_cache.set(user.id, data)
+    return True
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Drop a user from the cache (this process and Redis) and bump its generation."""
+    _local_cache.discard(user_id)
+    client = get_redis_client()
+    if not client:
+        return
+    try:
+        pipe = client.pipeline()
+        pipe.incr(_generation_key(user_id))
+        pipe.expire(_generation_key(user_id), PRINCIPAL_GENERATION_TTL)
+        pipe.delete(_cache_key(user_id))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Principal cache invalidation failed for user_id={user_id}: {e}")
+
+
+def attach_principal(db: Session, data: Dict[str, Any]) -> models.User:
+    """
+    Build a persistent ``User`` in ``db`` from cached columns, without a query.
+
+    Uncached columns are expired and load on first access.
+    """
+    values = dict(data)
+    if isinstance(values.get("created_at"), str):
+        values["created_at"] = datetime.fromisoformat(values["created_at"])
+
+    user = models.User(**values)
+    make_transient_to_detached(user)
+    # Reuses the instance already in the session, if any
+    return db.merge(user, load=False)
+
+
+# ==================== INVALIDATION HOOKS ====================
+# User ids changed in a session are collected at flush time and invalidated
+# once the transaction commits, so a concurrent request cannot re-cache the
+# old row after the invalidation.
+
+_PENDING_KEY = "principal_cache_invalidate"
+
+
+def _mark_user_changed(mapper, connection, target) -> None:
+    session = Session.object_session(target)
+    if session is not None and target.id is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+
+event.listen(models.User, "after_update", _mark_user_changed)
+event.listen(models.User, "after_delete", _mark_user_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session) -> None:
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        try:
+            invalidate_principal(user_id)
+        except Exception as e:
+            logger.warning(f"Principal cache invalidation failed for user_id={user_id}: {e}")
+
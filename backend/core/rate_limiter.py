@@ -3,19 +3,124 @@ Distributed Rate Limiter using Redis.
 Works across multiple workers/processes.
 """
 import redis
+import math
+import threading
 import time
 import logging
-from typing import Optional
+from typing import Dict, NamedTuple, Optional, Tuple
 from backend.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+# GCRA (generic cell rate algorithm): one "theoretical arrival time" (TAT) per
+# key, in milliseconds. Each request pushes the TAT forward by the emission
+# interval (window / limit); a request is allowed while the TAT stays within
+# one window of now. Up to ARGV[3] requests are granted at once (local leases).
+#
+# Returns {granted, remaining, retry_after_ms, reset_after_ms}
+GCRA_ACQUIRE_SCRIPT = """
+local key = KEYS[1]
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local tat = tonumber(redis.call('GET', key))
+if not tat or tat < now then
+    tat = now
+end
+
+local available = math.floor((window - (tat - now)) / interval)
+if available < 1 then
+    local retry_after = tat + interval - window - now
+    return {0, 0, retry_after, tat - now}
+end
+
+local granted = math.min(requested, available)
+tat = tat + granted * interval
+redis.call('SET', key, tat, 'PX', math.ceil(tat - now))
+return {granted, available - granted, 0, tat - now}
+"""
+
+# Read-only view of the same state. Returns {remaining, reset_after_ms}
+GCRA_PEEK_SCRIPT = """
+local key = KEYS[1]
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local tat = tonumber(redis.call('GET', key))
+if not tat or tat < now then
+    tat = now
+end
+return {math.floor((window - (tat - now)) / interval), tat - now}
+"""
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate limit check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # Seconds until the next request can be allowed (0 if allowed)
+
+
+class _LocalLeases:
+    """
+    In-process pre-limiter.
+
+    Requests are granted from Redis in small batches ("leases"); the rest of
+    a batch is spent locally without a Redis round trip. Near the limit Redis
+    grants less than a full batch, so traffic close to the limit is checked
+    against Redis on (almost) every request.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._leases: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str) -> Optional[int]:
+        """Spend one leased request; returns the leased requests left, or None."""
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is None:
+                return None
+            tokens, expires_at = lease
+            if expires_at < time.monotonic():
+                del self._leases[key]
+                return None
+            if tokens <= 1:
+                del self._leases[key]
+            else:
+                self._leases[key] = (tokens - 1, expires_at)
+            return tokens - 1
+
+    def grant(self, key: str, tokens: int, ttl: float) -> None:
+        """Store leased requests (already charged in Redis)."""
+        if tokens <= 0:
+            return
+        with self._lock:
+            if len(self._leases) >= self.max_keys:
+                # Dropping a lease only forfeits requests already counted in Redis
+                self._leases.clear()
+            self._leases[key] = (tokens, time.monotonic() + ttl)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._leases.pop(key, None)
+
+
 class RedisRateLimiter:
     """
     Distributed rate limiter using Redis.
-    Implements sliding window algorithm.
+    Implements GCRA with O(1) state per key; scripts run via EVALSHA.
     """
 
     # Action-specific rate limits (max_requests, window_size in seconds)
@@ -23,12 +128,21 @@ class RedisRateLimiter:
         "login": (5, 60),           # 5 requests per minute (brute force protection)
         "mfa": (5, 60),             # 5 MFA attempts per minute
         "settings_update": (50, 60), # 50 settings updates per minute (batch saves)
-        "api": (100, 60),           # 100 API calls per minute
+        "api": (settings.api_rate_limit_max_requests, 60),  # General API calls per minute
+    }
+
+    # Requests leased to the local pre-limiter per Redis call. Actions not
+    # listed are always checked against Redis (exact; used for security limits).
+    ACTION_LEASES = {
+        "api": settings.api_rate_limit_lease_size,
     }
 
     def __init__(self, redis_url: Optional[str] = None):
         self.redis_url = redis_url or settings.redis_url
         self._client: Optional[redis.Redis] = None
+        self._acquire_script = None
+        self._peek_script = None
+        self._leases = _LocalLeases()
         self.default_window_size = settings.rate_limit_window
         self.default_max_requests = settings.rate_limit_max_requests
 
@@ -44,6 +158,18 @@ class RedisRateLimiter:
             )
         return self._client
 
+    def _scripts(self) -> tuple:
+        """
+        Registered (acquire, peek) scripts.
+
+        Script objects call EVALSHA and only load the script (SCRIPT LOAD)
+        when Redis does not know it yet, e.g. after a Redis restart.
+        """
+        if self._acquire_script is None:
+            self._acquire_script = self.client.register_script(GCRA_ACQUIRE_SCRIPT)
+            self._peek_script = self.client.register_script(GCRA_PEEK_SCRIPT)
+        return self._acquire_script, self._peek_script
+
     def _get_key(self, identifier: str, action: str = "login") -> str:
         """Generate Redis key for rate limiting."""
         return f"rate_limit:{action}:{identifier}"
@@ -54,91 +180,94 @@ class RedisRateLimiter:
             return self.ACTION_LIMITS[action]
         return (self.default_max_requests, self.default_window_size)
 
-    def is_allowed(self, identifier: str, action: str = "login") -> bool:
+    @staticmethod
+    def _gcra_args(max_requests: int, window_size: int) -> Tuple[float, int]:
+        """Emission interval and window, in milliseconds."""
+        window_ms = window_size * 1000
+        return window_ms / max_requests, window_ms
+
+    def check_local(self, identifier: str, action: str = "api") -> Optional[RateLimitResult]:
         """
-        Check if a request is allowed under rate limit.
+        Allow a request from this process's lease without touching Redis.
 
-        Uses atomic Lua script to prevent TOCTOU race conditions.
+        Returns None when there is no lease left; call ``check`` then.
+        """
+        if self.ACTION_LEASES.get(action, 1) <= 1:
+            return None
+        left = self._leases.take(self._get_key(identifier, action))
+        if left is None:
+            return None
+        max_requests, _ = self._get_limits(action)
+        return RateLimitResult(True, max_requests, left, 0.0)
+
+    def check(self, identifier: str, action: str = "login") -> RateLimitResult:
+        """
+        Count a request and report whether it is allowed.
 
         Args:
             identifier: Unique identifier (e.g., IP address, user ID)
             action: Action being rate limited (e.g., "login", "api")
-
-        Returns:
-            True if request is allowed, False if rate limited
         """
         max_requests, window_size = self._get_limits(action)
         key = self._get_key(identifier, action)
-        current_time = time.time()
-        window_start = current_time - window_size
-
-        # Lua script for atomic rate limiting (prevents TOCTOU race condition)
-        # 1. Remove old entries
-        # 2. Add current request
-        # 3. Count entries AFTER adding (atomic check)
-        # 4. Set expiry
-        # Returns the count AFTER adding the new request
-        lua_script = """
-        local key = KEYS[1]
-        local window_start = tonumber(ARGV[1])
-        local current_time = tonumber(ARGV[2])
-        local max_requests = tonumber(ARGV[3])
-        local window_size = tonumber(ARGV[4])
-
-        -- Remove old entries outside the window
-        redis.call('ZREMRANGEBYSCORE', key, 0, window_start)
-
-        -- Add current request with timestamp as score
-        redis.call('ZADD', key, current_time, tostring(current_time))
-
-        -- Count AFTER adding (atomic)
-        local count = redis.call('ZCARD', key)
-
-        -- Set expiry
-        redis.call('EXPIRE', key, window_size + 10)
-
-        return count
-        """
+        lease_size = self.ACTION_LEASES.get(action, 1)
 
+        local = self.check_local(identifier, action)
+        if local is not None:
+            return local
+
+        interval, window_ms = self._gcra_args(max_requests, window_size)
         try:
-            # Execute atomic Lua script
-            current_count = self.client.eval(
-                lua_script,
-                1,  # Number of keys
-                key,  # KEYS[1]
-                window_start,  # ARGV[1]
-                current_time,  # ARGV[2]
-                max_requests,  # ARGV[3]
-                window_size   # ARGV[4]
+            acquire, _ = self._scripts()
+            granted, remaining, retry_after_ms, _ = acquire(
+                keys=[key], args=[interval, window_ms, lease_size]
             )
-
-            if current_count > max_requests:
-                logger.warning(f"Rate limit exceeded for {identifier} on {action}")
-                return False
-
-            return True
-
         except redis.RedisError as e:
             logger.error(f"Redis error in rate limiter: {e}")
             # Fail open - allow request if Redis is unavailable
-            return True
+            return RateLimitResult(True, max_requests, max_requests, 0.0)
 
-    def get_remaining(self, identifier: str, action: str = "login") -> int:
-        """Get remaining requests in current window."""
+        granted = int(granted)
+        if granted < 1:
+            logger.warning(f"Rate limit exceeded for {identifier} on {action}")
+            return RateLimitResult(False, max_requests, 0, max(0.0, float(retry_after_ms) / 1000))
+
+        # Keep the unspent part of the batch for this process (already
+        # counted in Redis) for at most one window
+        self._leases.grant(key, granted - 1, window_size)
+        return RateLimitResult(True, max_requests, int(remaining) + granted - 1, 0.0)
+
+    def is_allowed(self, identifier: str, action: str = "login") -> bool:
+        """
+        Check if a request is allowed under rate limit.
+
+        Uses an atomic Lua script (GCRA) to prevent TOCTOU race conditions.
+
+        Args:
+            identifier: Unique identifier (e.g., IP address, user ID)
+            action: Action being rate limited (e.g., "login", "api")
+
+        Returns:
+            True if request is allowed, False if rate limited
+        """
+        return self.check(identifier, action).allowed
+
+    def _peek(self, identifier: str, action: str) -> Tuple[int, float]:
+        """Remaining requests and seconds until the key is fully reset."""
         max_requests, window_size = self._get_limits(action)
-        key = self._get_key(identifier, action)
-        current_time = time.time()
-        window_start = current_time - window_size
+        interval, window_ms = self._gcra_args(max_requests, window_size)
+        _, peek = self._scripts()
+        remaining, reset_after_ms = peek(
+            keys=[self._get_key(identifier, action)], args=[interval, window_ms]
+        )
+        return int(remaining), float(reset_after_ms) / 1000
 
+    def get_remaining(self, identifier: str, action: str = "login") -> int:
+        """Get remaining requests in current window."""
+        max_requests, _ = self._get_limits(action)
         try:
-            # Clean old entries and count
-            pipe = self.client.pipeline()
-            pipe.zremrangebyscore(key, 0, window_start)
-            pipe.zcard(key)
-            results = pipe.execute()
-            current_count = results[1]
-
-            return max(0, max_requests - current_count)
+            remaining, _ = self._peek(identifier, action)
+            return max(0, min(max_requests, remaining))
 
         except redis.RedisError as e:
             logger.error(f"Redis error getting remaining: {e}")
@@ -147,16 +276,9 @@ class RedisRateLimiter:
     def get_reset_time(self, identifier: str, action: str = "login") -> int:
         """Get seconds until rate limit resets."""
         _, window_size = self._get_limits(action)
-        key = self._get_key(identifier, action)
-
         try:
-            # Get oldest entry in window
-            oldest = self.client.zrange(key, 0, 0, withscores=True)
-            if oldest:
-                oldest_time = oldest[0][1]
-                reset_time = int(oldest_time + window_size - time.time())
-                return max(0, reset_time)
-            return 0
+            _, reset_after = self._peek(identifier, action)
+            return max(0, math.ceil(reset_after))
 
         except redis.RedisError as e:
             logger.error(f"Redis error getting reset time: {e}")
@@ -165,6 +287,7 @@ class RedisRateLimiter:
     def reset(self, identifier: str, action: str = "login") -> bool:
         """Reset rate limit for an identifier."""
         key = self._get_key(identifier, action)
+        self._leases.discard(key)
         try:
             self.client.delete(key)
             return True
@@ -2,7 +2,8 @@
 Security utilities: JWT, password hashing, encryption, and refresh tokens.
 """
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Tuple
+from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
 import secrets
 import hashlib
 import re
@@ -17,6 +18,14 @@ import pyotp
 
 from backend.core.config import get_settings
 from backend.core.database import get_db
+from backend.core.permissions import ALL_PERMISSIONS_WILDCARD, get_compiled_permissions
+from backend.core.principal_cache import (
+    attach_principal,
+    cache_principal,
+    get_cached_principal,
+    invalidate_principal,
+    principal_generation,
+)
 from backend import models
 
 logger = logging.getLogger(__name__)
@@ -180,10 +189,22 @@ def get_current_user(
     if username is None:
         raise credentials_exception
 
+    # Cached principal: no database query (tokens carry the user id)
+    user_id = payload.get("user_id")
+    generation = None
+    if user_id is not None:
+        cached = get_cached_principal(user_id)
+        if cached is not None and cached.get("username") == username:
+            return attach_principal(db, cached)
+        # Read before loading the row, so a change committed meanwhile is detected
+        generation = principal_generation(user_id)
+
     user = db.query(models.User).filter(models.User.username == username).first()
     if user is None:
         raise credentials_exception
 
+    if user.id == user_id:
+        cache_principal(user, generation)
     return user
 
 
@@ -252,29 +273,38 @@ def has_role_or_higher(user: models.User, required_role: str) -> bool:
     return user_level >= required_level
 
 
-def has_permission(user: models.User, permission: str) -> bool:
+@lru_cache(maxsize=1024)
+def compile_module_permissions(role: str, permissions: Tuple[str, ...]) -> FrozenSet[str]:
     """
-    Check if user has a specific permission.
+    Compile a role and permissions list into the set of granted module permissions.
 
-    - superadmin: Always has all permissions
+    - superadmin: Always has all permissions (wildcard)
     - admin: Has all permissions except scripts and system settings
     - tech: Has permissions defined in their permissions list
     - user: No granular permissions (helpdesk only)
     """
-    # Superadmin has all permissions
-    if user.role == "superadmin":
-        return True
+    if role == "superadmin":
+        return frozenset({ALL_PERMISSIONS_WILDCARD})
+    if role == "admin":
+        return frozenset(AVAILABLE_PERMISSIONS)
+    if role == "tech":
+        return frozenset(permissions)
+    return frozenset()
 
-    # Admin has all permissions except scripts (handled separately)
-    if user.role == "admin":
-        return permission in AVAILABLE_PERMISSIONS
 
-    # Tech has only their assigned permissions
-    if user.role == "tech":
-        return permission in (user.permissions or [])
+def has_permission(user: models.User, permission: str) -> bool:
+    """
+    Check if user has a specific permission.
 
-    # Regular users have no granular permissions
-    return False
+    - superadmin: Always has all permissions
+    - admin: Has all permissions except scripts and system settings
+    - tech: Has permissions defined in their permissions list
+    - user: No granular permissions (helpdesk only)
+
+    Uses the user's compiled permission set (see compile_module_permissions).
+    """
+    granted = get_compiled_permissions(user, compile_module_permissions)
+    return permission in granted or ALL_PERMISSIONS_WILDCARD in granted
 
 
 def raise_permission_denied(permission: str, action: str = "access this resource"):
@@ -521,6 +551,7 @@ def revoke_all_user_tokens(db: Session, user_id: int) -> int:
         models.UserToken.revoked == False
     ).update({"revoked": True})
     db.commit()
+    invalidate_principal(user_id)
     logger.info(f"Revoked {result} refresh tokens for user_id={user_id}")
     return result
 
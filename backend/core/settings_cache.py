@@ -0,0 +1,125 @@
+"""
+System settings cache.
+
+All settings are loaded in one query and kept in memory with sensitive
+values already decrypted. A version number in Redis is bumped whenever a
+setting changes; each process (API worker or Celery worker) compares it
+with the version it loaded, at most every SETTINGS_VERSION_CHECK_INTERVAL
+seconds, and reloads when it differs.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.core.cache import get_redis_client
+from backend import models
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_VERSION_KEY = "settings:version"
+# Seconds between Redis version checks (bounds staleness across processes)
+SETTINGS_VERSION_CHECK_INTERVAL = 1.0
+# Reload interval when Redis is unavailable and versions cannot be compared
+SETTINGS_FALLBACK_TTL = 30.0
+
+# Stored for sensitive values that cannot be decrypted (callers get their default)
+_UNREADABLE = object()
+
+
+class SettingsCache:
+    """In-process copy of system_settings, validated against a Redis version stamp."""
+
+    def __init__(self):
+        self._values: Optional[Dict[str, object]] = None
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_version() -> Optional[int]:
+        client = get_redis_client()
+        if not client:
+            return None
+        try:
+            return int(client.get(SETTINGS_VERSION_KEY) or 0)
+        except Exception as e:
+            logger.warning(f"Settings cache version check failed: {e}")
+            return None
+
+    @staticmethod
+    def _load(db: Session) -> Dict[str, object]:
+        """Load every setting in one query, decrypting sensitive values."""
+        from backend.core.security import decrypt_value
+
+        values: Dict[str, object] = {}
+        rows = db.query(
+            models.SystemSettings.key,
+            models.SystemSettings.value,
+            models.SystemSettings.is_sensitive
+        ).all()
+        for key, value, is_sensitive in rows:
+            if is_sensitive and value:
+                try:
+                    value = decrypt_value(value)
+                except Exception:
+                    logger.warning(f"Could not decrypt setting '{key}'")
+                    value = _UNREADABLE
+            values[key] = value
+        return values
+
+    def _is_stale(self) -> bool:
+        now = time.monotonic()
+        if self._values is None:
+            return True
+        if now - self._checked_at < SETTINGS_VERSION_CHECK_INTERVAL:
+            return False
+
+        self._checked_at = now
+        version = self._read_version()
+        if version is None:
+            return now - self._loaded_at >= SETTINGS_FALLBACK_TTL
+        return version != self._version
+
+    def get(self, db: Session, key: str, default: str = None) -> Optional[str]:
+        """Get a setting value, reloading all settings if they changed."""
+        with self._lock:
+            if self._is_stale():
+                # Read the version first: a change committed during the load
+                # bumps it again and triggers another reload
+                version = self._read_version()
+                self._values = self._load(db)
+                self._version = version
+                self._loaded_at = self._checked_at = time.monotonic()
+            values = self._values
+
+        if key not in values:
+            return default
+        value = values[key]
+        if value is _UNREADABLE:
+            return default
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values = None
+
+
+settings_cache = SettingsCache()
+
+
+def invalidate_settings_cache() -> None:
+    """
+    Drop cached settings in this process and bump the shared version so
+    every other process reloads. Call after committing a settings change.
+    """
+    settings_cache.clear()
+    client = get_redis_client()
+    if client:
+        try:
+            client.incr(SETTINGS_VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"Settings cache invalidation failed: {e}")
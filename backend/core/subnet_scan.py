@@ -0,0 +1,401 @@
+"""
+Subnet scan helpers.
+
+Hosts are discovered with nmap or, per subnet, the built-in asyncio
+scanner of backend.core.host_discovery. Scan results are applied in bulk:
+discovered hosts are upserted with INSERT ... ON CONFLICT (subnet_id,
+address) DO UPDATE, UPSERT_BATCH_SIZE rows per statement, and hosts that
+did not answer are marked available with a single UPDATE based on
+``last_scanned_at``.
+
+Large subnets are split into shards of SCAN_CHUNK_PREFIX (a /24 by
+default) that run in parallel on the "scans" queue, at most
+SCAN_SITE_CONCURRENCY at a time per site (the subnet's entity). Each
+shard's state is kept in a Redis hash per subnet and the number of shards
+done is counted on the subnet, so an interrupted scan resumes with the
+shards that did not finish.
+
+Subnets with a ``scan_interval_minutes`` are scanned on schedule. With
+``rescan_after_minutes`` those scans are incremental: addresses checked
+more recently than that are skipped. Scans record what changed (new host,
+host gone, MAC or hostname changed) in ip_address_changes, in bulk.
+"""
+import ipaddress
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import cast, func, insert, or_, text
+from sqlalchemy.dialects.postgresql import INET, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.core.cache import get_redis_client
+from backend.core.host_discovery import ScanResult, native_discover, parse_probe_ports
+
+logger = logging.getLogger(__name__)
+
+# Prefix length of the blocks a large subnet is scanned in
+SCAN_CHUNK_PREFIX = int(os.environ.get("SCAN_CHUNK_PREFIX", "24"))
+# An interrupted scan resumes from its checkpoint within this many seconds
+SCAN_RESUME_WINDOW = int(os.environ.get("SCAN_RESUME_WINDOW", "86400"))
+# Shards scanned at the same time per site, across all scan workers
+SCAN_SITE_CONCURRENCY = int(os.environ.get("SCAN_SITE_CONCURRENCY", "4"))
+# A shard's site slot frees itself after this long if its worker died
+SCAN_SHARD_LEASE = int(os.environ.get("SCAN_SHARD_LEASE", "3600"))
+# Seconds before a shard waiting for a site slot tries again
+SCAN_SLOT_RETRY_DELAY = 30
+SCAN_PROGRESS_PREFIX = "scan:progress:"
+# Rows per INSERT ... ON CONFLICT statement
+UPSERT_BATCH_SIZE = 1000
+
+NMAP_DISCOVERY_ARGUMENTS = "-sn -PR -R --max-retries 2"
+
+# ip_address_changes.change_type values
+CHANGE_NEW_HOST = "new_host"
+CHANGE_HOST_GONE = "host_gone"
+CHANGE_MAC = "mac_changed"
+CHANGE_HOSTNAME = "hostname_changed"
+
+# Subnet.scan_engine values: nmap, or the built-in asyncio scanner (host_discovery)
+SCAN_ENGINES = ("nmap", "native")
+
+
+def utc_now_naive() -> datetime:
+    """Current UTC time for comparisons with naive DateTime columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def scan_chunks(network, prefix: int = SCAN_CHUNK_PREFIX) -> List[str]:
+    """Split a network into CIDR blocks of ``prefix`` (the network itself if smaller)."""
+    if network.version != 4 or network.prefixlen >= prefix:
+        return [str(network)]
+    return [str(block) for block in network.subnets(new_prefix=prefix)]
+
+
+def site_slot_key(entity_id: Optional[int]) -> str:
+    """Redis key of the concurrency slots of a site (subnets without entity share one)."""
+    return f"scan:site:{entity_id or 'global'}"
+
+
+def _progress_key(subnet_id: int) -> str:
+    return f"{SCAN_PROGRESS_PREFIX}{subnet_id}"
+
+
+def reset_scan_progress(subnet_id: int, shards: List[str]) -> None:
+    """Start tracking a new scan: every shard pending."""
+    client = get_redis_client()
+    if not client:
+        return
+    pending = json.dumps({"state": "pending"})
+    try:
+        pipe = client.pipeline()
+        pipe.delete(_progress_key(subnet_id))
+        pipe.hset(_progress_key(subnet_id), mapping={shard: pending for shard in shards})
+        pipe.expire(_progress_key(subnet_id), SCAN_RESUME_WINDOW)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not reset scan progress of subnet {subnet_id}: {e}")
+
+
+def record_shard_progress(subnet_id: int, shard: str, state: str, **info) -> None:
+    """
+    Record a shard's state (pending, waiting, running, done, failed) and
+    details such as host counts or the error.
+    """
+    client = get_redis_client()
+    if not client:
+        return
+    try:
+        client.hset(_progress_key(subnet_id), shard, json.dumps({"state": state, **info}))
+    except Exception as e:
+        logger.warning(f"Could not record scan progress of subnet {subnet_id}: {e}")
+
+
+def get_scan_progress(subnet_id: int) -> Dict[str, dict]:
+    """State of each shard of the subnet's current (or last) scan."""
+    client = get_redis_client()
+    if not client:
+        return {}
+    try:
+        progress = client.hgetall(_progress_key(subnet_id))
+    except Exception as e:
+        logger.warning(f"Could not read scan progress of subnet {subnet_id}: {e}")
+        return {}
+    return {shard: json.loads(value) for shard, value in progress.items()}
+
+
+def nmap_discover(cidr: str) -> List[ScanResult]:
+    """
+    Ping-scan a CIDR block with nmap (ARP on local networks, reverse DNS).
+
+    Raises nmap.PortScannerError when nmap fails or lacks privileges.
+    """
+    import nmap
+
+    nm = nmap.PortScanner()
+    nm.scan(hosts=cidr, arguments=NMAP_DISCOVERY_ARGUMENTS)
+
+    results = []
+    for host in nm.all_hosts():
+        mac = None
+        if 'addresses' in nm[host] and 'mac' in nm[host]['addresses']:
+            mac = nm[host]['addresses']['mac']
+        results.append(ScanResult(
+            address=host,
+            status='active' if nm[host].state() == 'up' else 'available',
+            hostname=nm[host].hostname() or None,
+            mac_address=mac
+        ))
+    return results
+
+
+def discover(
+    subnet: models.Subnet,
+    cidr: str,
+    addresses: Optional[List[str]] = None
+) -> Iterator[List[ScanResult]]:
+    """
+    Hosts of a block of the subnet, in batches, from the subnet's scan engine.
+
+    The native engine yields batches while it is still probing; nmap
+    yields everything once it has finished.
+
+    Args:
+        addresses: Probe only these addresses of the block (incremental scans)
+    """
+    if addresses is not None and not addresses:
+        return iter([])
+    if subnet.scan_engine == "native":
+        return native_discover(
+            cidr, ports=parse_probe_ports(subnet.scan_ports) or None, addresses=addresses
+        )
+    return iter([nmap_discover(" ".join(addresses) if addresses is not None else cidr)])
+
+
+def addresses_to_rescan(db: Session, subnet_id: int, cidr: str, cutoff: datetime) -> List[str]:
+    """Addresses of a block not checked since ``cutoff`` (never seen ones included)."""
+    IPAddress = models.IPAddress
+    fresh = {
+        str(address) for (address,) in db.query(IPAddress.address).filter(
+            IPAddress.subnet_id == subnet_id,
+            IPAddress.last_scanned_at >= cutoff,
+            IPAddress.address.op("<<=")(cast(cidr, INET))
+        )
+    }
+    network = ipaddress.ip_network(cidr, strict=False)
+    hosts = list(network.hosts()) or [network.network_address]
+    return [str(host) for host in hosts if str(host) not in fresh]
+
+
+def _detect_changes(previous: Optional[tuple], result: ScanResult) -> List[tuple]:
+    """(change_type, old_value, new_value) of a host between two scans."""
+    was_active = previous is not None and previous.status == "active"
+    if result.status != "active":
+        return [(CHANGE_HOST_GONE, previous.hostname, None)] if was_active else []
+    if previous is None or previous.status == "available":
+        return [(CHANGE_NEW_HOST, None, result.mac_address or result.hostname)]
+
+    changes = []
+    if (
+        previous.mac_address and result.mac_address
+        and previous.mac_address.upper() != result.mac_address.upper()
+    ):
+        changes.append((CHANGE_MAC, previous.mac_address, result.mac_address))
+    if (
+        previous.hostname and result.hostname
+        and previous.hostname.lower() != result.hostname.lower()
+    ):
+        changes.append((CHANGE_HOSTNAME, previous.hostname, result.hostname))
+    return changes
+
+
+def upsert_scan_results(
+    db: Session,
+    subnet_id: int,
+    results: Iterable[ScanResult],
+    scanned_at: datetime
+) -> int:
+    """
+    Insert or update scanned hosts of a subnet in batches.
+
+    Known hostnames and MAC addresses are kept when the scan found none.
+    Addresses already recorded under another subnet are skipped. Changes
+    against the previous state of each address are added to
+    ip_address_changes.
+
+    Returns:
+        Number of rows written
+    """
+    IPAddress = models.IPAddress
+    results = list({result.address: result for result in results}.values())
+    written = 0
+
+    for start in range(0, len(results), UPSERT_BATCH_SIZE):
+        batch = results[start:start + UPSERT_BATCH_SIZE]
+
+        existing = db.query(
+            IPAddress.address, IPAddress.subnet_id, IPAddress.status,
+            IPAddress.mac_address, IPAddress.hostname
+        ).filter(IPAddress.address.in_([result.address for result in batch])).all()
+        # ip_addresses.address is also unique on its own (overlapping subnets)
+        taken = {str(row.address) for row in existing if row.subnet_id != subnet_id}
+        previous = {str(row.address): row for row in existing if row.subnet_id == subnet_id}
+        if taken:
+            logger.warning(f"Scan of subnet {subnet_id}: {len(taken)} addresses belong to another subnet")
+
+        rows = [
+            {
+                "address": result.address,
+                "subnet_id": subnet_id,
+                "status": result.status,
+                "hostname": result.hostname,
+                "mac_address": result.mac_address,
+                "last_scanned_at": scanned_at,
+            }
+            for result in batch if result.address not in taken
+        ]
+        if not rows:
+            continue
+
+        stmt = pg_insert(IPAddress).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IPAddress.subnet_id, IPAddress.address],
+            set_={
+                "status": stmt.excluded.status,
+                "last_scanned_at": stmt.excluded.last_scanned_at,
+                "hostname": func.coalesce(stmt.excluded.hostname, IPAddress.hostname),
+                "mac_address": func.coalesce(stmt.excluded.mac_address, IPAddress.mac_address),
+            }
+        )
+        db.execute(stmt)
+        written += len(rows)
+
+        changes = [
+            {
+                "subnet_id": subnet_id,
+                "address": result.address,
+                "change_type": change_type,
+                "old_value": old_value,
+                "new_value": new_value,
+                "detected_at": scanned_at,
+            }
+            for result in batch if result.address not in taken
+            for change_type, old_value, new_value in _detect_changes(previous.get(result.address), result)
+        ]
+        if changes:
+            db.execute(insert(models.IPAddressChange), changes)
+
+    return written
+
+
+def mark_missing_hosts(
+    db: Session,
+    subnet_id: int,
+    scan_started_at: datetime,
+    within: Optional[str] = None
+) -> int:
+    """
+    Mark active hosts that the scan started at ``scan_started_at`` did not
+    see as available and log them as gone, in one statement.
+
+    For an incremental scan pass its cutoff: hosts checked after it were
+    not probed.
+
+    Args:
+        within: Optional CIDR block to limit the update to (a scan chunk)
+
+    Returns:
+        Number of hosts marked available
+    """
+    condition = ""
+    params = {"subnet_id": subnet_id, "scan_started_at": scan_started_at, "now": utc_now_naive()}
+    if within:
+        condition = "AND address <<= CAST(:within AS inet)"
+        params["within"] = within
+    sql = f"""
+        WITH gone AS (
+            UPDATE ip_addresses
+            SET status = 'available', last_scanned_at = :now
+            WHERE subnet_id = :subnet_id
+              AND status = 'active'
+              AND (last_scanned_at IS NULL OR last_scanned_at < :scan_started_at)
+              {condition}
+            RETURNING subnet_id, address, hostname
+        )
+        INSERT INTO ip_address_changes (subnet_id, address, change_type, old_value, detected_at)
+        SELECT subnet_id, address, '{CHANGE_HOST_GONE}', hostname, :now FROM gone
+    """
+    return db.execute(text(sql), params).rowcount
+
+
+def summarize_changes(db: Session, subnet_id: int, since: datetime, limit: int = 100) -> dict:
+    """Counts per change type and the first ``limit`` changes logged since ``since``."""
+    IPAddressChange = models.IPAddressChange
+    since_filter = (IPAddressChange.subnet_id == subnet_id, IPAddressChange.detected_at >= since)
+
+    counts = dict(
+        db.query(IPAddressChange.change_type, func.count(IPAddressChange.id))
+        .filter(*since_filter)
+        .group_by(IPAddressChange.change_type)
+        .all()
+    )
+    changes = db.query(IPAddressChange).filter(*since_filter).order_by(IPAddressChange.id).limit(limit).all()
+    return {
+        "counts": counts,
+        "changes": [
+            {
+                "address": str(change.address),
+                "change_type": change.change_type,
+                "old_value": change.old_value,
+                "new_value": change.new_value,
+            }
+            for change in changes
+        ],
+    }
+
+
+def scan_in_progress(subnet_id: int) -> bool:
+    """True while shards of the subnet's scan are queued or running."""
+    return any(
+        info.get("state") in ("pending", "waiting", "running")
+        for info in get_scan_progress(subnet_id).values()
+    )
+
+
+def find_due_subnets(db: Session, now: datetime) -> List[models.Subnet]:
+    """Subnets whose scan interval has passed since their last scan started."""
+    Subnet = models.Subnet
+    return db.query(Subnet).filter(
+        Subnet.scan_interval_minutes > 0,
+        or_(
+            Subnet.scan_started_at.is_(None),
+            Subnet.scan_started_at + func.make_interval(0, 0, 0, 0, 0, Subnet.scan_interval_minutes) <= now
+        )
+    ).all()
+
+
+def claim_scheduled_scan(subnet: models.Subnet) -> bool:
+    """
+    Reserve the subnet's scheduled scan for one interval, so a scan still
+    waiting in the queue is not dispatched again (True without Redis).
+    """
+    client = get_redis_client()
+    if not client:
+        return True
+    try:
+        return bool(client.set(
+            f"scan:scheduled:{subnet.id}", "1", nx=True, ex=subnet.scan_interval_minutes * 60
+        ))
+    except Exception as e:
+        logger.warning(f"Could not claim scheduled scan of subnet {subnet.id}: {e}")
+        return True
+
+
+def rescan_cutoff(subnet: models.Subnet, now: datetime) -> Optional[datetime]:
+    """Cutoff of an incremental scan of the subnet (None: scan every address)."""
+    if not subnet.rescan_after_minutes:
+        return None
+    return now - timedelta(minutes=subnet.rescan_after_minutes)
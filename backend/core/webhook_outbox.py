@@ -0,0 +1,675 @@
+"""
+Webhook outbox.
+
+Events are not delivered from the request that triggers them. Instead one
+``WebhookOutbox`` row per subscribed webhook is added to the caller's
+session, so it is committed (or rolled back) together with the change that
+produced the event. Once the transaction commits, a delivery task is queued
+for each row on the dedicated "webhooks" Celery queue.
+
+Delivery is at-least-once:
+
+- a row is claimed with a lease before the HTTP call; if the worker dies,
+  the lease expires and the row is picked up again
+- failed attempts are rescheduled with a Celery ETA (exponential backoff)
+  rather than sleeping in the worker
+- ``find_due_outbox_events`` (run periodically) re-queues rows whose task
+  message was lost, e.g. when the broker was unavailable at commit time
+
+Receivers should de-duplicate on the ``X-Webhook-Delivery`` header (the
+outbox id), which is identical for every attempt of the same event.
+
+Per webhook, delivery is further shaped by a circuit breaker (stop calling
+a receiver that keeps failing), a cap on in-flight requests across all
+workers, and optional batching of several events into one POST.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from sqlalchemy import and_, event, func, or_, select, update
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import Session
+
+from backend.core.cache import acquire_slot, release_slot
+from backend import models
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_PENDING = "pending"
+OUTBOX_PROCESSING = "processing"
+OUTBOX_DELIVERED = "delivered"
+OUTBOX_FAILED = "failed"
+
+# Retry backoff: base * 2^(attempt-1) seconds, capped, with up to 10% jitter
+WEBHOOK_RETRY_BASE_DELAY = 10
+WEBHOOK_RETRY_MAX_DELAY = 3600
+# Lease on a claimed row beyond the webhook timeout before another worker may retry it
+WEBHOOK_LEASE_MARGIN = 60
+# Due rows older than this are assumed to have lost their task message
+WEBHOOK_REDISPATCH_GRACE = 60
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# Circuit cooldown doubles each time a half-open probe fails, up to the max
+WEBHOOK_CIRCUIT_DEFAULT_COOLDOWN = 60
+WEBHOOK_CIRCUIT_MAX_COOLDOWN = 3600
+# Base delay before retrying an event deferred by the concurrency cap
+WEBHOOK_SLOT_RETRY_DELAY = 2
+
+# Upper bounds (ms) of the delivery latency histogram buckets
+WEBHOOK_LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Pooled connections per destination (per worker process)
+WEBHOOK_POOL_MAX_CONNECTIONS = 10
+WEBHOOK_POOL_KEEPALIVE_EXPIRY = 60.0
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _utc_now() -> datetime:
+    """Naive UTC, matching the DateTime columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ==================== ENQUEUE (API SIDE) ====================
+
+_PENDING_KEY = "webhook_outbox_pending"
+
+
+def enqueue_webhook_delivery(
+    db: Session,
+    webhook: models.Webhook,
+    event_type: str,
+    payload: dict
+) -> models.WebhookOutbox:
+    """
+    Add one outbox row for ``webhook`` to the current transaction.
+
+    The row is delivered once the caller commits; nothing is sent if the
+    transaction rolls back. For batching webhooks delivery waits
+    ``batch_window_seconds`` so that further events can join the POST.
+    """
+    due_at = _utc_now()
+    if (webhook.batch_size or 1) > 1 and webhook.batch_window_seconds:
+        due_at += timedelta(seconds=webhook.batch_window_seconds)
+
+    row = models.WebhookOutbox(
+        webhook_id=webhook.id,
+        event_type=event_type,
+        payload=payload,
+        status=OUTBOX_PENDING,
+        attempt_count=0,
+        next_attempt_at=due_at
+    )
+    db.add(row)
+    db.flush()
+    db.info.setdefault(_PENDING_KEY, []).append((row.id, due_at.replace(tzinfo=timezone.utc)))
+    return row
+
+
+def enqueue_webhook_event(
+    db: Session,
+    event_type: str,
+    payload: dict,
+    entity_id: Optional[int] = None
+) -> int:
+    """
+    Queue an event for every active webhook subscribed to it.
+
+    Returns the number of outbox rows added to the current transaction.
+    """
+    query = db.query(models.Webhook).filter(
+        models.Webhook.is_active == True,
+        models.Webhook.events.contains([event_type])  # GIN index
+    )
+
+    if entity_id:
+        query = query.filter(
+            (models.Webhook.entity_id == entity_id) |
+            (models.Webhook.entity_id == None)
+        )
+
+    webhooks = query.all()
+    for webhook in webhooks:
+        enqueue_webhook_delivery(db, webhook, event_type, payload)
+    return len(webhooks)
+
+
+def schedule_outbox_deliveries(outbox_ids: List[int], eta: Optional[datetime] = None) -> None:
+    """Queue delivery tasks; rows whose message is lost are re-queued by the sweeper."""
+    from worker.tasks import deliver_webhook_task
+
+    for outbox_id in outbox_ids:
+        try:
+            deliver_webhook_task.apply_async(args=[outbox_id], eta=eta)
+        except Exception as e:
+            logger.warning(f"Could not queue webhook delivery {outbox_id}: {e}")
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_committed_events(session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    for outbox_id, due_at in pending or ():
+        schedule_outbox_deliveries([outbox_id], eta=due_at)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_events(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ==================== DELIVERY (WORKER SIDE) ====================
+
+_http_clients: Dict[str, httpx.Client] = {}
+_http_clients_lock = threading.Lock()
+
+
+def _get_http_client(url: str) -> httpx.Client:
+    """Pooled client for the URL's origin (keep-alive, HTTP/2 when available)."""
+    parts = urlsplit(url)
+    origin = f"{parts.scheme}://{parts.netloc}".lower()
+
+    with _http_clients_lock:
+        client = _http_clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                follow_redirects=False,
+                limits=httpx.Limits(
+                    max_connections=WEBHOOK_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=WEBHOOK_POOL_MAX_CONNECTIONS,
+                    keepalive_expiry=WEBHOOK_POOL_KEEPALIVE_EXPIRY
+                )
+            )
+            _http_clients[origin] = client
+        return client
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    """HMAC-SHA256 signature header value for a request body."""
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return f"sha256={signature}"
+
+
+def retry_delay(attempt: int) -> float:
+    """Seconds to wait after a failed attempt (1-based)."""
+    delay = min(WEBHOOK_RETRY_MAX_DELAY, WEBHOOK_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return delay * (1 + random.random() * 0.1)
+
+
+def claim_outbox_event(db: Session, outbox_id: int, now: datetime) -> Optional[models.WebhookOutbox]:
+    """
+    Atomically take a due row (or one whose lease expired) and count the attempt.
+
+    Returns None if the row is gone, already delivered, not due yet or
+    being delivered by another worker. Commits the claim.
+    """
+    Outbox = models.WebhookOutbox
+    target = db.query(models.Webhook.timeout_seconds).join(
+        Outbox, Outbox.webhook_id == models.Webhook.id
+    ).filter(Outbox.id == outbox_id).first()
+    if target is None:
+        return None
+    timeout = target.timeout_seconds or 30
+
+    claimed = db.execute(
+        update(Outbox)
+        .where(
+            Outbox.id == outbox_id,
+            or_(
+                and_(Outbox.status == OUTBOX_PENDING, Outbox.next_attempt_at <= now),
+                and_(Outbox.status == OUTBOX_PROCESSING, Outbox.locked_until < now)
+            )
+        )
+        .values(
+            status=OUTBOX_PROCESSING,
+            locked_until=now + timedelta(seconds=timeout + WEBHOOK_LEASE_MARGIN),
+            attempt_count=Outbox.attempt_count + 1
+        )
+        .returning(Outbox.id)
+    ).scalar()
+    db.commit()
+
+    if claimed is None:
+        return None
+    return db.query(Outbox).filter(Outbox.id == outbox_id).first()
+
+
+# ==================== CIRCUIT BREAKER ====================
+# ``Webhook.failure_count`` counts consecutive failed attempts. Once it
+# reaches ``circuit_failure_threshold`` the circuit opens: deliveries are
+# deferred (without using up their retries) until ``circuit_open_until``.
+# The first worker to get past that time sends a single probe (half-open);
+# success closes the circuit, failure reopens it with a doubled cooldown.
+
+def circuit_state(webhook: models.Webhook, now: Optional[datetime] = None) -> str:
+    """Current circuit state: closed, open or half_open."""
+    now = now or _utc_now()
+    threshold = webhook.circuit_failure_threshold
+    if not threshold or (webhook.failure_count or 0) < threshold:
+        return CIRCUIT_CLOSED
+    if webhook.circuit_open_until and webhook.circuit_open_until > now:
+        return CIRCUIT_OPEN
+    return CIRCUIT_HALF_OPEN
+
+
+def _cooldown(webhook: models.Webhook, failures: int) -> timedelta:
+    base = max(1, webhook.circuit_cooldown_seconds or WEBHOOK_CIRCUIT_DEFAULT_COOLDOWN)
+    reopened = max(0, failures - (webhook.circuit_failure_threshold or 0))
+    return timedelta(seconds=min(WEBHOOK_CIRCUIT_MAX_COOLDOWN, base * 2 ** min(reopened, 16)))
+
+
+def _circuit_gate(db: Session, webhook: models.Webhook, now: datetime) -> Optional[datetime]:
+    """None if an attempt may be made now, else when to try again."""
+    state = circuit_state(webhook, now)
+    if state == CIRCUIT_CLOSED:
+        return None
+    if state == CIRCUIT_OPEN:
+        return webhook.circuit_open_until
+
+    # Half-open: only the worker that moves circuit_open_until forward probes
+    probe_until = now + _cooldown(webhook, webhook.failure_count)
+    probe = db.execute(
+        update(models.Webhook)
+        .where(
+            models.Webhook.id == webhook.id,
+            or_(models.Webhook.circuit_open_until == None, models.Webhook.circuit_open_until <= now)
+        )
+        .values(circuit_open_until=probe_until)
+        .returning(models.Webhook.id)
+    ).scalar()
+    db.commit()
+    return None if probe is not None else probe_until
+
+
+def reset_circuit(db: Session, webhook: models.Webhook) -> List[int]:
+    """
+    Close the circuit (e.g. after the receiver was fixed) and make the
+    deferred events due now. Returns their ids to schedule once the
+    caller has committed.
+    """
+    webhook.failure_count = 0
+    webhook.circuit_open_until = None
+    Outbox = models.WebhookOutbox
+    return db.execute(
+        update(Outbox)
+        .where(Outbox.webhook_id == webhook.id, Outbox.status == OUTBOX_PENDING)
+        .values(next_attempt_at=_utc_now())
+        .returning(Outbox.id)
+    ).scalars().all()
+
+
+# ==================== CONCURRENCY LIMITS ====================
+# In-flight requests per webhook, across all workers (see acquire_slot).
+
+
+def _slot_key(webhook_id: int) -> str:
+    return f"webhook:inflight:{webhook_id}"
+
+
+def acquire_delivery_slot(webhook: models.Webhook, lease_seconds: int) -> Optional[str]:
+    """
+    Take one of the webhook's ``max_concurrency`` slots.
+
+    Returns a token to release, "" when no limit applies (or Redis is
+    unavailable: fail open), or None when all slots are busy.
+    """
+    return acquire_slot(_slot_key(webhook.id), webhook.max_concurrency, lease_seconds)
+
+
+def release_delivery_slot(webhook_id: int, token: str) -> None:
+    release_slot(_slot_key(webhook_id), token)
+
+
+# ==================== DELIVERY ====================
+
+def _claim_batch(
+    db: Session,
+    webhook: models.Webhook,
+    lead: models.WebhookOutbox,
+    now: datetime,
+    lease_until: datetime
+) -> List[models.WebhookOutbox]:
+    """Claim further due events of a batching webhook to send along with ``lead``."""
+    Outbox = models.WebhookOutbox
+    extra = (webhook.batch_size or 1) - 1
+    if extra < 1:
+        return []
+
+    due_ids = select(Outbox.id).where(
+        Outbox.webhook_id == webhook.id,
+        Outbox.id != lead.id,
+        Outbox.status == OUTBOX_PENDING,
+        Outbox.next_attempt_at <= now
+    ).order_by(Outbox.id).limit(extra).with_for_update(skip_locked=True).scalar_subquery()
+
+    claimed_ids = db.execute(
+        update(Outbox)
+        .where(Outbox.id.in_(due_ids))
+        .values(status=OUTBOX_PROCESSING, locked_until=lease_until, attempt_count=Outbox.attempt_count + 1)
+        .returning(Outbox.id)
+    ).scalars().all()
+    db.commit()
+
+    if not claimed_ids:
+        return []
+    return db.query(Outbox).filter(Outbox.id.in_(claimed_ids)).order_by(Outbox.id).all()
+
+
+def _build_request(webhook: models.Webhook, rows: List[models.WebhookOutbox]) -> tuple:
+    """(event_type, payload, headers) for one POST carrying ``rows``."""
+    if len(rows) == 1:
+        event_type = rows[0].event_type
+        payload = rows[0].payload
+    else:
+        event_type = "batch"
+        payload = {
+            "batch": True,
+            "events": [
+                {"id": row.id, "event": row.event_type, "payload": row.payload}
+                for row in rows
+            ]
+        }
+
+    headers = {
+        "Content-Type": webhook.content_type or "application/json",
+        "X-Webhook-Event": event_type,
+        "X-Webhook-Delivery": str(rows[0].id),
+        "X-Webhook-Timestamp": str(int(time.time())),
+    }
+    if len(rows) > 1:
+        headers["X-Webhook-Batch-Size"] = str(len(rows))
+    return event_type, payload, headers
+
+
+def _post(webhook: models.Webhook, payload: Any, headers: Dict[str, str]) -> Dict[str, Any]:
+    """Send one request; returns the fields of the delivery log entry."""
+    body = json.dumps(payload).encode()
+    if webhook.secret:
+        headers["X-Webhook-Signature"] = sign_payload(webhook.secret, body)
+
+    result: Dict[str, Any] = {"success": False, "status_code": None, "response_body": None}
+    start_time = time.monotonic()
+    try:
+        response = _get_http_client(webhook.url).post(
+            webhook.url,
+            content=body,
+            headers=headers,
+            timeout=webhook.timeout_seconds or 30
+        )
+        result["status_code"] = response.status_code
+        result["response_body"] = response.text[:1000] if response.text else None
+        if 200 <= response.status_code < 300:
+            result["success"] = True
+        else:
+            result["error_message"] = f"HTTP {response.status_code}"
+    except httpx.TimeoutException:
+        result["error_message"] = "Request timeout"
+    except Exception as e:
+        result["error_message"] = str(e)[:500]
+
+    result["response_time_ms"] = int((time.monotonic() - start_time) * 1000)
+    return result
+
+
+def _defer(db: Session, rows: List[models.WebhookOutbox], until: datetime, reason: str) -> Dict[str, Any]:
+    """Put claimed rows back without counting the attempt."""
+    Outbox = models.WebhookOutbox
+    db.execute(
+        update(Outbox)
+        .where(Outbox.id.in_([row.id for row in rows]))
+        .values(
+            status=OUTBOX_PENDING,
+            next_attempt_at=until,
+            locked_until=None,
+            attempt_count=Outbox.attempt_count - 1
+        )
+    )
+    db.commit()
+    return {
+        "status": "deferred",
+        "reason": reason,
+        "outbox_id": rows[0].id,
+        "retry_at": until.replace(tzinfo=timezone.utc),
+    }
+
+
+def _record_result(
+    db: Session,
+    webhook: models.Webhook,
+    rows: List[models.WebhookOutbox],
+    event_type: str,
+    payload: Any,
+    result: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Log the request, settle every row and update webhook stats and circuit."""
+    Outbox = models.WebhookOutbox
+    Webhook = models.Webhook
+    finished_at = _utc_now()
+    attempt = max(row.attempt_count for row in rows)
+
+    db.add(models.WebhookDelivery(
+        webhook_id=webhook.id,
+        event_type=event_type,
+        payload=payload,
+        attempt_count=attempt,
+        **result
+    ))
+
+    outcome: Dict[str, Any] = {"outbox_id": rows[0].id, "events": len(rows), "status_code": result["status_code"]}
+    if result["success"]:
+        db.execute(
+            update(Outbox).where(Outbox.id.in_([row.id for row in rows])).values(
+                status=OUTBOX_DELIVERED, delivered_at=finished_at, locked_until=None, last_error=None
+            )
+        )
+        # Counters are updated in SQL: several workers may deliver to the same webhook
+        db.execute(
+            update(Webhook).where(Webhook.id == webhook.id).values(
+                last_triggered=finished_at,
+                last_status_code=result["status_code"],
+                success_count=Webhook.success_count + len(rows),
+                failure_count=0,
+                circuit_open_until=None
+            )
+        )
+        outcome["status"] = OUTBOX_DELIVERED
+        if webhook.circuit_open_until is not None:
+            # Successful probe: release the events deferred while the circuit was open
+            outcome["resume_ids"] = db.execute(
+                update(Outbox)
+                .where(Outbox.webhook_id == webhook.id, Outbox.status == OUTBOX_PENDING,
+                       Outbox.next_attempt_at > finished_at)
+                .values(next_attempt_at=finished_at)
+                .returning(Outbox.id)
+            ).scalars().all()
+            logger.info(f"Webhook circuit closed for {webhook.url}")
+    else:
+        max_attempts = (webhook.retry_count or 0) + 1
+        retry_ids = [row.id for row in rows if row.attempt_count < max_attempts]
+        failed_ids = [row.id for row in rows if row.attempt_count >= max_attempts]
+        error = result.get("error_message")
+
+        if retry_ids:
+            retry_at = finished_at + timedelta(seconds=retry_delay(attempt))
+            db.execute(
+                update(Outbox).where(Outbox.id.in_(retry_ids)).values(
+                    status=OUTBOX_PENDING, next_attempt_at=retry_at, locked_until=None, last_error=error
+                )
+            )
+            outcome.update(status="retry", outbox_id=retry_ids[0], retry_at=retry_at.replace(tzinfo=timezone.utc))
+        else:
+            outcome["status"] = OUTBOX_FAILED
+        if failed_ids:
+            db.execute(
+                update(Outbox).where(Outbox.id.in_(failed_ids)).values(
+                    status=OUTBOX_FAILED, locked_until=None, last_error=error
+                )
+            )
+
+        failures = db.execute(
+            update(Webhook).where(Webhook.id == webhook.id).values(
+                last_triggered=finished_at,
+                last_status_code=result["status_code"],
+                failure_count=Webhook.failure_count + 1
+            ).returning(Webhook.failure_count)
+        ).scalar()
+        if webhook.circuit_failure_threshold and failures >= webhook.circuit_failure_threshold:
+            open_until = finished_at + _cooldown(webhook, failures)
+            db.execute(update(Webhook).where(Webhook.id == webhook.id).values(circuit_open_until=open_until))
+            outcome["circuit_open_until"] = open_until.isoformat()
+            if failures == webhook.circuit_failure_threshold:
+                logger.warning(f"Webhook circuit opened for {webhook.url} after {failures} consecutive failures")
+            # Retries would only be deferred again; wait for the probe instead
+            if "retry_at" in outcome and open_until > outcome["retry_at"].replace(tzinfo=None):
+                db.execute(update(Outbox).where(Outbox.id.in_(retry_ids)).values(next_attempt_at=open_until))
+                outcome["retry_at"] = open_until.replace(tzinfo=timezone.utc)
+
+    db.commit()
+
+    logger.info(
+        f"Webhook delivery to {webhook.url}: "
+        f"event={event_type}, events={len(rows)}, success={result['success']}, "
+        f"status={result['status_code']}, attempt={attempt}"
+    )
+    return outcome
+
+
+def deliver_outbox_event(db: Session, outbox_id: int) -> Dict[str, Any]:
+    """
+    Make one delivery attempt for an outbox row (plus other due rows of
+    the same webhook when it batches events).
+
+    Returns {"status": "delivered" | "retry" | "deferred" | "failed" | "skipped", ...}.
+    With "retry" or "deferred", ``outbox_id`` is pending again and should be
+    attempted at ``retry_at`` (aware UTC).
+    """
+    Outbox = models.WebhookOutbox
+    now = _utc_now()
+
+    row = claim_outbox_event(db, outbox_id, now)
+    if row is None:
+        return {"status": "skipped", "outbox_id": outbox_id}
+
+    webhook = row.webhook
+    if not webhook.is_active:
+        db.execute(
+            update(Outbox).where(Outbox.id == row.id)
+            .values(status=OUTBOX_FAILED, locked_until=None, last_error="Webhook is inactive")
+        )
+        db.commit()
+        return {"status": "failed", "outbox_id": row.id, "error": "Webhook is inactive"}
+
+    blocked_until = _circuit_gate(db, webhook, now)
+    if blocked_until is not None:
+        return _defer(db, [row], blocked_until, "circuit_open")
+
+    lease_seconds = (webhook.timeout_seconds or 30) + WEBHOOK_LEASE_MARGIN
+    token = acquire_delivery_slot(webhook, lease_seconds)
+    if token is None:
+        retry_at = now + timedelta(seconds=WEBHOOK_SLOT_RETRY_DELAY * (1 + random.random()))
+        return _defer(db, [row], retry_at, "concurrency_limit")
+
+    try:
+        rows = [row] + _claim_batch(db, webhook, row, now, row.locked_until)
+        event_type, payload, headers = _build_request(webhook, rows)
+        result = _post(webhook, payload, headers)
+    finally:
+        release_delivery_slot(webhook.id, token)
+
+    return _record_result(db, webhook, rows, event_type, payload, result)
+
+
+def find_due_outbox_events(db: Session, limit: int = 500) -> List[int]:
+    """Ids of rows that should be running but have no queued task (lost message or dead worker)."""
+    Outbox = models.WebhookOutbox
+    now = _utc_now()
+    rows = db.query(Outbox.id).filter(
+        or_(
+            and_(
+                Outbox.status == OUTBOX_PENDING,
+                Outbox.next_attempt_at <= now - timedelta(seconds=WEBHOOK_REDISPATCH_GRACE)
+            ),
+            and_(Outbox.status == OUTBOX_PROCESSING, Outbox.locked_until < now)
+        )
+    ).order_by(Outbox.next_attempt_at).limit(limit).all()
+    return [row.id for row in rows]
+
+
+def purge_outbox_events(db: Session, older_than: datetime) -> int:
+    """Delete delivered and failed rows created before ``older_than``."""
+    Outbox = models.WebhookOutbox
+    return db.query(Outbox).filter(
+        Outbox.status.in_([OUTBOX_DELIVERED, OUTBOX_FAILED]),
+        Outbox.created_at < older_than.replace(tzinfo=None)
+    ).delete(synchronize_session=False)
+
+
+# ==================== DELIVERY STATS ====================
+
+def get_delivery_stats(db: Session, webhook: models.Webhook, since: datetime) -> Dict[str, Any]:
+    """
+    Request counts, latency percentiles and a latency histogram for a
+    webhook's delivery log since ``since``, computed in the database.
+    """
+    Delivery = models.WebhookDelivery
+    since = since.replace(tzinfo=None)
+    window = (Delivery.webhook_id == webhook.id, Delivery.created_at >= since)
+
+    totals = db.query(
+        func.count(Delivery.id).label("requests"),
+        func.count(Delivery.id).filter(Delivery.success == True).label("succeeded"),
+        func.percentile_cont(0.5).within_group(Delivery.response_time_ms).label("p50"),
+        func.percentile_cont(0.95).within_group(Delivery.response_time_ms).label("p95"),
+        func.percentile_cont(0.99).within_group(Delivery.response_time_ms).label("p99"),
+    ).filter(*window).one()
+
+    # width_bucket: 0 below the first bound, len(bounds) at or above the last
+    bucket = func.width_bucket(Delivery.response_time_ms, array(WEBHOOK_LATENCY_BUCKETS_MS))
+    counts = dict(
+        db.query(bucket, func.count(Delivery.id))
+        .filter(*window, Delivery.response_time_ms != None)
+        .group_by(bucket)
+        .all()
+    )
+
+    histogram = []
+    for index, upper in enumerate(WEBHOOK_LATENCY_BUCKETS_MS):
+        histogram.append({"lt_ms": upper, "count": counts.get(index, 0)})
+    histogram.append({"lt_ms": None, "count": counts.get(len(WEBHOOK_LATENCY_BUCKETS_MS), 0)})
+
+    pending = db.query(func.count(models.WebhookOutbox.id)).filter(
+        models.WebhookOutbox.webhook_id == webhook.id,
+        models.WebhookOutbox.status.in_([OUTBOX_PENDING, OUTBOX_PROCESSING])
+    ).scalar()
+
+    def _ms(value):
+        return round(value, 1) if value is not None else None
+
+    return {
+        "since": since.isoformat(),
+        "circuit_state": circuit_state(webhook),
+        "circuit_open_until": webhook.circuit_open_until,
+        "consecutive_failures": webhook.failure_count or 0,
+        "pending_events": pending or 0,
+        "requests": totals.requests,
+        "succeeded": totals.succeeded,
+        "failed": totals.requests - totals.succeeded,
+        "latency_ms": {"p50": _ms(totals.p50), "p95": _ms(totals.p95), "p99": _ms(totals.p99)},
+        "latency_histogram": histogram,
+    }
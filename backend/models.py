@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, Date, Numeric, UniqueConstraint, Index, event, text
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, Text, Float, Date, Numeric, UniqueConstraint, Index, event, text
 from sqlalchemy.dialects.postgresql import INET, JSON, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import TypeDecorator
@@ -152,11 +152,28 @@ class Subnet(Base):
     description = Column(String, nullable=True)
     entity_id = Column(Integer, ForeignKey("entities.id"), nullable=True)
 
+    # Scan in progress: start time and number of chunks done (resume point)
+    scan_started_at = Column(DateTime, nullable=True)
+    scan_checkpoint = Column(Integer, nullable=True)
+    # Discovery engine (nmap, native) and TCP probe ports of the native engine
+    scan_engine = Column(String(20), nullable=False, default="nmap", server_default="nmap")
+    scan_ports = Column(String, nullable=True)  # Comma-separated, e.g. "22,80,443"
+    # Scheduled scans (None: manual only); incremental ones skip addresses
+    # checked within rescan_after_minutes
+    scan_interval_minutes = Column(Integer, nullable=True)
+    rescan_after_minutes = Column(Integer, nullable=True)
+    # Cutoff of the current scan if incremental (None for a full scan)
+    scan_rescan_cutoff = Column(DateTime, nullable=True)
+
     entity = relationship("Entity", back_populates="subnets")
     ips = relationship("IPAddress", back_populates="subnet", cascade="all, delete-orphan")
 
 class IPAddress(Base):
     __tablename__ = "ip_addresses"
+    __table_args__ = (
+        # Conflict target of the bulk scan upsert
+        UniqueConstraint("subnet_id", "address", name="uq_ip_addresses_subnet_address"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     address = Column(INET, unique=True, nullable=False)
@@ -170,6 +187,21 @@ class IPAddress(Base):
     subnet = relationship("Subnet", back_populates="ips")
     equipment = relationship("Equipment", back_populates="ip_addresses")
 
+class IPAddressChange(Base):
+    """Host change seen by a subnet scan (new host, host gone, MAC or hostname changed)."""
+    __tablename__ = "ip_address_changes"
+    __table_args__ = (
+        Index("ix_ip_address_changes_subnet_detected", "subnet_id", "detected_at"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    subnet_id = Column(Integer, ForeignKey("subnets.id", ondelete="CASCADE"), nullable=False)
+    address = Column(INET, nullable=False)
+    change_type = Column(String(20), nullable=False, index=True)  # new_host, host_gone, mac_changed, hostname_changed
+    old_value = Column(String, nullable=True)
+    new_value = Column(String, nullable=True)
+    detected_at = Column(DateTime, default=utc_now, nullable=False)
+
 class Script(Base):
     __tablename__ = "scripts"
 
@@ -545,11 +577,14 @@ class AuditLog(Base):
     """
     System audit log for tracking critical operations.
     Logs all create, update, and delete operations on sensitive resources.
+
+    Range-partitioned by month on ``timestamp`` (see core/audit_partitions.py),
+    so the primary key includes the partition key.
     """
     __tablename__ = "audit_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime, default=utc_now, nullable=False, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    timestamp = Column(DateTime, default=utc_now, primary_key=True, nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
     username = Column(String, nullable=False)  # Denormalized for historical accuracy
     action = Column(String, nullable=False, index=True)  # CREATE, UPDATE, DELETE, LOGIN, LOGOUT
@@ -566,9 +601,49 @@ class AuditLog(Base):
     __table_args__ = (
         Index('ix_audit_logs_changes_gin', changes, postgresql_using='gin'),
         Index('ix_audit_logs_extra_data_gin', extra_data, postgresql_using='gin'),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
     )
 
 
+@event.listens_for(AuditLog.__table__, 'after_create')
+def create_audit_log_partitions(target, connection, **kw):
+    """Create the default and upcoming monthly partitions for a new audit_logs table."""
+    if connection.dialect.name == 'postgresql':
+        from backend.core.audit_partitions import ensure_partitions
+        ensure_partitions(connection)
+
+
+class AuditLogHourlyStat(Base):
+    """
+    Hourly audit log counts per action, resource type, user and entity.
+    Rebuilt per hour by the audit rollup task; read by the audit stats endpoint.
+    """
+    __tablename__ = "audit_log_hourly_stats"
+
+    id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime, nullable=False, index=True)  # Start of the hour (UTC)
+    action = Column(String, nullable=False)
+    resource_type = Column(String, nullable=False)
+    user_id = Column(Integer, nullable=True)  # No FK: stats outlive users
+    username = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class AuditLogDailyStat(Base):
+    """Daily audit log counts, aggregated from the hourly rollup."""
+    __tablename__ = "audit_log_daily_stats"
+
+    id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime, nullable=False, index=True)  # Start of the day (UTC)
+    action = Column(String, nullable=False)
+    resource_type = Column(String, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    username = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
 # ==================== HELPDESK TICKET MODELS ====================
 
 class Ticket(Base):
@@ -1084,10 +1159,20 @@ class Webhook(Base):
     retry_count = Column(Integer, default=3)  # Number of retries on failure
     timeout_seconds = Column(Integer, default=30)
 
+    # Delivery shaping
+    max_concurrency = Column(Integer, default=4)  # In-flight requests across all workers (0 = unlimited)
+    batch_size = Column(Integer, default=1)  # Max events per POST (1 = no batching)
+    batch_window_seconds = Column(Integer, default=0)  # Wait for more events before sending a batch
+
+    # Circuit breaker (opens after N consecutive failed attempts)
+    circuit_failure_threshold = Column(Integer, default=5)  # 0 = never open
+    circuit_cooldown_seconds = Column(Integer, default=60)
+    circuit_open_until = Column(DateTime, nullable=True)
+
     # Stats
     last_triggered = Column(DateTime, nullable=True)
     last_status_code = Column(Integer, nullable=True)
-    failure_count = Column(Integer, default=0)
+    failure_count = Column(Integer, default=0)  # Consecutive failed attempts
     success_count = Column(Integer, default=0)
 
     # Ownership
@@ -1134,6 +1219,44 @@ class WebhookDelivery(Base):
 
     webhook = relationship("Webhook", back_populates="deliveries")
 
+    __table_args__ = (
+        Index('ix_webhook_deliveries_webhook_created', webhook_id, created_at),
+    )
+
+
+class WebhookOutbox(Base):
+    """
+    Transactional outbox of webhook events awaiting delivery.
+
+    Rows are written in the same transaction as the change that triggered
+    the event and delivered by the worker ("webhooks" queue), so an event
+    is never lost once the change is committed (at-least-once delivery).
+    """
+    __tablename__ = "webhook_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    webhook_id = Column(Integer, ForeignKey("webhooks.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    event_type = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=True)
+
+    # pending -> processing -> delivered | failed (processing rows whose
+    # lease expired are picked up again)
+    status = Column(String, nullable=False, default="pending")
+    attempt_count = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=utc_now)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=utc_now)
+    delivered_at = Column(DateTime, nullable=True)
+
+    webhook = relationship("Webhook")
+
+    __table_args__ = (
+        Index('ix_webhook_outbox_status_next_attempt', status, next_attempt_at),
+    )
+
 
 # ==================== EMAIL INTEGRATION MODELS ====================
 
@@ -1167,6 +1290,8 @@ class EmailConfiguration(Base):
     imap_password = Column(EncryptedString, nullable=True)
     imap_use_ssl = Column(Boolean, default=True)
     imap_folder = Column(String, default="INBOX")
+    imap_uid_validity = Column(BigInteger, nullable=True)  # UIDVALIDITY of imap_folder at the last poll
+    imap_last_uid = Column(BigInteger, nullable=True)  # Highest UID fetched from imap_folder
 
     # Microsoft 365 settings
     m365_tenant_id = Column(String, nullable=True)
@@ -1175,6 +1300,7 @@ class EmailConfiguration(Base):
     m365_user_email = Column(String, nullable=True)  # Service account email with access to shared mailboxes
     m365_mailbox = Column(String, nullable=True)  # Shared mailbox email address
     m365_folder_id = Column(String, nullable=True)  # Folder ID to monitor for inbound emails
+    m365_delta_link = Column(Text, nullable=True)  # Graph @odata.deltaLink of the monitored folder
 
     # Common settings
     from_email = Column(String, nullable=True)
@@ -1274,6 +1400,50 @@ class InboundEmail(Base):
     email_config = relationship("EmailConfiguration", back_populates="inbound_emails")
 
 
+class EmailThreadIndex(Base):
+    """
+    Message-ID to ticket lookup for reply threading.
+    Filled when notifications are sent and when emails are received, so a
+    reply is matched through its In-Reply-To and References headers with a
+    single indexed query.
+    """
+    __tablename__ = "email_thread_index"
+
+    message_id = Column(String, primary_key=True)
+    ticket_id = Column(Integer, ForeignKey("tickets.id", ondelete="CASCADE"), nullable=False, index=True)
+    source = Column(String, nullable=False)  # sent, received
+    created_at = Column(DateTime, default=utc_now)
+
+
+# ==================== EXPORT JOB MODEL ====================
+
+class ExportJob(Base):
+    """
+    Background export job.
+    The export runs as a Celery task writing to the configured export
+    directory; the file is downloaded later and removed after retention.
+    """
+    __tablename__ = "export_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(String, nullable=True)
+    export_type = Column(String, nullable=False)  # tickets, equipment, audit_logs
+    format = Column(String, nullable=False, default="csv")  # csv, xlsx
+    filters = Column(JSONB, nullable=True)  # Query filters, same names as the export endpoints
+    status = Column(String, default="pending", index=True)  # pending, running, completed, failed
+    filename = Column(String, nullable=True)  # File name inside the export directory
+    row_count = Column(Integer, nullable=True)
+    error_message = Column(Text, nullable=True)
+    requested_by_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    created_at = Column(DateTime, default=utc_now)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)  # File and job are removed after this
+
+    requested_by = relationship("User", backref="export_jobs")
+
+
 # ==================== SYSTEM SETTINGS MODEL ====================
 
 class SystemSettings(Base):
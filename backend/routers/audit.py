@@ -2,15 +2,15 @@
 Audit Log Router
 API endpoints for accessing audit logs (admin only).
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import datetime, timezone
 
 from backend.core.database import get_db
 from backend.core.security import get_current_user
-from backend.core.audit import get_audit_logs
+from backend.core.audit import get_audit_logs, get_audit_statistics
 from backend import models
 
 router = APIRouter(prefix="/audit", tags=["Audit Logs"])
@@ -79,12 +79,16 @@ def list_audit_logs(
 
 @router.get("/stats")
 def get_audit_stats(
+    from_date: Optional[datetime] = Query(default=None, description="Start of the period (inclusive)"),
+    to_date: Optional[datetime] = Query(default=None, description="End of the period (exclusive)"),
+    entity_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
     Get audit log statistics (admin only).
-    Returns counts by action type and resource type.
+    Returns counts by action type and resource type, answered from the
+    hourly/daily rollups. Period bounds are resolved to the hour.
     """
     if current_user.role not in ("admin", "superadmin"):
         raise HTTPException(
@@ -92,25 +96,12 @@ def get_audit_stats(
             detail="Only administrators can access audit statistics"
         )
 
-    from sqlalchemy import func
+    # Audit timestamps are stored as naive UTC
+    if from_date and from_date.tzinfo:
+        from_date = from_date.astimezone(timezone.utc).replace(tzinfo=None)
+    if to_date and to_date.tzinfo:
+        to_date = to_date.astimezone(timezone.utc).replace(tzinfo=None)
+    if from_date and to_date and from_date >= to_date:
+        raise HTTPException(status_code=400, detail="from_date must be before to_date")
 
-    # Count by action
-    action_counts = db.query(
-        models.AuditLog.action,
-        func.count(models.AuditLog.id).label("count")
-    ).group_by(models.AuditLog.action).all()
-
-    # Count by resource type
-    resource_counts = db.query(
-        models.AuditLog.resource_type,
-        func.count(models.AuditLog.id).label("count")
-    ).group_by(models.AuditLog.resource_type).all()
-
-    # Total logs
-    total_logs = db.query(func.count(models.AuditLog.id)).scalar()
-
-    return {
-        "total_logs": total_logs,
-        "by_action": {action: count for action, count in action_counts},
-        "by_resource": {resource: count for resource, count in resource_counts}
-    }
+    return get_audit_statistics(db, from_date=from_date, to_date=to_date, entity_id=entity_id)
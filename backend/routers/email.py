@@ -366,6 +366,20 @@ def update_email_configuration(
 
     # Update fields if provided
     update_data = config_data.model_dump(exclude_unset=True)
+    # A delta sync is tied to one mailbox folder
+    if any(
+        field in update_data and update_data[field] != getattr(config, field)
+        for field in ("m365_tenant_id", "m365_mailbox", "m365_folder_id")
+    ):
+        config.m365_delta_link = None
+    # UIDs are only meaningful within one IMAP folder
+    if any(
+        field in update_data and update_data[field] != getattr(config, field)
+        for field in ("imap_host", "imap_username", "imap_folder")
+    ):
+        config.imap_uid_validity = None
+        config.imap_last_uid = None
+
     for field, value in update_data.items():
         setattr(config, field, value)
 
@@ -1,51 +1,71 @@
 """
-Export Router - CSV and Excel export functionality for data.
+Export Router - CSV, Excel and columnar (Parquet/Arrow) export functionality.
 Provides export endpoints for equipment, tickets, contracts, and software.
+
+Exports are streamed: rows are read through a server-side cursor
+(``yield_per``) and serialized chunk by chunk by the writers in
+``backend.core.export_writers``, so memory usage stays constant regardless
+of the number of exported rows.
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
-from typing import Optional, List, Literal
-from datetime import datetime, timezone
-import csv
-import io
+from fastapi.responses import StreamingResponse, FileResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, selectinload, aliased
+from celery.result import AsyncResult
+from typing import Optional, List, Callable, Iterable, Iterator, Any
+from datetime import datetime, timezone, timedelta
+from functools import partial
+from pathlib import Path
 import re
 import html
+import json
 import logging
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+import pyarrow as pa
 
-from backend.core.database import get_db
-from backend.core.security import get_current_user, get_current_admin_user
+from backend.core.config import get_settings
+from backend.core.database import get_db, SessionLocal
+from backend.core.export_writers import iter_csv, iter_xlsx, iter_parquet, iter_arrow_stream
+from backend.core.security import get_current_user, get_current_active_user, get_current_admin_user
 from backend import models, schemas
+from worker.tasks import run_export_job_task
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 router = APIRouter(prefix="/export", tags=["export"])
 
-
-def generate_csv(data: List[dict], filename: str) -> StreamingResponse:
-    """Generate a CSV file from a list of dictionaries."""
-    if not data:
-        output = io.StringIO()
-        output.write("No data to export")
-        output.seek(0)
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=data[0].keys())
-    writer.writeheader()
-    writer.writerows(data)
-    output.seek(0)
-
+# Rows fetched per server-side cursor round trip
+EXPORT_BATCH_SIZE = 1000
+
+
+def iter_export_rows(
+    build_query: Callable[[Session], Any],
+    row_builder: Callable[[Any], dict],
+    label: str,
+    username: str
+) -> Iterator[dict]:
+    """
+    Yield export rows from a server-side cursor.
+
+    The request-scoped session from ``get_db`` is closed before a streaming
+    body is sent, so the generator opens (and always closes) its own session.
+    ``build_query`` receives that session and returns the ORM query to stream.
+    """
+    db = SessionLocal()
+    count = 0
+    try:
+        for obj in build_query(db).yield_per(EXPORT_BATCH_SIZE):
+            yield row_builder(obj)
+            count += 1
+        logger.info(f"{label} export generated by {username}: {count} items")
+    finally:
+        db.close()
+
+
+def generate_csv(data: Iterable[dict], filename: str) -> StreamingResponse:
+    """Stream a CSV file from an iterable of dictionaries."""
     return StreamingResponse(
-        iter([output.getvalue()]),
+        iter_csv(data),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -69,137 +89,412 @@ def strip_html(text: str) -> str:
     return text.strip()
 
 
-def generate_xlsx(data: List[dict], filename: str, column_labels: dict = None) -> StreamingResponse:
-    """Generate an Excel XLSX file from a list of dictionaries with formatting."""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Export"
-
-    if not data:
-        ws['A1'] = "No data to export"
-    else:
-        # Define styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="4F46E5", end_color="4F46E5", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        cell_alignment = Alignment(vertical="top", wrap_text=True)
-        thin_border = Border(
-            left=Side(style='thin', color='E5E7EB'),
-            right=Side(style='thin', color='E5E7EB'),
-            top=Side(style='thin', color='E5E7EB'),
-            bottom=Side(style='thin', color='E5E7EB')
-        )
-        alt_fill = PatternFill(start_color="F9FAFB", end_color="F9FAFB", fill_type="solid")
-
-        # Get column keys
-        columns = list(data[0].keys())
-
-        # Write headers with labels if provided
-        for col_idx, col_key in enumerate(columns, 1):
-            cell = ws.cell(row=1, column=col_idx)
-            cell.value = column_labels.get(col_key, col_key) if column_labels else col_key
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = thin_border
-
-        # Write data rows
-        for row_idx, row_data in enumerate(data, 2):
-            for col_idx, col_key in enumerate(columns, 1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                cell.value = row_data.get(col_key, "")
-                cell.alignment = cell_alignment
-                cell.border = thin_border
-                # Alternate row colors
-                if row_idx % 2 == 0:
-                    cell.fill = alt_fill
-
-        # Auto-adjust column widths
-        for col_idx, col_key in enumerate(columns, 1):
-            max_length = len(column_labels.get(col_key, col_key) if column_labels else col_key)
-            for row in ws.iter_rows(min_row=2, min_col=col_idx, max_col=col_idx):
-                for cell in row:
-                    if cell.value:
-                        # For multiline text, get the longest line
-                        lines = str(cell.value).split('\n')
-                        cell_max = max(len(line) for line in lines)
-                        max_length = max(max_length, min(cell_max, 50))  # Cap at 50 chars
-            ws.column_dimensions[get_column_letter(col_idx)].width = max_length + 2
-
-        # Freeze header row
-        ws.freeze_panes = 'A2'
-
-    # Save to BytesIO
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-
+def generate_xlsx(data: Iterable[dict], filename: str, column_labels: dict = None) -> StreamingResponse:
+    """Stream a formatted Excel XLSX file from an iterable of dictionaries."""
     return StreamingResponse(
-        iter([output.getvalue()]),
+        iter_xlsx(data, column_labels),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
-# ==================== EQUIPMENT EXPORT ====================
+def export_timestamp() -> str:
+    """Timestamp suffix used in export filenames."""
+    return datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
 
-@router.get("/equipment")
-def export_equipment(
+
+def _parse_iso_date(value: Optional[str], param: str) -> Optional[datetime]:
+    """Parse an ISO date query parameter, raising 400 on invalid input."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {param} format. Use ISO format.")
+
+
+def _format_location(location) -> str:
+    """Format a location as 'site / building / room'."""
+    if not location:
+        return ""
+    parts = [location.site, location.building, location.room]
+    return " / ".join(p for p in parts if p)
+
+
+def _select_columns(column_mapping: dict, columns: List[str]) -> Callable[[Any], dict]:
+    """Build a row builder that only renders the selected columns."""
+    return lambda obj: {col: column_mapping[col](obj) for col in columns}
+
+
+def _validate_columns(column_mapping: dict, columns: List[str], valid_label: str = "Valid columns") -> None:
+    invalid_columns = [col for col in columns if col not in column_mapping]
+    if invalid_columns:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid columns: {', '.join(invalid_columns)}. {valid_label}: {', '.join(column_mapping.keys())}"
+        )
+
+
+# ==================== COLUMN DEFINITIONS ====================
+
+def equipment_row(eq: models.Equipment) -> dict:
+    """Full equipment export row."""
+    return {
+        "id": eq.id,
+        "name": eq.name,
+        "status": eq.status,
+        "type": eq.model.equipment_type.name if eq.model and eq.model.equipment_type else "",
+        "model": eq.model.name if eq.model else "",
+        "manufacturer": eq.model.manufacturer.name if eq.model and eq.model.manufacturer else "",
+        "serial_number": eq.serial_number or "",
+        "asset_tag": eq.asset_tag or "",
+        "location": _format_location(eq.location),
+        "supplier": eq.supplier.name if eq.supplier else "",
+        "purchase_date": eq.purchase_date.isoformat() if eq.purchase_date else "",
+        "warranty_expiry": eq.warranty_expiry.isoformat() if eq.warranty_expiry else "",
+        "purchase_price": eq.purchase_price or "",
+        "ip_address": eq.remote_ip or "",
+        "rack_position": f"U{eq.position_u}" if eq.position_u else "",
+        "notes": eq.notes or "",
+        "created_at": eq.created_at.isoformat() if eq.created_at else ""
+    }
+
+
+EQUIPMENT_COLUMNS = {
+    "name": lambda eq: eq.name,
+    "serial_number": lambda eq: eq.serial_number or "",
+    "asset_tag": lambda eq: eq.asset_tag or "",
+    "status": lambda eq: eq.status,
+    "type": lambda eq: eq.model.equipment_type.name if eq.model and eq.model.equipment_type else "",
+    "model": lambda eq: eq.model.name if eq.model else "",
+    "manufacturer": lambda eq: eq.model.manufacturer.name if eq.model and eq.model.manufacturer else "",
+    "location": lambda eq: _format_location(eq.location),
+    "supplier": lambda eq: eq.supplier.name if eq.supplier else "",
+    "purchase_date": lambda eq: eq.purchase_date.isoformat() if eq.purchase_date else "",
+    "warranty_expiry": lambda eq: eq.warranty_expiry.isoformat() if eq.warranty_expiry else "",
+    "ip_address": lambda eq: eq.remote_ip or "",
+    "rack_position": lambda eq: f"U{eq.position_u}" if eq.position_u else "",
+    "notes": lambda eq: eq.notes or "",
+    "created_at": lambda eq: eq.created_at.isoformat() if eq.created_at else "",
+}
+
+EQUIPMENT_COLUMN_LABELS = {
+    "name": "Name",
+    "serial_number": "Serial Number",
+    "asset_tag": "Asset Tag",
+    "status": "Status",
+    "type": "Type",
+    "model": "Model",
+    "manufacturer": "Manufacturer",
+    "location": "Location",
+    "supplier": "Supplier",
+    "purchase_date": "Purchase Date",
+    "warranty_expiry": "Warranty Expiry",
+    "ip_address": "IP Address",
+    "rack_position": "Rack Position",
+    "notes": "Notes",
+    "created_at": "Created At",
+}
+
+
+def ticket_row(t: models.Ticket) -> dict:
+    """Full ticket export row."""
+    return {
+        "ticket_number": t.ticket_number,
+        "title": t.title,
+        "description": strip_html(t.description) if t.description else "",
+        "type": t.ticket_type,
+        "category": t.category or "",
+        "status": t.status,
+        "priority": t.priority,
+        "requester": t.requester.username if t.requester else "",
+        "assigned_to": t.assigned_to.username if t.assigned_to else "",
+        "equipment": t.equipment.name if t.equipment else "",
+        "sla_due_date": t.sla_due_date.isoformat() if t.sla_due_date else "",
+        "sla_breached": "Yes" if t.sla_breached else "No",
+        "resolution": strip_html(t.resolution) if t.resolution else "",
+        "created_at": t.created_at.isoformat() if t.created_at else "",
+        "resolved_at": t.resolved_at.isoformat() if t.resolved_at else "",
+        "closed_at": t.closed_at.isoformat() if t.closed_at else ""
+    }
+
+
+# Note: description and resolution use strip_html to remove HTML formatting
+TICKET_COLUMNS = {
+    "ticket_number": lambda t: t.ticket_number,
+    "title": lambda t: t.title,
+    "description": lambda t: strip_html(t.description) if t.description else "",
+    "type": lambda t: t.ticket_type,
+    "category": lambda t: t.category or "",
+    "status": lambda t: t.status,
+    "priority": lambda t: t.priority,
+    "requester": lambda t: t.requester.username if t.requester else "",
+    "requester_email": lambda t: t.requester.email if t.requester else "",
+    "assigned_to": lambda t: t.assigned_to.username if t.assigned_to else "",
+    "assigned_email": lambda t: t.assigned_to.email if t.assigned_to else "",
+    "equipment": lambda t: t.equipment.name if t.equipment else "",
+    "entity": lambda t: t.entity.name if t.entity else "",
+    "sla_due_date": lambda t: t.sla_due_date.isoformat() if t.sla_due_date else "",
+    "sla_breached": lambda t: "Yes" if t.sla_breached else "No",
+    "resolution": lambda t: strip_html(t.resolution) if t.resolution else "",
+    "created_at": lambda t: t.created_at.isoformat() if t.created_at else "",
+    "updated_at": lambda t: t.updated_at.isoformat() if t.updated_at else "",
+    "resolved_at": lambda t: t.resolved_at.isoformat() if t.resolved_at else "",
+    "closed_at": lambda t: t.closed_at.isoformat() if t.closed_at else ""
+}
+
+TICKET_COLUMN_LABELS = {
+    "ticket_number": "Ticket #",
+    "title": "Title",
+    "description": "Description",
+    "type": "Type",
+    "category": "Category",
+    "status": "Status",
+    "priority": "Priority",
+    "requester": "Requester",
+    "requester_email": "Requester Email",
+    "assigned_to": "Assigned To",
+    "assigned_email": "Assigned Email",
+    "equipment": "Equipment",
+    "entity": "Entity",
+    "sla_due_date": "SLA Due Date",
+    "sla_breached": "SLA Breached",
+    "resolution": "Resolution",
+    "created_at": "Created At",
+    "updated_at": "Updated At",
+    "resolved_at": "Resolved At",
+    "closed_at": "Closed At"
+}
+
+
+def contract_row(c: models.Contract) -> dict:
+    """Full contract export row."""
+    return {
+        "id": c.id,
+        "name": c.name,
+        "contract_number": c.contract_number or "",
+        "type": c.contract_type,
+        "status": c.status,
+        "supplier": c.supplier.name if c.supplier else "",
+        "start_date": c.start_date.isoformat() if c.start_date else "",
+        "end_date": c.end_date.isoformat() if c.end_date else "",
+        "annual_cost": c.annual_cost or "",
+        "auto_renewal": "Yes" if c.auto_renewal else "No",
+        "notice_period_days": c.notice_period_days or "",
+        "support_level": c.support_level or "",
+        "notes": c.notes or "",
+        "created_at": c.created_at.isoformat() if c.created_at else ""
+    }
+
+
+def software_row(s: models.Software) -> dict:
+    """Software export row with license and installation counts."""
+    license_count = len(s.licenses) if s.licenses else 0
+    total_seats = sum(l.quantity for l in s.licenses) if s.licenses else 0
+    installation_count = len(s.installations) if s.installations else 0
+
+    return {
+        "id": s.id,
+        "name": s.name,
+        "version": s.version or "",
+        "publisher": s.publisher or "",
+        "category": s.category or "",
+        "license_type": s.license_type or "",
+        "total_licenses": license_count,
+        "total_seats": total_seats,
+        "installations": installation_count,
+        "compliance": "OK" if installation_count <= total_seats else "Over-deployed",
+        "website": s.website or "",
+        "notes": s.notes or "",
+        "created_at": s.created_at.isoformat() if s.created_at else ""
+    }
+
+
+def ip_address_row(ip: models.IPAddress) -> dict:
+    """Full IP address export row."""
+    return {
+        "address": ip.address,
+        "subnet": ip.subnet.cidr if ip.subnet else "",
+        "status": ip.status,
+        "hostname": ip.hostname or "",
+        "mac_address": ip.mac_address or "",
+        "equipment": ip.equipment.name if ip.equipment else "",
+        "description": ip.description or "",
+        "last_seen": ip.last_seen.isoformat() if ip.last_seen else "",
+        "created_at": ip.created_at.isoformat() if ip.created_at else ""
+    }
+
+
+IP_ADDRESS_COLUMNS = {
+    "address": lambda ip: ip.address,
+    "subnet": lambda ip: ip.subnet.cidr if ip.subnet else "",
+    "status": lambda ip: ip.status,
+    "hostname": lambda ip: ip.hostname or "",
+    "mac_address": lambda ip: ip.mac_address or "",
+    "equipment": lambda ip: ip.equipment.name if ip.equipment else "",
+    "last_scanned_at": lambda ip: ip.last_scanned_at.isoformat() if ip.last_scanned_at else "",
+}
+
+IP_ADDRESS_COLUMN_LABELS = {
+    "address": "Address",
+    "subnet": "Subnet",
+    "status": "Status",
+    "hostname": "Hostname",
+    "mac_address": "MAC Address",
+    "equipment": "Equipment",
+    "last_scanned_at": "Last Scanned",
+}
+
+
+def audit_log_row(log: models.AuditLog) -> dict:
+    """Audit log export row."""
+    return {
+        "timestamp": log.timestamp.isoformat() if log.timestamp else "",
+        "username": log.username or "",
+        "action": log.action,
+        "resource_type": log.resource_type or "",
+        "resource_id": log.resource_id or "",
+        "ip_address": log.ip_address or "",
+        "extra_data": str(log.extra_data) if log.extra_data else ""
+    }
+
+
+# ==================== QUERY BUILDERS ====================
+# Shared by the streaming endpoints and the background export jobs.
+
+def build_equipment_query(
+    session: Session,
+    *,
+    entity_id: Optional[int] = None,
     status: Optional[str] = None,
     equipment_type_id: Optional[int] = None,
     location_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    ids: Optional[List[int]] = None
 ):
-    """Export equipment list to CSV."""
-    query = db.query(models.Equipment).options(
-        joinedload(models.Equipment.equipment_type),
-        joinedload(models.Equipment.model),
+    """Equipment export query with relationships needed by the row builders."""
+    query = session.query(models.Equipment).options(
+        joinedload(models.Equipment.model).joinedload(models.EquipmentModel.manufacturer),
+        joinedload(models.Equipment.model).joinedload(models.EquipmentModel.equipment_type),
         joinedload(models.Equipment.location),
         joinedload(models.Equipment.supplier)
     )
+    if ids is not None:
+        query = query.filter(models.Equipment.id.in_(ids))
 
     # Apply entity filter
-    if current_user.entity_id:
-        query = query.filter(models.Equipment.entity_id == current_user.entity_id)
+    if entity_id:
+        query = query.filter(models.Equipment.entity_id == entity_id)
 
     # Apply filters
     if status:
         query = query.filter(models.Equipment.status == status)
     if equipment_type_id:
-        query = query.filter(models.Equipment.equipment_type_id == equipment_type_id)
+        query = query.join(
+            models.EquipmentModel, models.Equipment.model_id == models.EquipmentModel.id
+        ).filter(models.EquipmentModel.equipment_type_id == equipment_type_id)
     if location_id:
         query = query.filter(models.Equipment.location_id == location_id)
 
-    equipment_list = query.order_by(models.Equipment.name).all()
-
-    data = []
-    for eq in equipment_list:
-        data.append({
-            "id": eq.id,
-            "name": eq.name,
-            "status": eq.status,
-            "type": eq.equipment_type.name if eq.equipment_type else "",
-            "model": eq.model.name if eq.model else "",
-            "manufacturer": eq.model.manufacturer.name if eq.model and eq.model.manufacturer else "",
-            "serial_number": eq.serial_number or "",
-            "asset_tag": eq.asset_tag or "",
-            "location": f"{eq.location.site}{(' / ' + eq.location.building) if eq.location.building else ''}{(' / ' + eq.location.room) if eq.location.room else ''}" if eq.location else "",
-            "supplier": eq.supplier.name if eq.supplier else "",
-            "purchase_date": eq.purchase_date.isoformat() if eq.purchase_date else "",
-            "warranty_expiry": eq.warranty_expiry.isoformat() if eq.warranty_expiry else "",
-            "purchase_price": eq.purchase_price or "",
-            "ip_address": eq.remote_ip or "",
-            "rack_position": f"U{eq.position_u}" if eq.position_u else "",
-            "notes": eq.notes or "",
-            "created_at": eq.created_at.isoformat() if eq.created_at else ""
-        })
-
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    filename = f"equipment_export_{timestamp}.csv"
-
-    logger.info(f"Equipment export generated by {current_user.username}: {len(data)} items")
-    return generate_csv(data, filename)
+    return query.order_by(models.Equipment.name)
+
+
+def build_tickets_query(
+    session: Session,
+    *,
+    user_id: int,
+    role: str,
+    entity_id: Optional[int] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    ticket_type: Optional[str] = None,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    ids: Optional[List[int]] = None
+):
+    """Ticket export query, scoped to what the requesting user may see."""
+    query = session.query(models.Ticket).options(
+        joinedload(models.Ticket.requester),
+        joinedload(models.Ticket.assigned_to),
+        joinedload(models.Ticket.equipment),
+        joinedload(models.Ticket.entity)
+    )
+    if ids is not None:
+        query = query.filter(models.Ticket.id.in_(ids))
+
+    # Access control - tech, admin, and superadmin can see all tickets in their entity
+    if role not in ("tech", "admin", "superadmin"):
+        query = query.filter(models.Ticket.requester_id == user_id)
+    elif entity_id:
+        query = query.filter(models.Ticket.entity_id == entity_id)
+
+    # Apply filters
+    if status:
+        query = query.filter(models.Ticket.status == status)
+    if priority:
+        query = query.filter(models.Ticket.priority == priority)
+    if ticket_type:
+        query = query.filter(models.Ticket.ticket_type == ticket_type)
+    if from_date:
+        query = query.filter(models.Ticket.created_at >= from_date)
+    if to_date:
+        query = query.filter(models.Ticket.created_at <= to_date)
+
+    return query.order_by(models.Ticket.created_at.desc())
+
+
+def build_audit_logs_query(
+    session: Session,
+    *,
+    action: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    username: Optional[str] = None,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    limit: Optional[int] = None
+):
+    """Audit log export query, newest first."""
+    query = session.query(models.AuditLog)
+
+    # Apply filters
+    if action:
+        query = query.filter(models.AuditLog.action == action)
+    if resource_type:
+        query = query.filter(models.AuditLog.resource_type == resource_type)
+    if username:
+        query = query.filter(models.AuditLog.username.ilike(f"%{username}%"))
+    if from_date:
+        query = query.filter(models.AuditLog.timestamp >= from_date)
+    if to_date:
+        query = query.filter(models.AuditLog.timestamp <= to_date)
+
+    query = query.order_by(models.AuditLog.timestamp.desc())
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+# ==================== EQUIPMENT EXPORT ====================
+
+@router.get("/equipment")
+def export_equipment(
+    status: Optional[str] = None,
+    equipment_type_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """Export equipment list to CSV."""
+    build_query = partial(
+        build_equipment_query,
+        entity_id=current_user.entity_id,
+        status=status,
+        equipment_type_id=equipment_type_id,
+        location_id=location_id
+    )
+
+    filename = f"equipment_export_{export_timestamp()}.csv"
+    rows = iter_export_rows(build_query, equipment_row, "Equipment", current_user.username)
+    return generate_csv(rows, filename)
 
 
 @router.post("/equipment/bulk")
@@ -209,81 +504,30 @@ def export_equipment_bulk(
     current_user: models.User = Depends(get_current_user)
 ):
     """Export selected equipment with specific columns to CSV or XLSX."""
-    column_mapping = {
-        "name": lambda eq: eq.name,
-        "serial_number": lambda eq: eq.serial_number or "",
-        "asset_tag": lambda eq: eq.asset_tag or "",
-        "status": lambda eq: eq.status,
-        "type": lambda eq: eq.model.equipment_type.name if eq.model and eq.model.equipment_type else "",
-        "model": lambda eq: eq.model.name if eq.model else "",
-        "manufacturer": lambda eq: eq.model.manufacturer.name if eq.model and eq.model.manufacturer else "",
-        "location": lambda eq: f"{eq.location.site}{(' / ' + eq.location.building) if eq.location and eq.location.building else ''}{(' / ' + eq.location.room) if eq.location and eq.location.room else ''}" if eq.location else "",
-        "supplier": lambda eq: eq.supplier.name if eq.supplier else "",
-        "purchase_date": lambda eq: eq.purchase_date.isoformat() if eq.purchase_date else "",
-        "warranty_expiry": lambda eq: eq.warranty_expiry.isoformat() if eq.warranty_expiry else "",
-        "ip_address": lambda eq: eq.remote_ip or "",
-        "rack_position": lambda eq: f"U{eq.position_u}" if eq.position_u else "",
-        "notes": lambda eq: eq.notes or "",
-        "created_at": lambda eq: eq.created_at.isoformat() if eq.created_at else "",
-    }
-
-    invalid_columns = [col for col in request.columns if col not in column_mapping]
-    if invalid_columns:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid columns: {', '.join(invalid_columns)}. Valid columns: {', '.join(column_mapping.keys())}"
-        )
-
-    query = db.query(models.Equipment).options(
-        joinedload(models.Equipment.model).joinedload(models.EquipmentModel.manufacturer),
-        joinedload(models.Equipment.model).joinedload(models.EquipmentModel.equipment_type),
-        joinedload(models.Equipment.location),
-        joinedload(models.Equipment.supplier)
-    ).filter(models.Equipment.id.in_(request.equipment_ids))
-
-    if current_user.entity_id:
-        query = query.filter(models.Equipment.entity_id == current_user.entity_id)
-
-    equipment_list = query.order_by(models.Equipment.name).all()
+    _validate_columns(EQUIPMENT_COLUMNS, request.columns)
+    build_query = partial(
+        build_equipment_query,
+        entity_id=current_user.entity_id,
+        ids=request.equipment_ids
+    )
 
-    if not equipment_list:
+    if build_query(db).first() is None:
         raise HTTPException(status_code=404, detail="No equipment found matching the selection")
 
-    data = []
-    for eq in equipment_list:
-        row = {}
-        for col in request.columns:
-            row[col] = column_mapping[col](eq)
-        data.append(row)
-
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-
-    column_labels = {
-        "name": "Name",
-        "serial_number": "Serial Number",
-        "asset_tag": "Asset Tag",
-        "status": "Status",
-        "type": "Type",
-        "model": "Model",
-        "manufacturer": "Manufacturer",
-        "location": "Location",
-        "supplier": "Supplier",
-        "purchase_date": "Purchase Date",
-        "warranty_expiry": "Warranty Expiry",
-        "ip_address": "IP Address",
-        "rack_position": "Rack Position",
-        "notes": "Notes",
-        "created_at": "Created At",
-    }
-
-    logger.info(f"Bulk equipment export generated by {current_user.username}: {len(data)} items, format: {request.format}")
+    timestamp = export_timestamp()
+    rows = iter_export_rows(
+        build_query,
+        _select_columns(EQUIPMENT_COLUMNS, request.columns),
+        f"Bulk equipment ({request.format})",
+        current_user.username
+    )
 
     if request.format == "xlsx":
         filename = f"equipment_export_{timestamp}.xlsx"
-        return generate_xlsx(data, filename, column_labels)
+        return generate_xlsx(rows, filename, EQUIPMENT_COLUMN_LABELS)
     else:
         filename = f"equipment_export_{timestamp}.csv"
-        return generate_csv(data, filename)
+        return generate_csv(rows, filename)
 
 
 # ==================== TICKETS EXPORT ====================
@@ -299,66 +543,21 @@ def export_tickets(
     current_user: models.User = Depends(get_current_user)
 ):
     """Export tickets to CSV."""
-    query = db.query(models.Ticket).options(
-        joinedload(models.Ticket.requester),
-        joinedload(models.Ticket.assigned_to),
-        joinedload(models.Ticket.equipment)
+    build_query = partial(
+        build_tickets_query,
+        user_id=current_user.id,
+        role=current_user.role,
+        entity_id=current_user.entity_id,
+        status=status,
+        priority=priority,
+        ticket_type=ticket_type,
+        from_date=_parse_iso_date(date_from, "date_from"),
+        to_date=_parse_iso_date(date_to, "date_to")
     )
 
-    # Access control - tech, admin, and superadmin can see all tickets in their entity
-    if current_user.role not in ("tech", "admin", "superadmin"):
-        query = query.filter(models.Ticket.requester_id == current_user.id)
-    elif current_user.entity_id:
-        query = query.filter(models.Ticket.entity_id == current_user.entity_id)
-
-    # Apply filters
-    if status:
-        query = query.filter(models.Ticket.status == status)
-    if priority:
-        query = query.filter(models.Ticket.priority == priority)
-    if ticket_type:
-        query = query.filter(models.Ticket.ticket_type == ticket_type)
-    if date_from:
-        try:
-            from_date = datetime.fromisoformat(date_from)
-            query = query.filter(models.Ticket.created_at >= from_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date_from format. Use ISO format.")
-    if date_to:
-        try:
-            to_date = datetime.fromisoformat(date_to)
-            query = query.filter(models.Ticket.created_at <= to_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date_to format. Use ISO format.")
-
-    tickets = query.order_by(models.Ticket.created_at.desc()).all()
-
-    data = []
-    for t in tickets:
-        data.append({
-            "ticket_number": t.ticket_number,
-            "title": t.title,
-            "description": strip_html(t.description) if t.description else "",
-            "type": t.ticket_type,
-            "category": t.category or "",
-            "status": t.status,
-            "priority": t.priority,
-            "requester": t.requester.username if t.requester else "",
-            "assigned_to": t.assigned_to.username if t.assigned_to else "",
-            "equipment": t.equipment.name if t.equipment else "",
-            "sla_due_date": t.sla_due_date.isoformat() if t.sla_due_date else "",
-            "sla_breached": "Yes" if t.sla_breached else "No",
-            "resolution": strip_html(t.resolution) if t.resolution else "",
-            "created_at": t.created_at.isoformat() if t.created_at else "",
-            "resolved_at": t.resolved_at.isoformat() if t.resolved_at else "",
-            "closed_at": t.closed_at.isoformat() if t.closed_at else ""
-        })
-
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    filename = f"tickets_export_{timestamp}.csv"
-
-    logger.info(f"Tickets export generated by {current_user.username}: {len(data)} items")
-    return generate_csv(data, filename)
+    filename = f"tickets_export_{export_timestamp()}.csv"
+    rows = iter_export_rows(build_query, ticket_row, "Tickets", current_user.username)
+    return generate_csv(rows, filename)
 
 
 @router.post("/tickets/bulk")
@@ -368,100 +567,32 @@ def export_tickets_bulk(
     current_user: models.User = Depends(get_current_user)
 ):
     """Export selected tickets with specific columns to CSV."""
-    # Define all available columns and their mapping functions
-    # Note: description and resolution use strip_html to remove HTML formatting
-    column_mapping = {
-        "ticket_number": lambda t: t.ticket_number,
-        "title": lambda t: t.title,
-        "description": lambda t: strip_html(t.description) if t.description else "",
-        "type": lambda t: t.ticket_type,
-        "category": lambda t: t.category or "",
-        "status": lambda t: t.status,
-        "priority": lambda t: t.priority,
-        "requester": lambda t: t.requester.username if t.requester else "",
-        "requester_email": lambda t: t.requester.email if t.requester else "",
-        "assigned_to": lambda t: t.assigned_to.username if t.assigned_to else "",
-        "assigned_email": lambda t: t.assigned_to.email if t.assigned_to else "",
-        "equipment": lambda t: t.equipment.name if t.equipment else "",
-        "entity": lambda t: t.entity.name if t.entity else "",
-        "sla_due_date": lambda t: t.sla_due_date.isoformat() if t.sla_due_date else "",
-        "sla_breached": lambda t: "Yes" if t.sla_breached else "No",
-        "resolution": lambda t: strip_html(t.resolution) if t.resolution else "",
-        "created_at": lambda t: t.created_at.isoformat() if t.created_at else "",
-        "updated_at": lambda t: t.updated_at.isoformat() if t.updated_at else "",
-        "resolved_at": lambda t: t.resolved_at.isoformat() if t.resolved_at else "",
-        "closed_at": lambda t: t.closed_at.isoformat() if t.closed_at else ""
-    }
-
-    # Validate columns
-    invalid_columns = [col for col in request.columns if col not in column_mapping]
-    if invalid_columns:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid columns: {', '.join(invalid_columns)}. Valid columns: {', '.join(column_mapping.keys())}"
-        )
-
-    # Fetch tickets by IDs
-    query = db.query(models.Ticket).options(
-        joinedload(models.Ticket.requester),
-        joinedload(models.Ticket.assigned_to),
-        joinedload(models.Ticket.equipment),
-        joinedload(models.Ticket.entity)
-    ).filter(models.Ticket.id.in_(request.ticket_ids))
-
-    # Access control
-    if current_user.role not in ("tech", "admin", "superadmin"):
-        query = query.filter(models.Ticket.requester_id == current_user.id)
-    elif current_user.entity_id:
-        query = query.filter(models.Ticket.entity_id == current_user.entity_id)
-
-    tickets = query.order_by(models.Ticket.created_at.desc()).all()
+    _validate_columns(TICKET_COLUMNS, request.columns)
+    build_query = partial(
+        build_tickets_query,
+        user_id=current_user.id,
+        role=current_user.role,
+        entity_id=current_user.entity_id,
+        ids=request.ticket_ids
+    )
 
-    if not tickets:
+    if build_query(db).first() is None:
         raise HTTPException(status_code=404, detail="No tickets found matching the selection")
 
-    # Build export data with only selected columns
-    data = []
-    for t in tickets:
-        row = {}
-        for col in request.columns:
-            row[col] = column_mapping[col](t)
-        data.append(row)
-
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-
-    # Column labels for nice headers
-    column_labels = {
-        "ticket_number": "Ticket #",
-        "title": "Title",
-        "description": "Description",
-        "type": "Type",
-        "category": "Category",
-        "status": "Status",
-        "priority": "Priority",
-        "requester": "Requester",
-        "requester_email": "Requester Email",
-        "assigned_to": "Assigned To",
-        "assigned_email": "Assigned Email",
-        "equipment": "Equipment",
-        "entity": "Entity",
-        "sla_due_date": "SLA Due Date",
-        "sla_breached": "SLA Breached",
-        "resolution": "Resolution",
-        "created_at": "Created At",
-        "updated_at": "Updated At",
-        "resolved_at": "Resolved At",
-        "closed_at": "Closed At"
-    }
-
-    logger.info(f"Bulk tickets export generated by {current_user.username}: {len(data)} items, format: {request.format}")
+    timestamp = export_timestamp()
+    rows = iter_export_rows(
+        build_query,
+        _select_columns(TICKET_COLUMNS, request.columns),
+        f"Bulk tickets ({request.format})",
+        current_user.username
+    )
 
     if request.format == "xlsx":
         filename = f"tickets_export_{timestamp}.xlsx"
-        return generate_xlsx(data, filename, column_labels)
+        return generate_xlsx(rows, filename, TICKET_COLUMN_LABELS)
     else:
         filename = f"tickets_export_{timestamp}.csv"
-        return generate_csv(data, filename)
+        return generate_csv(rows, filename)
 
 
 # ==================== CONTRACTS EXPORT ====================
@@ -474,46 +605,28 @@ def export_contracts(
     current_user: models.User = Depends(get_current_admin_user)
 ):
     """Export contracts to CSV."""
-    query = db.query(models.Contract).options(
-        joinedload(models.Contract.supplier)
-    )
+    entity_id = current_user.entity_id
 
-    # Apply entity filter
-    if current_user.entity_id:
-        query = query.filter(models.Contract.entity_id == current_user.entity_id)
+    def build_query(session: Session):
+        query = session.query(models.Contract).options(
+            joinedload(models.Contract.supplier)
+        )
 
-    # Apply filters
-    if contract_type:
-        query = query.filter(models.Contract.contract_type == contract_type)
-    if status:
-        query = query.filter(models.Contract.status == status)
-
-    contracts = query.order_by(models.Contract.end_date.desc()).all()
-
-    data = []
-    for c in contracts:
-        data.append({
-            "id": c.id,
-            "name": c.name,
-            "contract_number": c.contract_number or "",
-            "type": c.contract_type,
-            "status": c.status,
-            "supplier": c.supplier.name if c.supplier else "",
-            "start_date": c.start_date.isoformat() if c.start_date else "",
-            "end_date": c.end_date.isoformat() if c.end_date else "",
-            "annual_cost": c.annual_cost or "",
-            "auto_renewal": "Yes" if c.auto_renewal else "No",
-            "notice_period_days": c.notice_period_days or "",
-            "support_level": c.support_level or "",
-            "notes": c.notes or "",
-            "created_at": c.created_at.isoformat() if c.created_at else ""
-        })
-
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    filename = f"contracts_export_{timestamp}.csv"
-
-    logger.info(f"Contracts export generated by {current_user.username}: {len(data)} items")
-    return generate_csv(data, filename)
+        # Apply entity filter
+        if entity_id:
+            query = query.filter(models.Contract.entity_id == entity_id)
+
+        # Apply filters
+        if contract_type:
+            query = query.filter(models.Contract.contract_type == contract_type)
+        if status:
+            query = query.filter(models.Contract.status == status)
+
+        return query.order_by(models.Contract.end_date.desc())
+
+    filename = f"contracts_export_{export_timestamp()}.csv"
+    rows = iter_export_rows(build_query, contract_row, "Contracts", current_user.username)
+    return generate_csv(rows, filename)
 
 
 # ==================== SOFTWARE EXPORT ====================
@@ -525,46 +638,28 @@ def export_software(
     current_user: models.User = Depends(get_current_admin_user)
 ):
     """Export software catalog with license information to CSV."""
-    query = db.query(models.Software)
+    entity_id = current_user.entity_id
 
-    # Apply entity filter
-    if current_user.entity_id:
-        query = query.filter(models.Software.entity_id == current_user.entity_id)
+    def build_query(session: Session):
+        # selectinload loads licenses/installations once per cursor batch
+        query = session.query(models.Software).options(
+            selectinload(models.Software.licenses),
+            selectinload(models.Software.installations)
+        )
 
-    # Apply filters
-    if category:
-        query = query.filter(models.Software.category == category)
-
-    software_list = query.order_by(models.Software.name).all()
-
-    data = []
-    for s in software_list:
-        # Count licenses and installations
-        license_count = len(s.licenses) if s.licenses else 0
-        total_seats = sum(l.quantity for l in s.licenses) if s.licenses else 0
-        installation_count = len(s.installations) if s.installations else 0
-
-        data.append({
-            "id": s.id,
-            "name": s.name,
-            "version": s.version or "",
-            "publisher": s.publisher or "",
-            "category": s.category or "",
-            "license_type": s.license_type or "",
-            "total_licenses": license_count,
-            "total_seats": total_seats,
-            "installations": installation_count,
-            "compliance": "OK" if installation_count <= total_seats else "Over-deployed",
-            "website": s.website or "",
-            "notes": s.notes or "",
-            "created_at": s.created_at.isoformat() if s.created_at else ""
-        })
-
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    filename = f"software_export_{timestamp}.csv"
-
-    logger.info(f"Software export generated by {current_user.username}: {len(data)} items")
-    return generate_csv(data, filename)
+        # Apply entity filter
+        if entity_id:
+            query = query.filter(models.Software.entity_id == entity_id)
+
+        # Apply filters
+        if category:
+            query = query.filter(models.Software.category == category)
+
+        return query.order_by(models.Software.name)
+
+    filename = f"software_export_{export_timestamp()}.csv"
+    rows = iter_export_rows(build_query, software_row, "Software", current_user.username)
+    return generate_csv(rows, filename)
 
 
 # ==================== IP ADDRESSES EXPORT ====================
@@ -577,44 +672,31 @@ def export_ip_addresses(
     current_user: models.User = Depends(get_current_admin_user)
 ):
     """Export IP addresses to CSV."""
-    query = db.query(models.IPAddress).options(
-        joinedload(models.IPAddress.subnet),
-        joinedload(models.IPAddress.equipment)
-    )
+    entity_id = current_user.entity_id
 
-    # Apply entity filter via subnet
-    if current_user.entity_id:
-        query = query.join(models.Subnet).filter(
-            models.Subnet.entity_id == current_user.entity_id
+    def build_query(session: Session):
+        query = session.query(models.IPAddress).options(
+            joinedload(models.IPAddress.subnet),
+            joinedload(models.IPAddress.equipment)
         )
 
-    # Apply filters
-    if subnet_id:
-        query = query.filter(models.IPAddress.subnet_id == subnet_id)
-    if status:
-        query = query.filter(models.IPAddress.status == status)
-
-    ip_addresses = query.order_by(models.IPAddress.address).all()
-
-    data = []
-    for ip in ip_addresses:
-        data.append({
-            "address": ip.address,
-            "subnet": ip.subnet.cidr if ip.subnet else "",
-            "status": ip.status,
-            "hostname": ip.hostname or "",
-            "mac_address": ip.mac_address or "",
-            "equipment": ip.equipment.name if ip.equipment else "",
-            "description": ip.description or "",
-            "last_seen": ip.last_seen.isoformat() if ip.last_seen else "",
-            "created_at": ip.created_at.isoformat() if ip.created_at else ""
-        })
-
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    filename = f"ip_addresses_export_{timestamp}.csv"
+        # Apply entity filter via subnet
+        if entity_id:
+            query = query.join(models.Subnet).filter(
+                models.Subnet.entity_id == entity_id
+            )
+
+        # Apply filters
+        if subnet_id:
+            query = query.filter(models.IPAddress.subnet_id == subnet_id)
+        if status:
+            query = query.filter(models.IPAddress.status == status)
 
-    logger.info(f"IP addresses export generated by {current_user.username}: {len(data)} items")
-    return generate_csv(data, filename)
+        return query.order_by(models.IPAddress.address)
+
+    filename = f"ip_addresses_export_{export_timestamp()}.csv"
+    rows = iter_export_rows(build_query, ip_address_row, "IP addresses", current_user.username)
+    return generate_csv(rows, filename)
 
 
 @router.post("/ip-addresses/bulk")
@@ -624,59 +706,39 @@ def export_ip_addresses_bulk(
     current_user: models.User = Depends(get_current_user)
 ):
     """Export selected IP addresses to CSV or XLSX."""
-    column_mapping = {
-        "address": lambda ip: ip.address,
-        "subnet": lambda ip: ip.subnet.cidr if ip.subnet else "",
-        "status": lambda ip: ip.status,
-        "hostname": lambda ip: ip.hostname or "",
-        "mac_address": lambda ip: ip.mac_address or "",
-        "equipment": lambda ip: ip.equipment.name if ip.equipment else "",
-        "last_scanned_at": lambda ip: ip.last_scanned_at.isoformat() if ip.last_scanned_at else "",
-    }
-    invalid_columns = [c for c in request.columns if c not in column_mapping]
-    if invalid_columns:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid columns: {', '.join(invalid_columns)}. Valid: {', '.join(column_mapping.keys())}"
-        )
-
-    query = (
-        db.query(models.IPAddress)
-        .options(
-            joinedload(models.IPAddress.subnet),
-            joinedload(models.IPAddress.equipment)
-        )
-        .filter(models.IPAddress.id.in_(request.ip_ids))
-    )
-    if current_user.entity_id:
-        query = query.join(models.Subnet).filter(
-            models.Subnet.entity_id == current_user.entity_id
+    _validate_columns(IP_ADDRESS_COLUMNS, request.columns, valid_label="Valid")
+    entity_id = current_user.entity_id
+
+    def build_query(session: Session):
+        query = (
+            session.query(models.IPAddress)
+            .options(
+                joinedload(models.IPAddress.subnet),
+                joinedload(models.IPAddress.equipment)
+            )
+            .filter(models.IPAddress.id.in_(request.ip_ids))
         )
-    ip_addresses = query.order_by(models.IPAddress.address).all()
+        if entity_id:
+            query = query.join(models.Subnet).filter(
+                models.Subnet.entity_id == entity_id
+            )
+        return query.order_by(models.IPAddress.address)
 
-    if not ip_addresses:
+    if build_query(db).first() is None:
         raise HTTPException(status_code=404, detail="No IP addresses found for the selection")
 
-    data = []
-    for ip in ip_addresses:
-        row = {col: column_mapping[col](ip) for col in request.columns}
-        data.append(row)
-
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    column_labels = {
-        "address": "Address",
-        "subnet": "Subnet",
-        "status": "Status",
-        "hostname": "Hostname",
-        "mac_address": "MAC Address",
-        "equipment": "Equipment",
-        "last_scanned_at": "Last Scanned",
-    }
+    timestamp = export_timestamp()
+    rows = iter_export_rows(
+        build_query,
+        _select_columns(IP_ADDRESS_COLUMNS, request.columns),
+        f"Bulk IP addresses ({request.format})",
+        current_user.username
+    )
     if request.format == "xlsx":
         filename = f"ip_addresses_export_{timestamp}.xlsx"
-        return generate_xlsx(data, filename, column_labels)
+        return generate_xlsx(rows, filename, IP_ADDRESS_COLUMN_LABELS)
     filename = f"ip_addresses_export_{timestamp}.csv"
-    return generate_csv(data, filename)
+    return generate_csv(rows, filename)
 
 
 # ==================== AUDIT LOGS EXPORT ====================
@@ -693,44 +755,560 @@ def export_audit_logs(
     current_user: models.User = Depends(get_current_admin_user)
 ):
     """Export audit logs to CSV (admin only)."""
-    query = db.query(models.AuditLog)
+    build_query = partial(
+        build_audit_logs_query,
+        action=action,
+        resource_type=resource_type,
+        username=username,
+        from_date=_parse_iso_date(date_from, "date_from"),
+        to_date=_parse_iso_date(date_to, "date_to"),
+        limit=limit
+    )
 
-    # Apply filters
-    if action:
-        query = query.filter(models.AuditLog.action == action)
-    if resource_type:
-        query = query.filter(models.AuditLog.resource_type == resource_type)
-    if username:
-        query = query.filter(models.AuditLog.username.ilike(f"%{username}%"))
-    if date_from:
-        try:
-            from_date = datetime.fromisoformat(date_from)
-            query = query.filter(models.AuditLog.timestamp >= from_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date_from format. Use ISO format.")
-    if date_to:
-        try:
-            to_date = datetime.fromisoformat(date_to)
-            query = query.filter(models.AuditLog.timestamp <= to_date)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date_to format. Use ISO format.")
-
-    logs = query.order_by(models.AuditLog.timestamp.desc()).limit(limit).all()
-
-    data = []
-    for log in logs:
-        data.append({
-            "timestamp": log.timestamp.isoformat() if log.timestamp else "",
-            "username": log.username or "",
-            "action": log.action,
-            "resource_type": log.resource_type or "",
-            "resource_id": log.resource_id or "",
-            "ip_address": log.ip_address or "",
-            "extra_data": str(log.extra_data) if log.extra_data else ""
-        })
-
-    timestamp_str = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    filename = f"audit_logs_export_{timestamp_str}.csv"
-
-    logger.info(f"Audit logs export generated by {current_user.username}: {len(data)} items")
-    return generate_csv(data, filename)
+    filename = f"audit_logs_export_{export_timestamp()}.csv"
+    rows = iter_export_rows(build_query, audit_log_row, "Audit logs", current_user.username)
+    return generate_csv(rows, filename)
+
+
+# ==================== BACKGROUND EXPORT JOBS ====================
+# Large exports run as Celery tasks (worker.tasks.run_export_job_task) that
+# write to the export directory; the file is downloaded once the job completes.
+
+EXPORT_JOB_TYPES = {
+    "tickets": {
+        "label": "Tickets",
+        "row_builder": ticket_row,
+        "column_labels": TICKET_COLUMN_LABELS,
+        "filters": ("status", "priority", "ticket_type", "date_from", "date_to"),
+        "admin_only": False,
+    },
+    "equipment": {
+        "label": "Equipment",
+        "row_builder": equipment_row,
+        "column_labels": EQUIPMENT_COLUMN_LABELS,
+        "filters": ("status", "equipment_type_id", "location_id"),
+        "admin_only": True,
+    },
+    "audit_logs": {
+        "label": "Audit logs",
+        "row_builder": audit_log_row,
+        "column_labels": None,
+        "filters": ("action", "resource_type", "username", "date_from", "date_to", "limit"),
+        "admin_only": True,
+    },
+}
+
+_INT_JOB_FILTERS = ("equipment_type_id", "location_id", "limit")
+_DATE_JOB_FILTERS = ("date_from", "date_to")
+
+
+def _validate_job_filters(export_type: str, filters: dict) -> dict:
+    """Validate job filters against the export type, raising 400 on bad input."""
+    allowed = EXPORT_JOB_TYPES[export_type]["filters"]
+    invalid = [key for key in filters if key not in allowed]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid filters: {', '.join(invalid)}. Valid filters: {', '.join(allowed)}"
+        )
+
+    cleaned = {}
+    for key, value in filters.items():
+        if value is None or value == "":
+            continue
+        if key in _INT_JOB_FILTERS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail=f"Filter '{key}' must be an integer")
+        elif key in _DATE_JOB_FILTERS:
+            _parse_iso_date(str(value), key)
+            value = str(value)
+        else:
+            value = str(value)
+        cleaned[key] = value
+    return cleaned
+
+
+def build_export_job_query(session: Session, export_type: str, filters: dict, user: models.User):
+    """Build the export query for a background job, scoped to the requesting user."""
+    from_date = _parse_iso_date(filters.get("date_from"), "date_from")
+    to_date = _parse_iso_date(filters.get("date_to"), "date_to")
+
+    if export_type == "tickets":
+        return build_tickets_query(
+            session,
+            user_id=user.id,
+            role=user.role,
+            entity_id=user.entity_id,
+            status=filters.get("status"),
+            priority=filters.get("priority"),
+            ticket_type=filters.get("ticket_type"),
+            from_date=from_date,
+            to_date=to_date
+        )
+    if export_type == "equipment":
+        return build_equipment_query(
+            session,
+            entity_id=user.entity_id,
+            status=filters.get("status"),
+            equipment_type_id=filters.get("equipment_type_id"),
+            location_id=filters.get("location_id")
+        )
+    if export_type == "audit_logs":
+        return build_audit_logs_query(
+            session,
+            action=filters.get("action"),
+            resource_type=filters.get("resource_type"),
+            username=filters.get("username"),
+            from_date=from_date,
+            to_date=to_date,
+            limit=filters.get("limit")
+        )
+    raise ValueError(f"Unknown export type: {export_type}")
+
+
+def export_job_path(job: models.ExportJob) -> Optional[Path]:
+    """Absolute path of a job's file inside the export directory."""
+    if not job.filename:
+        return None
+    return Path(settings.export_dir) / job.filename
+
+
+def _get_user_export_job(db: Session, job_id: int, current_user: models.User) -> models.ExportJob:
+    query = db.query(models.ExportJob).filter(models.ExportJob.id == job_id)
+    if current_user.role != "superadmin":
+        query = query.filter(models.ExportJob.requested_by_id == current_user.id)
+    job = query.first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+def _export_job_response(job: models.ExportJob) -> schemas.ExportJob:
+    """Serialize a job, adding live progress from the Celery task state."""
+    response = schemas.ExportJob.model_validate(job)
+    if job.status == "running" and job.task_id:
+        result = AsyncResult(job.task_id, app=run_export_job_task.app)
+        if result.state == "PROGRESS" and isinstance(result.info, dict):
+            response.progress = {
+                "processed": result.info.get("processed", 0),
+                "total": result.info.get("total"),
+            }
+    return response
+
+
+@router.post("/jobs", response_model=schemas.ExportJob, status_code=202)
+def create_export_job(
+    request: schemas.ExportJobCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Queue an export to run in the background."""
+    spec = EXPORT_JOB_TYPES[request.export_type]
+    if spec["admin_only"] and current_user.role not in ("admin", "superadmin"):
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+
+    filters = _validate_job_filters(request.export_type, request.filters)
+
+    job = models.ExportJob(
+        export_type=request.export_type,
+        format=request.format,
+        filters=filters,
+        status="pending",
+        requested_by_id=current_user.id,
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=settings.export_retention_hours)
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    task = run_export_job_task.delay(job.id)
+    job.task_id = task.id
+    db.commit()
+    db.refresh(job)
+
+    logger.info(f"{spec['label']} export job {job.id} queued by {current_user.username} ({request.format})")
+    return _export_job_response(job)
+
+
+@router.get("/jobs", response_model=List[schemas.ExportJob])
+def list_export_jobs(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """List the current user's export jobs, newest first."""
+    jobs = db.query(models.ExportJob).filter(
+        models.ExportJob.requested_by_id == current_user.id
+    ).order_by(models.ExportJob.created_at.desc()).limit(50).all()
+    return [_export_job_response(job) for job in jobs]
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.ExportJob)
+def get_export_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Get an export job's status and progress."""
+    job = _get_user_export_job(db, job_id, current_user)
+    return _export_job_response(job)
+
+
+@router.get("/jobs/{job_id}/download")
+def download_export_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Download the file produced by a completed export job."""
+    job = _get_user_export_job(db, job_id, current_user)
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}")
+
+    path = export_job_path(job)
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=410, detail="Export file is no longer available")
+
+    media_type = (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        if job.format == "xlsx" else "text/csv"
+    )
+    return FileResponse(path, media_type=media_type, filename=job.filename)
+
+
+@router.delete("/jobs/{job_id}")
+def delete_export_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Cancel a running export job or delete a finished one and its file."""
+    job = _get_user_export_job(db, job_id, current_user)
+
+    if job.status in ("pending", "running") and job.task_id:
+        run_export_job_task.app.control.revoke(job.task_id, terminate=True)
+
+    path = export_job_path(job)
+    if path is not None:
+        path.unlink(missing_ok=True)
+
+    db.delete(job)
+    db.commit()
+    return {"ok": True}
+
+
+# ==================== WAREHOUSE (COLUMNAR) EXPORT ====================
+# Typed Parquet / Arrow IPC exports for analytics. Rows are read with Core
+# selects in server-side cursor batches; each batch becomes one Arrow
+# record batch. With ``since`` only rows changed after that timestamp are
+# exported; the ``X-Export-Watermark`` response header holds the value to
+# pass as ``since`` on the next run (rows are keyed by ``id`` for upserts).
+
+_TIMESTAMP = pa.timestamp("us", tz="UTC")
+_JSON_MAP = pa.map_(pa.string(), pa.string())
+
+WAREHOUSE_MEDIA_TYPES = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def _json_text(value: Any) -> Optional[str]:
+    """Render a JSON value as text (strings are kept as-is)."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, default=str)
+
+
+def _flatten_json_object(value: Any) -> Optional[list]:
+    """Flatten a JSONB object into (key, text value) pairs for an Arrow map column."""
+    if not isinstance(value, dict):
+        return None
+    return [(str(key), _json_text(item)) for key, item in value.items()]
+
+
+def _flatten_equipment_row(row: dict) -> dict:
+    row["model_specs"] = _flatten_json_object(row["model_specs"])
+    return row
+
+
+def _flatten_audit_log_row(row: dict) -> dict:
+    changes = row["changes"]
+    if isinstance(changes, dict):
+        row["changes"] = [
+            {
+                "field": str(field),
+                "old_value": _json_text(change.get("old")) if isinstance(change, dict) else None,
+                "new_value": _json_text(change.get("new")) if isinstance(change, dict) else _json_text(change),
+            }
+            for field, change in changes.items()
+        ]
+    else:
+        row["changes"] = None
+    row["extra_data"] = _flatten_json_object(row["extra_data"])
+    return row
+
+
+def _warehouse_tickets_statement(entity_id: Optional[int]):
+    requester = aliased(models.User)
+    assignee = aliased(models.User)
+    t = models.Ticket
+    stmt = (
+        select(
+            t.id, t.ticket_number, t.title, t.ticket_type, t.category, t.subcategory,
+            t.status, t.priority, t.impact, t.urgency,
+            t.requester_id, requester.username.label("requester"),
+            t.assigned_to_id, assignee.username.label("assigned_to"), t.assigned_group,
+            t.equipment_id, t.entity_id,
+            t.sla_due_date, t.first_response_at, t.sla_breached, t.resolution_code, t.rating,
+            t.created_at, t.updated_at, t.resolved_at, t.closed_at, t.is_deleted
+        )
+        .outerjoin(requester, t.requester_id == requester.id)
+        .outerjoin(assignee, t.assigned_to_id == assignee.id)
+    )
+    if entity_id:
+        stmt = stmt.where(t.entity_id == entity_id)
+    return stmt
+
+
+def _warehouse_time_entries_statement(entity_id: Optional[int]):
+    te = models.TicketTimeEntry
+    stmt = (
+        select(
+            te.id, te.ticket_id, models.Ticket.ticket_number,
+            te.user_id, models.User.username,
+            te.minutes, te.entry_type, te.is_billable, te.hourly_rate,
+            te.work_date, te.created_at, te.updated_at
+        )
+        .join(models.Ticket, te.ticket_id == models.Ticket.id)
+        .outerjoin(models.User, te.user_id == models.User.id)
+    )
+    if entity_id:
+        stmt = stmt.where(models.Ticket.entity_id == entity_id)
+    return stmt
+
+
+def _warehouse_equipment_statement(entity_id: Optional[int]):
+    eq = models.Equipment
+    stmt = (
+        select(
+            eq.id, eq.name, eq.serial_number, eq.asset_tag, eq.status,
+            eq.model_id, models.EquipmentModel.name.label("model"),
+            models.Manufacturer.name.label("manufacturer"),
+            models.EquipmentType.name.label("type"),
+            models.EquipmentModel.specs.label("model_specs"),
+            eq.location_id, eq.supplier_id, eq.entity_id, eq.rack_id, eq.position_u,
+            eq.purchase_date, eq.purchase_price, eq.warranty_expiry, eq.end_of_support,
+            eq.created_at, eq.updated_at
+        )
+        .outerjoin(models.EquipmentModel, eq.model_id == models.EquipmentModel.id)
+        .outerjoin(models.Manufacturer, models.EquipmentModel.manufacturer_id == models.Manufacturer.id)
+        .outerjoin(models.EquipmentType, models.EquipmentModel.equipment_type_id == models.EquipmentType.id)
+    )
+    if entity_id:
+        stmt = stmt.where(eq.entity_id == entity_id)
+    return stmt
+
+
+def _warehouse_audit_logs_statement(entity_id: Optional[int]):
+    log = models.AuditLog
+    stmt = select(
+        log.id, log.timestamp, log.user_id, log.username, log.action,
+        log.resource_type, log.resource_id, log.entity_id, log.ip_address,
+        log.changes, log.extra_data
+    )
+    if entity_id:
+        stmt = stmt.where(log.entity_id == entity_id)
+    return stmt
+
+
+WAREHOUSE_DATASETS = {
+    "tickets": {
+        "label": "Tickets",
+        "statement": _warehouse_tickets_statement,
+        "changed_column": models.Ticket.updated_at,
+        "order_column": models.Ticket.id,
+        "transform": None,
+        "schema": pa.schema([
+            ("id", pa.int64()),
+            ("ticket_number", pa.string()),
+            ("title", pa.string()),
+            ("ticket_type", pa.string()),
+            ("category", pa.string()),
+            ("subcategory", pa.string()),
+            ("status", pa.string()),
+            ("priority", pa.string()),
+            ("impact", pa.string()),
+            ("urgency", pa.string()),
+            ("requester_id", pa.int64()),
+            ("requester", pa.string()),
+            ("assigned_to_id", pa.int64()),
+            ("assigned_to", pa.string()),
+            ("assigned_group", pa.string()),
+            ("equipment_id", pa.int64()),
+            ("entity_id", pa.int64()),
+            ("sla_due_date", _TIMESTAMP),
+            ("first_response_at", _TIMESTAMP),
+            ("sla_breached", pa.bool_()),
+            ("resolution_code", pa.string()),
+            ("rating", pa.int32()),
+            ("created_at", _TIMESTAMP),
+            ("updated_at", _TIMESTAMP),
+            ("resolved_at", _TIMESTAMP),
+            ("closed_at", _TIMESTAMP),
+            ("is_deleted", pa.bool_()),
+        ]),
+    },
+    "time_entries": {
+        "label": "Time entries",
+        "statement": _warehouse_time_entries_statement,
+        "changed_column": models.TicketTimeEntry.updated_at,
+        "order_column": models.TicketTimeEntry.id,
+        "transform": None,
+        "schema": pa.schema([
+            ("id", pa.int64()),
+            ("ticket_id", pa.int64()),
+            ("ticket_number", pa.string()),
+            ("user_id", pa.int64()),
+            ("username", pa.string()),
+            ("minutes", pa.int32()),
+            ("entry_type", pa.string()),
+            ("is_billable", pa.bool_()),
+            ("hourly_rate", pa.decimal128(10, 2)),
+            ("work_date", _TIMESTAMP),
+            ("created_at", _TIMESTAMP),
+            ("updated_at", _TIMESTAMP),
+        ]),
+    },
+    "equipment": {
+        "label": "Equipment",
+        "statement": _warehouse_equipment_statement,
+        "changed_column": models.Equipment.updated_at,
+        "order_column": models.Equipment.id,
+        "transform": _flatten_equipment_row,
+        "schema": pa.schema([
+            ("id", pa.int64()),
+            ("name", pa.string()),
+            ("serial_number", pa.string()),
+            ("asset_tag", pa.string()),
+            ("status", pa.string()),
+            ("model_id", pa.int64()),
+            ("model", pa.string()),
+            ("manufacturer", pa.string()),
+            ("type", pa.string()),
+            ("model_specs", _JSON_MAP),
+            ("location_id", pa.int64()),
+            ("supplier_id", pa.int64()),
+            ("entity_id", pa.int64()),
+            ("rack_id", pa.int64()),
+            ("position_u", pa.int32()),
+            ("purchase_date", _TIMESTAMP),
+            ("purchase_price", pa.decimal128(12, 2)),
+            ("warranty_expiry", _TIMESTAMP),
+            ("end_of_support", _TIMESTAMP),
+            ("created_at", _TIMESTAMP),
+            ("updated_at", _TIMESTAMP),
+        ]),
+    },
+    "audit_logs": {
+        "label": "Audit logs",
+        "statement": _warehouse_audit_logs_statement,
+        "changed_column": models.AuditLog.timestamp,
+        "order_column": models.AuditLog.id,
+        "transform": _flatten_audit_log_row,
+        "schema": pa.schema([
+            ("id", pa.int64()),
+            ("timestamp", _TIMESTAMP),
+            ("user_id", pa.int64()),
+            ("username", pa.string()),
+            ("action", pa.string()),
+            ("resource_type", pa.string()),
+            ("resource_id", pa.string()),
+            ("entity_id", pa.int64()),
+            ("ip_address", pa.string()),
+            ("changes", pa.list_(pa.struct([
+                ("field", pa.string()),
+                ("old_value", pa.string()),
+                ("new_value", pa.string()),
+            ]))),
+            ("extra_data", _JSON_MAP),
+        ]),
+    },
+}
+
+
+def iter_export_batches(
+    statement,
+    schema: pa.Schema,
+    transform: Optional[Callable[[dict], dict]],
+    label: str,
+    username: str
+) -> Iterator[pa.RecordBatch]:
+    """
+    Yield typed Arrow record batches from a server-side cursor.
+
+    Like ``iter_export_rows``, the generator owns its session because the
+    request-scoped one is closed before the streaming body is sent.
+    """
+    db = SessionLocal()
+    count = 0
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            rows = [dict(row._mapping) for row in partition]
+            if transform:
+                rows = [transform(row) for row in rows]
+            count += len(rows)
+            yield pa.RecordBatch.from_pylist(rows, schema=schema)
+        logger.info(f"{label} warehouse export generated by {username}: {count} items")
+    finally:
+        db.close()
+
+
+@router.get("/warehouse/{dataset}")
+def export_warehouse_dataset(
+    dataset: str,
+    format: str = Query(default="parquet", pattern="^(parquet|arrow)$"),
+    since: Optional[str] = Query(default=None, description="Only rows changed after this ISO timestamp"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Export a dataset (tickets, time_entries, equipment, audit_logs) as typed
+    Parquet or Arrow IPC stream for analytics (admin only).
+    """
+    spec = WAREHOUSE_DATASETS.get(dataset)
+    if spec is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown dataset. Valid datasets: {', '.join(WAREHOUSE_DATASETS.keys())}"
+        )
+    since_date = _parse_iso_date(since, "since")
+    if since_date and since_date.tzinfo:
+        # Timestamps are stored as naive UTC
+        since_date = since_date.astimezone(timezone.utc).replace(tzinfo=None)
+
+    # Captured before the query starts so the next run cannot miss changes
+    watermark = datetime.now(timezone.utc)
+
+    statement = spec["statement"](current_user.entity_id)
+    if since_date:
+        statement = statement.where(spec["changed_column"] > since_date)
+    statement = statement.order_by(spec["order_column"])
+
+    batches = iter_export_batches(
+        statement, spec["schema"], spec["transform"], spec["label"], current_user.username
+    )
+    media_type, extension = WAREHOUSE_MEDIA_TYPES[format]
+    body = iter_parquet(batches, spec["schema"]) if format == "parquet" else iter_arrow_stream(batches, spec["schema"])
+    filename = f"{dataset}_{export_timestamp()}.{extension}"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Export-Watermark": watermark.isoformat(),
+        }
+    )
@@ -4,13 +4,18 @@ IPAM Router - IP Address Management endpoints.
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import or_, func
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timezone
 import ipaddress
 import logging
 
 from backend.core.database import get_db
 from backend.core.security import get_current_active_user, check_permission_or_raise
 from backend import models, schemas
+from backend.core.host_discovery import parse_probe_ports
+from backend.core.ip_allocator import (
+    IPAllocationError, allocate_contiguous, find_free_ranges, get_utilization
+)
 from worker.tasks import scan_subnet_task
 
 logger = logging.getLogger(__name__)
@@ -38,6 +43,15 @@ def get_entity_for_write(current_user: models.User) -> int | None:
     return current_user.entity_id
 
 
+def validate_scan_ports(scan_ports: str | None) -> str | None:
+    """Normalize a comma-separated probe port list ("" clears it)."""
+    try:
+        ports = parse_probe_ports(scan_ports)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Scan ports must be comma-separated port numbers (1-65535)")
+    return ",".join(str(port) for port in ports) or None
+
+
 @router.post("/", response_model=schemas.Subnet)
 def create_subnet(
     subnet: schemas.SubnetCreate,
@@ -57,6 +71,10 @@ def create_subnet(
         cidr=subnet.cidr,
         name=subnet.name,
         description=subnet.description,
+        scan_engine=subnet.scan_engine,
+        scan_ports=validate_scan_ports(subnet.scan_ports),
+        scan_interval_minutes=subnet.scan_interval_minutes,
+        rescan_after_minutes=subnet.rescan_after_minutes,
         entity_id=entity_id
     )
     db.add(db_subnet)
@@ -109,6 +127,10 @@ def read_subnets(
             cidr=subnet.cidr,
             name=subnet.name,
             description=subnet.description,
+            scan_engine=subnet.scan_engine,
+            scan_ports=subnet.scan_ports,
+            scan_interval_minutes=subnet.scan_interval_minutes,
+            rescan_after_minutes=subnet.rescan_after_minutes,
             ip_count=ip_count
         ))
 
@@ -122,7 +144,7 @@ def update_subnet(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Update a subnet (name and description only, CIDR cannot be changed)."""
+    """Update a subnet (name, description and scan options; CIDR cannot be changed)."""
     check_ipam_permission(current_user)
     entity_filter = get_entity_filter(current_user)
 
@@ -143,6 +165,14 @@ def update_subnet(
         db_subnet.name = subnet_update.name
     if subnet_update.description is not None:
         db_subnet.description = subnet_update.description
+    if subnet_update.scan_engine is not None:
+        db_subnet.scan_engine = subnet_update.scan_engine
+    if subnet_update.scan_ports is not None:
+        db_subnet.scan_ports = validate_scan_ports(subnet_update.scan_ports)
+    # Explicit nulls turn scheduled / incremental scans off
+    for field in ("scan_interval_minutes", "rescan_after_minutes"):
+        if field in subnet_update.model_fields_set:
+            setattr(db_subnet, field, getattr(subnet_update, field))
 
     db.commit()
     db.refresh(db_subnet)
@@ -247,6 +277,80 @@ def create_ip_for_subnet(
     return db_ip
 
 
+@router.get("/{subnet_id}/free-ranges", response_model=schemas.SubnetAvailability)
+def get_subnet_free_ranges(
+    subnet_id: int,
+    min_size: int = Query(1, ge=1),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Utilization and free address ranges of a subnet (computed in the database)."""
+    check_ipam_permission(current_user)
+    entity_filter = get_entity_filter(current_user)
+
+    subnet_query = db.query(models.Subnet).filter(models.Subnet.id == subnet_id)
+    if entity_filter is not None:
+        subnet_query = subnet_query.filter(
+            or_(
+                models.Subnet.entity_id == entity_filter,
+                models.Subnet.entity_id == None  # noqa: E711
+            )
+        )
+    subnet = subnet_query.first()
+    if not subnet:
+        raise HTTPException(status_code=404, detail="Subnet not found")
+
+    network = ipaddress.ip_network(str(subnet.cidr), strict=False)
+    try:
+        return schemas.SubnetAvailability(
+            cidr=str(network),
+            **get_utilization(db, network),
+            free_ranges=find_free_ranges(db, network, min_size=min_size, limit=limit)
+        )
+    except IPAllocationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/{subnet_id}/allocate", response_model=List[schemas.IPAddress])
+def allocate_subnet_ips(
+    subnet_id: int,
+    request: schemas.IPAllocationRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Allocate the first block of ``count`` consecutive free addresses of a subnet."""
+    check_ipam_permission(current_user)
+    entity_filter = get_entity_filter(current_user)
+
+    subnet_query = db.query(models.Subnet).filter(models.Subnet.id == subnet_id)
+    if entity_filter is not None:
+        subnet_query = subnet_query.filter(
+            or_(
+                models.Subnet.entity_id == entity_filter,
+                models.Subnet.entity_id == None  # noqa: E711
+            )
+        )
+    subnet = subnet_query.first()
+    if not subnet:
+        raise HTTPException(status_code=404, detail="Subnet not found")
+
+    try:
+        ips = allocate_contiguous(
+            db, subnet, request.count, status=request.status, hostname=request.hostname
+        )
+        db.commit()
+    except IPAllocationError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+
+    logger.info(
+        f"{len(ips)} IPs allocated from '{ips[0].address}' in subnet '{subnet.cidr}' "
+        f"by '{current_user.username}'"
+    )
+    return ips
+
+
 @router.post("/{subnet_id}/scan")
 def scan_subnet(
     subnet_id: int,
@@ -275,6 +379,87 @@ def scan_subnet(
     return {"message": "Scan started", "task_id": task.id}
 
 
+@router.get("/{subnet_id}/scan")
+def get_scan_status(
+    subnet_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Progress of the subnet's current (or last) scan, per shard."""
+    from backend.core.subnet_scan import get_scan_progress
+
+    check_ipam_permission(current_user)
+    entity_filter = get_entity_filter(current_user)
+
+    subnet_query = db.query(models.Subnet).filter(models.Subnet.id == subnet_id)
+    if entity_filter is not None:
+        subnet_query = subnet_query.filter(
+            or_(
+                models.Subnet.entity_id == entity_filter,
+                models.Subnet.entity_id == None  # noqa: E711
+            )
+        )
+    subnet = subnet_query.first()
+    if not subnet:
+        raise HTTPException(status_code=404, detail="Subnet not found")
+
+    shards = get_scan_progress(subnet_id)
+    return {
+        "in_progress": subnet.scan_checkpoint is not None,
+        "scan_started_at": subnet.scan_started_at,
+        "shards_done": sum(1 for info in shards.values() if info.get("state") == "done"),
+        "shards_total": len(shards),
+        "shards": shards,
+    }
+
+
+@router.get("/{subnet_id}/changes", response_model=schemas.PaginatedIPAddressChangeResponse)
+def get_subnet_changes(
+    subnet_id: int,
+    change_type: Optional[str] = Query(None, pattern="^(new_host|host_gone|mac_changed|hostname_changed)$"),
+    since: Optional[datetime] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Host changes detected by scans of a subnet, most recent first."""
+    check_ipam_permission(current_user)
+    entity_filter = get_entity_filter(current_user)
+
+    subnet_query = db.query(models.Subnet).filter(models.Subnet.id == subnet_id)
+    if entity_filter is not None:
+        subnet_query = subnet_query.filter(
+            or_(
+                models.Subnet.entity_id == entity_filter,
+                models.Subnet.entity_id == None  # noqa: E711
+            )
+        )
+    if not subnet_query.first():
+        raise HTTPException(status_code=404, detail="Subnet not found")
+
+    query = db.query(models.IPAddressChange).filter(models.IPAddressChange.subnet_id == subnet_id)
+    if change_type:
+        query = query.filter(models.IPAddressChange.change_type == change_type)
+    if since:
+        if since.tzinfo:
+            # detected_at is stored as naive UTC
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        query = query.filter(models.IPAddressChange.detected_at >= since)
+
+    total = query.count()
+    changes = query.order_by(
+        models.IPAddressChange.detected_at.desc(), models.IPAddressChange.id.desc()
+    ).offset(skip).limit(limit).all()
+
+    return schemas.PaginatedIPAddressChangeResponse(
+        items=changes,
+        total=total,
+        skip=skip,
+        limit=limit
+    )
+
+
 @router.delete("/{subnet_id}")
 def delete_subnet(
     subnet_id: int,
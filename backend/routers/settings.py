@@ -11,8 +11,9 @@ import json
 import logging
 
 from backend.core.database import get_db
-from backend.core.security import get_current_superadmin_user, encrypt_value, decrypt_value
+from backend.core.security import get_current_superadmin_user, encrypt_value
 from backend.core.rate_limiter import get_rate_limiter
+from backend.core.settings_cache import settings_cache, invalidate_settings_cache
 from backend import models
 
 logger = logging.getLogger(__name__)
@@ -276,6 +277,14 @@ DEFAULT_SETTINGS = [
         "value_type": "boolean",
         "is_sensitive": False
     },
+    {
+        "key": "email_notification_digest_seconds",
+        "value": "60",
+        "category": "email_notifications",
+        "description": "Seconds to collect ticket updates per recipient before emailing them together (0 sends immediately)",
+        "value_type": "integer",
+        "is_sensitive": False
+    },
     {
         "key": "email_inbound_enabled",
         "value": "false",
@@ -353,28 +362,15 @@ def init_default_settings(db: Session) -> int:
 
     if created > 0:
         db.commit()
+        invalidate_settings_cache()
         logger.info(f"Initialized {created} default system settings")
 
     return created
 
 
 def get_setting_value(db: Session, key: str, default: str = None) -> Optional[str]:
-    """Get a setting value by key."""
-    setting = db.query(models.SystemSettings).filter(
-        models.SystemSettings.key == key
-    ).first()
-
-    if not setting:
-        return default
-
-    # Decrypt sensitive values
-    if setting.is_sensitive and setting.value:
-        try:
-            return decrypt_value(setting.value)
-        except Exception:
-            return default
-
-    return setting.value
+    """Get a setting value by key (served from the settings cache, decrypted)."""
+    return settings_cache.get(db, key, default)
 
 
 def mask_sensitive_value(value: str) -> str:
@@ -549,6 +545,7 @@ async def update_setting(
 
     db.commit()
     db.refresh(setting)
+    invalidate_settings_cache()
 
     logger.info(f"Setting '{key}' updated by {current_user.username}")
 
@@ -612,6 +609,7 @@ async def create_setting(
     db.add(setting)
     db.commit()
     db.refresh(setting)
+    invalidate_settings_cache()
 
     logger.info(f"Setting '{setting_data.key}' created by {current_user.username}")
 
@@ -642,6 +640,7 @@ def delete_setting(
 
     db.delete(setting)
     db.commit()
+    invalidate_settings_cache()
 
     logger.info(f"Setting '{key}' deleted by {current_user.username}")
     return {"message": f"Setting '{key}' deleted"}
@@ -163,7 +163,8 @@ def trigger_ticket_email(
 ):
     """
     Trigger email notification for ticket events.
-    Emails are sent asynchronously via Celery.
+    Emails are buffered per recipient and sent asynchronously via Celery,
+    several updates to the same ticket within the digest window as one email.
 
     Args:
         db: Database session
@@ -172,7 +173,7 @@ def trigger_ticket_email(
         comment_id: Optional comment ID for comment notifications
     """
     try:
-        from worker.tasks import send_ticket_email_task
+        from backend.core.email.notification_buffer import queue_ticket_email
 
         # Collect recipient emails based on event type
         recipients = []
@@ -209,16 +210,16 @@ def trigger_ticket_email(
             if ticket.requester and ticket.requester.email:
                 recipients.append(ticket.requester.email)
 
-        # Queue email task if we have recipients
+        # Queue email if we have recipients
         if recipients:
-            extra_data = {"comment_id": comment_id} if comment_id else None
-            send_ticket_email_task.delay(
+            queue_ticket_email(
+                db,
                 email_type=email_type,
                 ticket_id=ticket.id,
                 recipients=recipients,
-                extra_data=extra_data
+                comment_id=comment_id
             )
-            logger.debug(f"Email task queued: {email_type} for ticket {ticket.ticket_number} to {len(recipients)} recipients")
+            logger.debug(f"Email queued: {email_type} for ticket {ticket.ticket_number} to {len(recipients)} recipients")
 
     except ImportError:
         # Celery not available (e.g., during testing)
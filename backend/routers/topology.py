@@ -16,6 +16,7 @@ import json
 from backend.core.database import get_db
 from backend.core.security import get_current_active_user, check_permission_or_raise
 from backend.core.cache import cache_get, cache_set, cache_delete, build_cache_key
+from backend.core.settings_cache import invalidate_settings_cache
 from backend import models
 
 
@@ -822,6 +823,7 @@ def save_layout(
         db.add(setting)
 
     db.commit()
+    invalidate_settings_cache()
 
     logger.info(f"Topology layout saved by '{current_user.username}' ({len(positions_dict)} nodes)")
 
@@ -2,23 +2,24 @@
 Webhooks Router - External integration via event-driven webhooks.
 Supports CRUD operations for webhooks and webhook delivery management.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
 from urllib.parse import urlparse
 import ipaddress
 import socket
-import hashlib
-import hmac
-import httpx
-import json
 import logging
-import time
-import asyncio
 
 from backend.core.database import get_db
+from backend.core.webhook_outbox import (
+    enqueue_webhook_delivery,
+    enqueue_webhook_event,
+    get_delivery_stats,
+    reset_circuit,
+    schedule_outbox_deliveries,
+)
 from backend.core.security import get_current_admin_user
 from backend import models
 
@@ -38,6 +39,11 @@ class WebhookCreate(BaseModel):
     is_active: bool = True
     retry_count: int = 3
     timeout_seconds: int = 30
+    max_concurrency: int = 4
+    batch_size: int = 1
+    batch_window_seconds: int = 0
+    circuit_failure_threshold: int = 5
+    circuit_cooldown_seconds: int = 60
 
 
 class WebhookUpdate(BaseModel):
@@ -49,6 +55,11 @@ class WebhookUpdate(BaseModel):
     is_active: Optional[bool] = None
     retry_count: Optional[int] = None
     timeout_seconds: Optional[int] = None
+    max_concurrency: Optional[int] = None
+    batch_size: Optional[int] = None
+    batch_window_seconds: Optional[int] = None
+    circuit_failure_threshold: Optional[int] = None
+    circuit_cooldown_seconds: Optional[int] = None
 
 
 class WebhookResponse(BaseModel):
@@ -60,6 +71,12 @@ class WebhookResponse(BaseModel):
     is_active: bool
     retry_count: int
     timeout_seconds: int
+    max_concurrency: Optional[int] = None
+    batch_size: Optional[int] = None
+    batch_window_seconds: Optional[int] = None
+    circuit_failure_threshold: Optional[int] = None
+    circuit_cooldown_seconds: Optional[int] = None
+    circuit_open_until: Optional[datetime] = None
     last_triggered: Optional[datetime] = None
     last_status_code: Optional[int] = None
     failure_count: int
@@ -85,6 +102,27 @@ class WebhookDeliveryResponse(BaseModel):
         from_attributes = True
 
 
+# Delivery shaping limits (see core/webhook_outbox.py)
+DELIVERY_SETTING_LIMITS = {
+    "max_concurrency": (0, 100),
+    "batch_size": (1, 500),
+    "batch_window_seconds": (0, 300),
+    "circuit_failure_threshold": (0, 1000),
+    "circuit_cooldown_seconds": (1, 86400),
+}
+
+
+def validate_delivery_settings(values: dict) -> None:
+    """Reject out-of-range concurrency, batching and circuit breaker settings."""
+    for field, (low, high) in DELIVERY_SETTING_LIMITS.items():
+        value = values.get(field)
+        if value is not None and not low <= value <= high:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{field} must be between {low} and {high}"
+            )
+
+
 # Available webhook events
 AVAILABLE_EVENTS = [
     "ticket.created",
@@ -100,6 +138,7 @@ AVAILABLE_EVENTS = [
     "user.created",
     "user.deleted",
     "sla.breached",
+    "subnet.changes_detected",
 ]
 
 
@@ -159,142 +198,21 @@ def validate_webhook_url(url: str) -> str:
     return url
 
 
-# ==================== WEBHOOK DELIVERY FUNCTION ====================
+# ==================== WEBHOOK TRIGGER ====================
 
-async def deliver_webhook(
-    webhook: models.Webhook,
-    event_type: str,
-    payload: dict,
-    db: Session
-):
-    """
-    Deliver a webhook payload to the configured URL.
-    Handles retries and logs delivery attempts.
-    """
-
-    headers = {
-        "Content-Type": webhook.content_type,
-        "X-Webhook-Event": event_type,
-        "X-Webhook-Timestamp": str(int(time.time())),
-    }
-
-    # Add HMAC signature if secret is configured
-    if webhook.secret:
-        payload_bytes = json.dumps(payload).encode()
-        signature = hmac.new(
-            webhook.secret.encode(),
-            payload_bytes,
-            hashlib.sha256
-        ).hexdigest()
-        headers["X-Webhook-Signature"] = f"sha256={signature}"
-
-    delivery = models.WebhookDelivery(
-        webhook_id=webhook.id,
-        event_type=event_type,
-        payload=payload
-    )
-
-    start_time = time.time()
-    attempt = 0
-    max_attempts = webhook.retry_count + 1
-
-    async with httpx.AsyncClient() as client:
-        while attempt < max_attempts:
-            attempt += 1
-            delivery.attempt_count = attempt
-
-            try:
-                response = await client.post(
-                    webhook.url,
-                    json=payload,
-                    headers=headers,
-                    timeout=webhook.timeout_seconds
-                )
-
-                delivery.status_code = response.status_code
-                delivery.response_body = response.text[:1000] if response.text else None
-                delivery.response_time_ms = int((time.time() - start_time) * 1000)
-
-                if 200 <= response.status_code < 300:
-                    delivery.success = True
-                    webhook.success_count += 1
-                    webhook.failure_count = 0  # Reset consecutive failures
-                    break
-                else:
-                    delivery.success = False
-                    delivery.error_message = f"HTTP {response.status_code}"
-
-            except httpx.TimeoutException:
-                delivery.success = False
-                delivery.error_message = "Request timeout"
-            except httpx.RequestError as e:
-                delivery.success = False
-                delivery.error_message = str(e)[:500]
-            except Exception as e:
-                delivery.success = False
-                delivery.error_message = str(e)[:500]
-
-            # Wait before retry (exponential backoff)
-            if attempt < max_attempts:
-                await asyncio.sleep(2 ** attempt)
-
-    # Update webhook stats
-    webhook.last_triggered = datetime.now(timezone.utc)
-    webhook.last_status_code = delivery.status_code
-
-    if not delivery.success:
-        webhook.failure_count += 1
-
-    # Save delivery log
-    db.add(delivery)
-    db.commit()
-
-    logger.info(
-        f"Webhook delivery to {webhook.url}: "
-        f"event={event_type}, success={delivery.success}, "
-        f"status={delivery.status_code}, attempts={attempt}"
-    )
-
-
-async def trigger_webhooks(
+def trigger_webhooks(
     event_type: str,
     payload: dict,
     db: Session,
     entity_id: Optional[int] = None
-):
-    """
-    Trigger all active webhooks subscribed to an event.
+) -> int:
     """
+    Queue an event for all active webhooks subscribed to it.
 
-    # Find active webhooks subscribed to this event
-    query = db.query(models.Webhook).filter(
-        models.Webhook.is_active == True
-    )
-
-    if entity_id:
-        query = query.filter(
-            (models.Webhook.entity_id == entity_id) |
-            (models.Webhook.entity_id == None)
-        )
-
-    webhooks = query.all()
-
-    # Filter webhooks that are subscribed to this event
-    matching_webhooks = [
-        w for w in webhooks
-        if event_type in (w.events or [])
-    ]
-
-    if not matching_webhooks:
-        return
-
-    # Deliver to all matching webhooks concurrently
-    tasks = [
-        deliver_webhook(webhook, event_type, payload, db)
-        for webhook in matching_webhooks
-    ]
-
-    await asyncio.gather(*tasks, return_exceptions=True)
+    Outbox rows are added to ``db``'s transaction and delivered by the
+    worker after the caller commits. Returns the number of webhooks queued.
+    """
+    return enqueue_webhook_event(db, event_type, payload, entity_id=entity_id)
 
 
 # ==================== CRUD ENDPOINTS ====================
@@ -359,6 +277,7 @@ def create_webhook(
         )
 
     safe_url = validate_webhook_url(webhook_data.url)
+    validate_delivery_settings(webhook_data.model_dump())
 
     webhook = models.Webhook(
         name=webhook_data.name,
@@ -368,6 +287,11 @@ def create_webhook(
         is_active=webhook_data.is_active,
         retry_count=webhook_data.retry_count,
         timeout_seconds=webhook_data.timeout_seconds,
+        max_concurrency=webhook_data.max_concurrency,
+        batch_size=webhook_data.batch_size,
+        batch_window_seconds=webhook_data.batch_window_seconds,
+        circuit_failure_threshold=webhook_data.circuit_failure_threshold,
+        circuit_cooldown_seconds=webhook_data.circuit_cooldown_seconds,
         entity_id=current_user.entity_id,
         created_by_id=current_user.id
     )
@@ -405,6 +329,7 @@ def update_webhook(
 
     if "url" in update_data:
         update_data["url"] = validate_webhook_url(update_data["url"])
+    validate_delivery_settings(update_data)
 
     for field, value in update_data.items():
         setattr(webhook, field, value)
@@ -465,10 +390,44 @@ def list_webhook_deliveries(
     return deliveries
 
 
+@router.get("/{webhook_id}/stats")
+def get_webhook_stats(
+    webhook_id: int,
+    hours: int = Query(default=24, ge=1, le=720),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """Circuit state, success rate and delivery latency histogram for a webhook."""
+    webhook = db.query(models.Webhook).filter(models.Webhook.id == webhook_id).first()
+    if not webhook:
+        raise HTTPException(status_code=404, detail="Webhook not found")
+
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    return get_delivery_stats(db, webhook, since)
+
+
+@router.post("/{webhook_id}/circuit/reset")
+def reset_webhook_circuit(
+    webhook_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """Close an open circuit so deferred deliveries resume immediately."""
+    webhook = db.query(models.Webhook).filter(models.Webhook.id == webhook_id).first()
+    if not webhook:
+        raise HTTPException(status_code=404, detail="Webhook not found")
+
+    deferred = reset_circuit(db, webhook)
+    db.commit()
+    schedule_outbox_deliveries(deferred)
+
+    logger.info(f"Webhook circuit for '{webhook.name}' reset by {current_user.username}")
+    return {"message": "Circuit closed", "requeued": len(deferred)}
+
+
 @router.post("/{webhook_id}/test")
-async def test_webhook(
+def test_webhook(
     webhook_id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_admin_user)
 ):
@@ -488,12 +447,11 @@ async def test_webhook(
         }
     }
 
-    # Deliver in background
-    import asyncio
-    loop = asyncio.get_event_loop()
-    loop.create_task(deliver_webhook(webhook, "webhook.test", test_payload, db))
+    # Delivered by the worker once committed
+    enqueue_webhook_delivery(db, webhook, "webhook.test", test_payload)
+    db.commit()
 
-    logger.info(f"Test webhook sent to '{webhook.name}' by {current_user.username}")
+    logger.info(f"Test webhook queued for '{webhook.name}' by {current_user.username}")
     return {"message": "Test webhook sent", "webhook_id": webhook.id}
 
 
@@ -119,6 +119,10 @@ class SubnetWithEquipment(BaseModel):
     cidr: str
     name: Optional[str] = None
     description: Optional[str] = None
+    scan_engine: str = "nmap"
+    scan_ports: Optional[str] = None
+    scan_interval_minutes: Optional[int] = None
+    rescan_after_minutes: Optional[int] = None
     ip_count: int = 0
     class Config:
         from_attributes = True
@@ -135,6 +139,10 @@ class SubnetBase(BaseModel):
     cidr: str
     name: Optional[str] = None
     description: Optional[str] = None
+    scan_engine: str = Field(default="nmap", pattern="^(nmap|native)$")
+    scan_ports: Optional[str] = None  # TCP probe ports of the native engine, e.g. "22,80,443"
+    scan_interval_minutes: Optional[int] = Field(default=None, ge=5)  # None: manual scans only
+    rescan_after_minutes: Optional[int] = Field(default=None, ge=1)  # Incremental scheduled scans
 
 class SubnetCreate(SubnetBase):
     pass
@@ -142,6 +150,11 @@ class SubnetCreate(SubnetBase):
 class SubnetUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
+    scan_engine: Optional[str] = Field(default=None, pattern="^(nmap|native)$")
+    scan_ports: Optional[str] = None
+    # Set to null to disable scheduled / incremental scans
+    scan_interval_minutes: Optional[int] = Field(default=None, ge=5)
+    rescan_after_minutes: Optional[int] = Field(default=None, ge=1)
 
 class Subnet(SubnetBase):
     id: int
@@ -149,6 +162,44 @@ class Subnet(SubnetBase):
     class Config:
         from_attributes = True
 
+class IPAllocationRequest(BaseModel):
+    """Allocate ``count`` consecutive free addresses of a subnet."""
+    count: int = Field(default=1, ge=1, le=1024)
+    status: str = Field(default="assigned", pattern="^(reserved|assigned|dhcp)$")
+    hostname: Optional[str] = None
+
+class FreeIPRange(BaseModel):
+    start: str
+    end: str
+    size: int
+
+class SubnetAvailability(BaseModel):
+    """Utilization of a subnet's usable addresses and its free ranges."""
+    cidr: str
+    total: int
+    used: int
+    free: int
+    utilization: float  # Percent of usable addresses in use
+    by_status: Dict[str, int]
+    free_ranges: List[FreeIPRange]
+
+class IPAddressChange(BaseModel):
+    id: int
+    subnet_id: int
+    address: str
+    change_type: str
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
+    detected_at: datetime
+    class Config:
+        from_attributes = True
+
+class PaginatedIPAddressChangeResponse(BaseModel):
+    items: List[IPAddressChange]
+    total: int
+    skip: int
+    limit: int
+
 # --- Scripts ---
 class ScriptBase(BaseModel):
     name: str
@@ -544,6 +595,32 @@ class BulkEquipmentExport(BaseModel):
     format: str = Field(default="xlsx", pattern="^(csv|xlsx)$", description="Export format: csv or xlsx")
 
 
+class ExportJobCreate(BaseModel):
+    """Request to run an export in the background."""
+    export_type: str = Field(..., pattern="^(tickets|equipment|audit_logs)$")
+    format: str = Field(default="csv", pattern="^(csv|xlsx)$", description="Export format: csv or xlsx")
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Same filters as the matching export endpoint")
+
+
+class ExportJob(BaseModel):
+    id: int
+    export_type: str
+    format: str
+    status: str
+    filters: Optional[Dict[str, Any]] = None
+    filename: Optional[str] = None
+    row_count: Optional[int] = None
+    error_message: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    progress: Optional[Dict[str, Any]] = None  # {"processed": int, "total": int} while running
+
+    class Config:
+        from_attributes = True
+
+
 # ==================== CONTRACT SCHEMAS ====================
 
 class ContractBase(BaseModel):
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Permission Check Benchmark
+
+Compares the per-check cost of the compiled permission sets used by
+``has_permission`` (core/security.py and core/permissions.py) with the
+previous rule-by-rule evaluation, for each role.
+
+Usage:
+    python scripts/benchmark_permissions.py
+    python scripts/benchmark_permissions.py --checks 2000000
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+# Cross-platform: Get script directory regardless of how it's called
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.core import permissions as granular  # noqa: E402
+from backend.core import security  # noqa: E402
+
+
+def legacy_module_permission(user, permission: str) -> bool:
+    """Previous core/security.py has_permission."""
+    if user.role == "superadmin":
+        return True
+    if user.role == "admin":
+        return permission in security.AVAILABLE_PERMISSIONS
+    if user.role == "tech":
+        return permission in (user.permissions or [])
+    return False
+
+
+def legacy_granular_permission(user, permission: str) -> bool:
+    """Previous core/permissions.py has_permission."""
+    if not user:
+        return False
+    if user.role in ("superadmin", "admin"):
+        return True
+    if user.role == "user":
+        return False
+    if user.role == "tech":
+        return granular._tech_has_permission(user.permissions or [], permission)
+    return False
+
+
+USERS = {
+    "superadmin": SimpleNamespace(role="superadmin", permissions=[]),
+    "admin": SimpleNamespace(role="admin", permissions=[]),
+    "tech": SimpleNamespace(
+        role="tech",
+        permissions=["ipam", "inventory", "dcim", "knowledge", "tickets_admin", "contracts:view", "software:edit"],
+    ),
+    "user": SimpleNamespace(role="user", permissions=[]),
+}
+
+# What global_search checks on every request, plus granular ticket checks
+MODULE_CHECKS = ["inventory", "ipam", "contracts", "software", "knowledge"]
+GRANULAR_CHECKS = ["tickets:view", "tickets:assign", "contracts:edit", "software:edit", "dcim:view"]
+
+
+def per_check_ns(func, user, checks, total: int) -> float:
+    rounds = max(1, total // len(checks))
+
+    def run():
+        for permission in checks:
+            func(user, permission)
+
+    elapsed = timeit.timeit(run, number=rounds)
+    return elapsed / (rounds * len(checks)) * 1e9
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark compiled permission checks")
+    parser.add_argument("--checks", type=int, default=500000, help="Checks per measurement (default: 500000)")
+    args = parser.parse_args()
+
+    # Sanity check: compiled sets must give the same answers
+    for user in USERS.values():
+        for permission in MODULE_CHECKS + GRANULAR_CHECKS:
+            assert security.has_permission(user, permission) == legacy_module_permission(user, permission)
+            assert granular.has_permission(user, permission) == legacy_granular_permission(user, permission)
+
+    print(f"{'check':<10} {'role':<11} {'legacy ns':>10} {'compiled ns':>12} {'speedup':>8}")
+    for label, legacy, compiled, checks in (
+        ("module", legacy_module_permission, security.has_permission, MODULE_CHECKS),
+        ("granular", legacy_granular_permission, granular.has_permission, GRANULAR_CHECKS),
+    ):
+        for role, user in USERS.items():
+            before = per_check_ns(legacy, user, checks, args.checks)
+            after = per_check_ns(compiled, user, checks, args.checks)
+            print(f"{label:<10} {role:<11} {before:>10.1f} {after:>12.1f} {before / after:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
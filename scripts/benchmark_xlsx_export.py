@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+XLSX Export Benchmark
+
+Measures time and peak memory of the streaming XLSX writer used by the
+export router, using synthetic ticket-like rows.
+
+Usage:
+    python scripts/benchmark_xlsx_export.py                  # 100k rows
+    python scripts/benchmark_xlsx_export.py --rows 500000
+    python scripts/benchmark_xlsx_export.py --trace-memory   # Slower, exact Python allocations
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Cross-platform: Get script directory regardless of how it's called
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.core.export_writers import write_xlsx  # noqa: E402
+
+
+COLUMN_LABELS = {
+    "ticket_number": "Ticket #",
+    "title": "Title",
+    "description": "Description",
+    "status": "Status",
+    "priority": "Priority",
+    "requester": "Requester",
+    "time_spent": "Time Spent",
+    "created_at": "Created At",
+}
+
+
+def generate_rows(count: int):
+    """Yield synthetic rows lazily, like a server-side cursor would."""
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    statuses = ("new", "open", "pending", "resolved", "closed")
+    priorities = ("low", "medium", "high", "critical")
+    for i in range(count):
+        yield {
+            "ticket_number": f"INC-{i:07d}",
+            "title": f"Printer on floor {i % 12} is not responding",
+            "description": "User reports the device is offline.\nRestarted spooler, issue persists.",
+            "status": statuses[i % len(statuses)],
+            "priority": priorities[i % len(priorities)],
+            "requester": f"user{i % 500}",
+            "time_spent": (i % 240) + 0.5,
+            "created_at": (start + timedelta(minutes=i)).isoformat(),
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the streaming XLSX export writer")
+    parser.add_argument("--rows", type=int, default=100000, help="Number of rows to write (default: 100000)")
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="Measure peak Python allocations with tracemalloc (much slower)"
+    )
+    args = parser.parse_args()
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    with tempfile.TemporaryFile() as output:
+        started = time.perf_counter()
+        written = write_xlsx(generate_rows(args.rows), output, COLUMN_LABELS)
+        elapsed = time.perf_counter() - started
+        size = output.seek(0, 2)
+
+    print(f"Rows written:   {written}")
+    print(f"Elapsed:        {elapsed:.2f}s ({written / elapsed:,.0f} rows/s)")
+    print(f"File size:      {size / (1024 * 1024):.1f} MiB")
+
+    if args.trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Peak memory:    {peak / (1024 * 1024):.1f} MiB (Python allocations)")
+    else:
+        try:
+            import resource
+            # ru_maxrss is in KiB on Linux
+            peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"Peak RSS:       {peak_rss:.1f} MiB (whole process)")
+        except ImportError:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,3 +12,26 @@ from backend.app import app
 def client():
     with TestClient(app) as c:
         yield c
+
+
+@pytest.fixture
+def db():
+    """Database session; everything the test wrote is rolled back."""
+    from backend.core.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture
+def redis_client():
+    from backend.core.cache import get_redis_client
+
+    client = get_redis_client()
+    if client is None:
+        pytest.skip("Redis unavailable")
+    return client
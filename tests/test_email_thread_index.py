@@ -0,0 +1,65 @@
+import uuid
+
+from backend import models
+from backend.core.email import thread_index
+from backend.core.email.thread_index import (
+    MAX_THREAD_MESSAGE_IDS,
+    extract_message_ids,
+    find_ticket_by_thread,
+    index_message_ids,
+)
+
+
+def _message_id() -> str:
+    return f"<{uuid.uuid4().hex}@test.local>"
+
+
+def test_extract_message_ids_most_recent_first():
+    assert extract_message_ids("<c@x>", "<a@x> <b@x>\r\n <c@x>") == ["<c@x>", "<b@x>", "<a@x>"]
+
+
+def test_extract_message_ids_without_brackets():
+    assert extract_message_ids(None, "a@x b@x") == ["b@x", "a@x"]
+    assert extract_message_ids(None, "") == []
+
+
+def test_extract_message_ids_capped():
+    references = " ".join(f"<{i}@x>" for i in range(MAX_THREAD_MESSAGE_IDS + 10))
+    message_ids = extract_message_ids(None, references)
+    assert len(message_ids) == MAX_THREAD_MESSAGE_IDS
+    assert message_ids[0] == f"<{MAX_THREAD_MESSAGE_IDS + 9}@x>"
+
+
+def test_find_ticket_by_thread_without_ids(db):
+    assert find_ticket_by_thread(db, []) is None
+
+
+def test_find_ticket_by_thread_prefers_cached_most_recent(monkeypatch):
+    monkeypatch.setattr(thread_index, "_cache_get_many", lambda ids: {"<old@x>": 1, "<new@x>": 2})
+    # Answered from the cache: the session is never queried
+    assert find_ticket_by_thread(None, ["<new@x>", "<old@x>"]) == 2
+
+
+def test_find_ticket_by_thread_from_index(db, monkeypatch):
+    monkeypatch.setattr(thread_index, "_cache_get_many", lambda ids: {})
+    monkeypatch.setattr(thread_index, "_cache_set_many", lambda entries: None)
+
+    tickets = []
+    for _ in range(2):
+        ticket = models.Ticket(
+            ticket_number=f"TKT-TEST-{uuid.uuid4().hex[:8]}",
+            title="Thread index test",
+            description="Thread index test"
+        )
+        db.add(ticket)
+        tickets.append(ticket)
+    db.flush()
+
+    first, reply = _message_id(), _message_id()
+    index_message_ids(db, {first: tickets[0].id, reply: tickets[1].id}, source="sent")
+    # Already indexed: keeps its ticket
+    index_message_ids(db, {first: tickets[1].id}, source="received")
+
+    assert find_ticket_by_thread(db, [_message_id(), first]) == tickets[0].id
+    assert find_ticket_by_thread(db, [reply, first]) == tickets[1].id
+    assert find_ticket_by_thread(db, [_message_id()]) is None
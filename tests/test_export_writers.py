@@ -0,0 +1,92 @@
+import csv
+import io
+import zipfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from backend.core import export_writers
+from backend.core.export_writers import iter_arrow_stream, iter_csv, iter_parquet, iter_xlsx, write_xlsx
+
+ROWS = [
+    {"name": "srv-01", "ip": "10.0.0.1", "cores": 8, "notes": "=HYPERLINK(\"x\")"},
+    {"name": "srv-02", "ip": "10.0.0.2", "cores": 16, "notes": None},
+]
+SCHEMA = pa.schema([("name", pa.string()), ("cores", pa.int64())])
+
+
+def _batches(count, rows_per_batch=1):
+    for start in range(0, count, rows_per_batch):
+        names = [f"host-{i}" for i in range(start, min(start + rows_per_batch, count))]
+        yield pa.RecordBatch.from_pylist(
+            [{"name": name, "cores": 4} for name in names], schema=SCHEMA
+        )
+
+
+def _sheet_xml(data: bytes) -> str:
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        return workbook.read("xl/worksheets/sheet1.xml").decode()
+
+
+def test_iter_csv_writes_header_once_across_chunks(monkeypatch):
+    monkeypatch.setattr(export_writers, "CSV_CHUNK_SIZE", 10)
+    chunks = list(iter_csv(iter(ROWS * 50)))
+
+    assert len(chunks) > 1
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert len(rows) == 100
+    assert rows[0]["name"] == "srv-01"
+    assert rows[1]["notes"] == ""
+
+
+def test_iter_csv_empty():
+    assert list(iter_csv([])) == ["No data to export"]
+
+
+def test_write_xlsx_streams_rows():
+    output = io.BytesIO()
+    count = write_xlsx(iter(ROWS), output, column_labels={"ip": "IP Address"})
+
+    assert count == 2
+    sheet = _sheet_xml(output.getvalue())
+    assert "IP Address" in sheet
+    assert "srv-02" in sheet
+    # Strings are never written as formulas
+    assert "<f>" not in sheet
+
+
+def test_write_xlsx_truncates_at_row_limit(monkeypatch):
+    monkeypatch.setattr(export_writers, "XLSX_MAX_ROWS", 3)
+    assert write_xlsx(iter(ROWS * 5), io.BytesIO()) == 3
+
+
+def test_iter_xlsx_empty():
+    sheet = _sheet_xml(b"".join(iter_xlsx([])))
+    assert "No data to export" in sheet
+
+
+def test_iter_parquet_yields_row_groups(monkeypatch):
+    monkeypatch.setattr(export_writers, "PARQUET_ROW_GROUP_SIZE", 2)
+    chunks = list(iter_parquet(_batches(5), SCHEMA))
+
+    # One chunk per full row group, then the rest with the footer
+    assert len(chunks) == 3
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.num_rows == 5
+    assert table.column("name").to_pylist()[-1] == "host-4"
+
+
+def test_iter_parquet_empty():
+    table = pq.read_table(io.BytesIO(b"".join(iter_parquet(iter([]), SCHEMA))))
+    assert table.num_rows == 0
+    assert table.schema.names == ["name", "cores"]
+
+
+def test_iter_arrow_stream():
+    chunks = list(iter_arrow_stream(_batches(6, rows_per_batch=3), SCHEMA))
+
+    reader = pa.ipc.open_stream(b"".join(chunks))
+    assert reader.schema.equals(SCHEMA)
+    assert reader.read_all().num_rows == 6
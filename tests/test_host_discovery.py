@@ -0,0 +1,67 @@
+import ipaddress
+import socket
+
+import pytest
+
+from backend.core.host_discovery import native_discover, parse_probe_ports
+
+
+@pytest.fixture
+def listening_port():
+    """A TCP port with a listener on 127.0.0.1 (other loopback addresses refuse it)."""
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        yield server.getsockname()[1]
+
+
+def test_parse_probe_ports():
+    assert parse_probe_ports("22, 80,443,,80") == [22, 80, 443]
+    assert parse_probe_ports("") == []
+    assert parse_probe_ports(None) == []
+
+
+@pytest.mark.parametrize("value", ["0", "65536", "http", "22,-1"])
+def test_parse_probe_ports_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        parse_probe_ports(value)
+
+
+def test_native_discover_loopback(listening_port):
+    batches = list(native_discover(
+        "127.0.0.0/29", ports=[listening_port], batch_size=4, icmp=False, resolve=False
+    ))
+
+    results = [result for batch in batches for result in batch]
+    expected = {str(host) for host in ipaddress.ip_network("127.0.0.0/29").hosts()}
+    # Accepted (127.0.0.1) and refused connections both mean the host is up
+    assert {result.address for result in results} == expected
+    assert len(results) == len(expected)
+    assert all(result.status == "active" for result in results)
+    assert all(len(batch) <= 4 for batch in batches)
+
+
+def test_native_discover_only_given_addresses(listening_port):
+    results = [
+        result
+        for batch in native_discover(
+            "127.0.0.0/29", ports=[listening_port], icmp=False, resolve=False,
+            addresses=["127.0.0.1", "127.0.0.5"]
+        )
+        for result in batch
+    ]
+    assert sorted(result.address for result in results) == ["127.0.0.1", "127.0.0.5"]
+
+
+def test_native_discover_stops_early(listening_port):
+    discovery = native_discover(
+        "127.0.0.0/28", ports=[listening_port], batch_size=1, icmp=False, resolve=False
+    )
+    first = next(discovery)
+    discovery.close()
+    assert len(first) == 1
+
+
+def test_native_discover_rejects_large_networks():
+    with pytest.raises(ValueError):
+        list(native_discover("10.0.0.0/8", icmp=False))
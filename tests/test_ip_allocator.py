@@ -0,0 +1,111 @@
+import ipaddress
+import random
+
+import pytest
+
+from backend import models
+from backend.core.ip_allocator import (
+    IPAllocationError,
+    allocate_contiguous,
+    find_free_ranges,
+    get_utilization,
+    usable_bounds,
+)
+
+
+def _bounds(cidr):
+    return tuple(str(address) for address in usable_bounds(ipaddress.ip_network(cidr)))
+
+
+@pytest.mark.parametrize("cidr, expected", [
+    ("10.0.0.0/24", ("10.0.0.1", "10.0.0.254")),
+    ("10.0.0.0/30", ("10.0.0.1", "10.0.0.2")),
+    ("10.0.0.0/31", ("10.0.0.0", "10.0.0.1")),
+    ("10.0.0.7/32", ("10.0.0.7", "10.0.0.7")),
+    ("2001:db8::/64", ("2001:db8::1", "2001:db8::ffff:ffff:ffff:ffff")),
+    ("2001:db8::/127", ("2001:db8::", "2001:db8::1")),
+])
+def test_usable_bounds(cidr, expected):
+    assert _bounds(cidr) == expected
+
+
+def test_usable_bounds_match_hosts():
+    for cidr in ("192.168.1.0/29", "2001:db8::/125"):
+        hosts = list(ipaddress.ip_network(cidr).hosts())
+        assert usable_bounds(ipaddress.ip_network(cidr)) == (hosts[0], hosts[-1])
+
+
+@pytest.mark.parametrize("cidr", ["0.0.0.0/32", "255.255.255.255/32", "::/128"])
+def test_address_space_edges_are_rejected(cidr):
+    # Rejected before any query: no session needed
+    with pytest.raises(IPAllocationError):
+        find_free_ranges(None, ipaddress.ip_network(cidr))
+
+
+@pytest.fixture
+def subnet(db):
+    """A /28 (usable .1 to .14) with .1, .5 and .6 in use and .10 recorded but free."""
+    network = ipaddress.ip_network(f"198.18.{random.randint(0, 255)}.{16 * random.randint(0, 15)}/28")
+    subnet = models.Subnet(cidr=str(network), name="allocator test")
+    db.add(subnet)
+    db.flush()
+
+    base = network.network_address
+    for offset, status in ((1, "assigned"), (5, "reserved"), (6, "active"), (10, "available")):
+        db.add(models.IPAddress(address=str(base + offset), status=status, subnet_id=subnet.id))
+    db.flush()
+    return subnet
+
+
+def _network(subnet):
+    return ipaddress.ip_network(str(subnet.cidr))
+
+
+def _range(network, first, last):
+    base = network.network_address
+    return {"start": str(base + first), "end": str(base + last), "size": last - first + 1}
+
+
+def test_find_free_ranges(db, subnet):
+    network = _network(subnet)
+    assert find_free_ranges(db, network) == [_range(network, 2, 4), _range(network, 7, 14)]
+    assert find_free_ranges(db, network, min_size=4) == [_range(network, 7, 14)]
+    assert find_free_ranges(db, network, limit=1) == [_range(network, 2, 4)]
+    assert find_free_ranges(db, network, min_size=9) == []
+
+
+def test_find_free_ranges_of_an_empty_network(db):
+    network = ipaddress.ip_network("198.19.255.252/30")
+    assert find_free_ranges(db, network) == [_range(network, 1, 2)]
+    network = ipaddress.ip_network("2001:db8:ffff::/126")
+    assert find_free_ranges(db, network) == [_range(network, 1, 3)]
+
+
+def test_get_utilization(db, subnet):
+    utilization = get_utilization(db, _network(subnet))
+    assert utilization["total"] == 14
+    assert utilization["used"] == 3
+    assert utilization["free"] == 11
+    assert utilization["by_status"] == {"assigned": 1, "reserved": 1, "active": 1}
+
+
+def test_allocate_contiguous(db, subnet):
+    network = _network(subnet)
+    base = network.network_address
+
+    allocated = allocate_contiguous(db, subnet, 3, hostname="app")
+    assert [str(ip.address) for ip in allocated] == [str(base + offset) for offset in (2, 3, 4)]
+    assert all(ip.status == "assigned" and ip.hostname == "app" for ip in allocated)
+
+    # The free row at .10 is taken over
+    allocated = allocate_contiguous(db, subnet, 5, status="reserved")
+    assert [str(ip.address) for ip in allocated] == [str(base + offset) for offset in range(7, 12)]
+
+    assert find_free_ranges(db, network) == [_range(network, 12, 14)]
+
+
+@pytest.mark.parametrize("count", [0, 4])
+def test_allocate_contiguous_fails(db, subnet, count):
+    allocate_contiguous(db, subnet, 8)
+    with pytest.raises(IPAllocationError):
+        allocate_contiguous(db, subnet, count)
@@ -0,0 +1,61 @@
+import pytest
+
+from backend import models
+from backend.core.permissions import (
+    ALL_PERMISSIONS,
+    ALL_PERMISSIONS_WILDCARD,
+    compile_permissions,
+    get_compiled_permissions,
+    has_permission,
+)
+
+
+@pytest.mark.parametrize("role", ["superadmin", "admin"])
+def test_admins_get_the_wildcard(role):
+    assert compile_permissions(role, ()) == frozenset({ALL_PERMISSIONS_WILDCARD})
+
+
+def test_users_get_nothing():
+    assert compile_permissions("user", ("tickets:admin",)) == frozenset()
+
+
+def test_tech_direct_permissions():
+    granted = compile_permissions("tech", ("ipam:view",))
+    assert "ipam:view" in granted
+    assert "ipam:edit" not in granted
+
+
+def test_tech_module_admin_expands():
+    granted = compile_permissions("tech", ("tickets:admin",))
+    assert {perm for perm in ALL_PERMISSIONS if perm.startswith("tickets:")} <= granted
+    assert "ipam:view" not in granted
+
+
+def test_tech_legacy_names():
+    assert "tickets:edit" in compile_permissions("tech", ("tickets_edit",))
+    assert "tickets:delete" in compile_permissions("tech", ("tickets_admin",))
+
+
+def test_compiled_sets_are_shared():
+    assert compile_permissions("tech", ("ipam:view",)) is compile_permissions("tech", ("ipam:view",))
+
+
+def test_memo_follows_role_and_permission_changes():
+    user = models.User(role="tech", permissions=["ipam:view"])
+    assert get_compiled_permissions(user) == compile_permissions("tech", ("ipam:view",))
+
+    user.permissions = ["ipam:view", "ipam:edit"]
+    assert "ipam:edit" in get_compiled_permissions(user)
+
+    user.role = "admin"
+    assert get_compiled_permissions(user) == frozenset({ALL_PERMISSIONS_WILDCARD})
+
+
+def test_has_permission():
+    tech = models.User(role="tech", permissions=["tickets:admin", "custom:run"])
+    assert has_permission(tech, "tickets:assign")
+    assert not has_permission(tech, "ipam:view")
+    # Permissions outside ALL_PERMISSIONS are checked against the rules
+    assert has_permission(tech, "custom:run")
+    assert has_permission(models.User(role="admin", permissions=[]), "ipam:edit")
+    assert not has_permission(None, "tickets:view")
@@ -0,0 +1,86 @@
+import uuid
+
+import pytest
+
+from backend.core.rate_limiter import RedisRateLimiter, _LocalLeases
+
+
+def test_local_leases():
+    leases = _LocalLeases()
+    assert leases.take("key") is None
+
+    leases.grant("key", 2, ttl=60)
+    assert leases.take("key") == 1
+    assert leases.take("key") == 0
+    assert leases.take("key") is None
+
+    leases.grant("key", 0, ttl=60)
+    assert leases.take("key") is None
+
+
+def test_local_leases_expire():
+    leases = _LocalLeases()
+    leases.grant("key", 5, ttl=-1)
+    assert leases.take("key") is None
+
+
+@pytest.fixture
+def limiter(redis_client):
+    limiter = RedisRateLimiter()
+    limiter.ACTION_LIMITS = {**RedisRateLimiter.ACTION_LIMITS, "test": (3, 60), "test_leased": (10, 60)}
+    limiter.ACTION_LEASES = {"test_leased": 4}
+    identifier = f"test-{uuid.uuid4().hex}"
+    yield limiter, identifier
+    limiter.reset(identifier, "test")
+    limiter.reset(identifier, "test_leased")
+
+
+def test_gcra_acquire_until_limit(limiter):
+    limiter, identifier = limiter
+
+    results = [limiter.check(identifier, "test") for _ in range(4)]
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert [result.remaining for result in results[:3]] == [2, 1, 0]
+
+    # One request is freed every window / limit (20s)
+    refused = results[3]
+    assert refused.limit == 3
+    assert 0 < refused.retry_after <= 20
+
+
+def test_gcra_peek_does_not_count(limiter):
+    limiter, identifier = limiter
+
+    assert limiter.get_remaining(identifier, "test") == 3
+    assert limiter.get_reset_time(identifier, "test") == 0
+
+    limiter.check(identifier, "test")
+    assert limiter.get_remaining(identifier, "test") == 2
+    assert limiter.get_remaining(identifier, "test") == 2
+    assert 0 < limiter.get_reset_time(identifier, "test") <= 20
+
+
+def test_gcra_reset(limiter):
+    limiter, identifier = limiter
+    for _ in range(3):
+        limiter.check(identifier, "test")
+    assert not limiter.is_allowed(identifier, "test")
+
+    limiter.reset(identifier, "test")
+    assert limiter.is_allowed(identifier, "test")
+
+
+def test_leased_requests_are_charged_up_front(limiter):
+    limiter, identifier = limiter
+
+    assert limiter.check_local(identifier, "test_leased") is None
+    first = limiter.check(identifier, "test_leased")
+    assert first.allowed
+    # The whole lease is counted in Redis at once
+    assert limiter.get_remaining(identifier, "test_leased") == 6
+
+    # The rest of the lease is spent without Redis
+    local = [limiter.check_local(identifier, "test_leased") for _ in range(3)]
+    assert all(result is not None and result.allowed for result in local)
+    assert limiter.check_local(identifier, "test_leased") is None
+    assert limiter.get_remaining(identifier, "test_leased") == 6
@@ -0,0 +1,75 @@
+import ipaddress
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import models
+from backend.core.host_discovery import ScanResult
+from backend.core.subnet_scan import (
+    CHANGE_HOST_GONE,
+    CHANGE_HOSTNAME,
+    CHANGE_MAC,
+    CHANGE_NEW_HOST,
+    _detect_changes,
+    rescan_cutoff,
+    scan_chunks,
+)
+
+# Columns of the previous ip_addresses row, as upsert_scan_results loads them
+Previous = namedtuple("Previous", "status mac_address hostname")
+
+
+@pytest.mark.parametrize("cidr, prefix, expected", [
+    ("10.0.0.0/22", 24, ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24", "10.0.3.0/24"]),
+    ("10.0.0.0/24", 24, ["10.0.0.0/24"]),
+    ("10.0.0.0/28", 24, ["10.0.0.0/28"]),
+    ("2001:db8::/48", 24, ["2001:db8::/48"]),
+])
+def test_scan_chunks(cidr, prefix, expected):
+    assert scan_chunks(ipaddress.ip_network(cidr), prefix) == expected
+
+
+def test_scan_chunks_cover_the_network():
+    network = ipaddress.ip_network("172.16.0.0/16")
+    chunks = [ipaddress.ip_network(chunk) for chunk in scan_chunks(network, 24)]
+    assert len(chunks) == 256
+    assert sum(chunk.num_addresses for chunk in chunks) == network.num_addresses
+
+
+def test_new_host():
+    result = ScanResult("10.0.0.5", "active", "srv", "AA:BB:CC:DD:EE:FF")
+    assert _detect_changes(None, result) == [(CHANGE_NEW_HOST, None, "AA:BB:CC:DD:EE:FF")]
+    assert _detect_changes(Previous("available", None, None), result._replace(mac_address=None)) == [
+        (CHANGE_NEW_HOST, None, "srv")
+    ]
+
+
+def test_host_gone():
+    previous = Previous("active", "AA:BB:CC:DD:EE:FF", "srv")
+    assert _detect_changes(previous, ScanResult("10.0.0.5", "available")) == [(CHANGE_HOST_GONE, "srv", None)]
+    # Down before and still down
+    assert _detect_changes(Previous("available", None, None), ScanResult("10.0.0.5", "available")) == []
+    assert _detect_changes(None, ScanResult("10.0.0.5", "available")) == []
+
+
+def test_mac_and_hostname_changes():
+    previous = Previous("active", "aa:bb:cc:dd:ee:ff", "srv.example.com")
+    result = ScanResult("10.0.0.5", "active", "db.example.com", "11:22:33:44:55:66")
+    assert _detect_changes(previous, result) == [
+        (CHANGE_MAC, "aa:bb:cc:dd:ee:ff", "11:22:33:44:55:66"),
+        (CHANGE_HOSTNAME, "srv.example.com", "db.example.com"),
+    ]
+
+
+def test_no_change_on_case_or_missing_values():
+    previous = Previous("active", "aa:bb:cc:dd:ee:ff", "SRV.example.com")
+    assert _detect_changes(previous, ScanResult("10.0.0.5", "active", "srv.example.com", "AA:BB:CC:DD:EE:FF")) == []
+    # A scan that did not see the MAC or hostname keeps the known ones
+    assert _detect_changes(previous, ScanResult("10.0.0.5", "active")) == []
+
+
+def test_rescan_cutoff():
+    now = datetime(2026, 10, 19, 12, 0)
+    assert rescan_cutoff(models.Subnet(rescan_after_minutes=None), now) is None
+    assert rescan_cutoff(models.Subnet(rescan_after_minutes=90), now) == now - timedelta(minutes=90)
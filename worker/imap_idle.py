@@ -0,0 +1,234 @@
+"""
+IMAP IDLE listener.
+
+Keeps one connection per active inbound IMAP mailbox in IDLE (RFC 2177)
+and queues poll_email_inbox_task for a mailbox as soon as the server
+reports new mail, instead of waiting for the next one-minute poll. The
+periodic poll keeps running as a fallback; with UID-incremental fetching it
+is cheap when nothing arrived.
+
+Run as its own process:
+    python -m worker.imap_idle
+"""
+import imaplib
+import logging
+import os
+import select
+import socket
+import ssl
+import threading
+import time
+from typing import Dict, Optional
+
+from worker.tasks import log_event, poll_email_inbox_task
+
+logger = logging.getLogger(__name__)
+
+# Re-issue IDLE before servers drop it (RFC 2177: at least every 29 minutes)
+IMAP_IDLE_RENEW = int(os.environ.get("IMAP_IDLE_RENEW", "1500"))
+# Seconds between checks for added, removed or edited mailboxes
+IMAP_IDLE_REFRESH = int(os.environ.get("IMAP_IDLE_REFRESH", "300"))
+# Socket timeout for regular IMAP commands
+IMAP_IDLE_COMMAND_TIMEOUT = 30
+# Seconds to wait before reconnecting after an error
+IMAP_IDLE_RETRY_DELAY = 30
+
+
+def _has_buffered_data(imap: imaplib.IMAP4) -> bool:
+    """
+    True if a read would not block: imaplib reads through the buffered
+    ``imap.file``, and TLS may hold decrypted bytes, neither of which
+    select() on the socket can see. Peeks without blocking.
+    """
+    sock = imap.sock
+    timeout = sock.gettimeout()
+    sock.settimeout(0)
+    try:
+        return bool(imap.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        sock.settimeout(timeout)
+
+
+def idle(imap: imaplib.IMAP4, timeout: float) -> bool:
+    """
+    Wait in IDLE for up to ``timeout`` seconds.
+
+    Returns True if the server reported new messages (untagged EXISTS).
+    """
+    tag = imap._new_tag()
+    imap.tagged_commands.pop(tag, None)
+    imap.send(tag + b" IDLE\r\n")
+    response = imap.readline()
+    if not response.startswith(b"+"):
+        raise imaplib.IMAP4.error(f"IDLE rejected: {response.strip()!r}")
+
+    has_mail = False
+    deadline = time.monotonic() + timeout
+    while not has_mail:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Lines that came with "+ idling" or an earlier line are already buffered
+        if not _has_buffered_data(imap):
+            readable, _, _ = select.select([imap.sock], [], [], remaining)
+            if not readable:
+                break
+        line = imap.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("Connection closed during IDLE")
+        has_mail = line.startswith(b"*") and line.rstrip().upper().endswith(b"EXISTS")
+
+    imap.send(b"DONE\r\n")
+    while True:
+        line = imap.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("Connection closed while ending IDLE")
+        if line.startswith(tag + b" "):
+            if not line[len(tag):].strip().upper().startswith(b"OK"):
+                raise imaplib.IMAP4.error(f"IDLE failed: {line.strip()!r}")
+            return has_mail
+
+
+def _load_config(config_id: int):
+    """Load an email configuration detached from its session (None if gone)."""
+    from backend.core.database import SessionLocal
+    from backend.models import EmailConfiguration
+
+    db = SessionLocal()
+    try:
+        return db.query(EmailConfiguration).filter(
+            EmailConfiguration.id == config_id,
+            EmailConfiguration.is_active == True,
+            EmailConfiguration.is_inbound_enabled == True
+        ).first()
+    finally:
+        db.close()
+
+
+def _active_imap_mailboxes() -> Dict[int, tuple]:
+    """
+    Active inbound IMAP configurations as {id: connection fingerprint}.
+
+    A listener is restarted when its fingerprint changes.
+    """
+    from backend.core.database import SessionLocal
+    from backend.models import EmailConfiguration
+    from backend.routers.settings import get_setting_value
+
+    db = SessionLocal()
+    try:
+        if get_setting_value(db, "email_inbound_enabled", "false").lower() != "true":
+            return {}
+
+        configs = db.query(EmailConfiguration).filter(
+            EmailConfiguration.is_active == True,
+            EmailConfiguration.is_inbound_enabled == True,
+            EmailConfiguration.provider_type != "microsoft_365"
+        ).all()
+        return {
+            config.id: (
+                config.imap_host, config.imap_port, config.imap_use_ssl,
+                config.imap_username, config.imap_password, config.imap_folder,
+            )
+            for config in configs if config.imap_host
+        }
+    finally:
+        db.close()
+
+
+class MailboxListener(threading.Thread):
+    """Keeps one mailbox in IDLE and queues a poll whenever mail arrives."""
+
+    def __init__(self, config_id: int, fingerprint: tuple):
+        super().__init__(name=f"imap-idle-{config_id}", daemon=True)
+        self.config_id = config_id
+        self.fingerprint = fingerprint
+        self._stopped = threading.Event()
+        self._imap: Optional[imaplib.IMAP4] = None
+
+    def stop(self) -> None:
+        self._stopped.set()
+        imap = self._imap
+        if imap is not None:
+            # Wakes a select() waiting in IDLE
+            try:
+                imap.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _queue_poll(self) -> None:
+        poll_email_inbox_task.delay(config_ids=[self.config_id])
+
+    def _listen(self) -> bool:
+        """Connect and IDLE until stopped or disconnected; False if IDLE is unsupported."""
+        from backend.core.email.receiver import EmailReceiver
+
+        config = _load_config(self.config_id)
+        if config is None:
+            return False
+
+        receiver = EmailReceiver(config, timeout=IMAP_IDLE_COMMAND_TIMEOUT)
+        imap = self._imap = receiver.connect_imap()
+        try:
+            if "IDLE" not in imap.capabilities:
+                log_event("imap_idle_unsupported", config_id=self.config_id)
+                return False
+
+            receiver.select_imap_folder(imap)
+            log_event("imap_idle_connected", config_id=self.config_id)
+
+            # Catch up on mail that arrived while disconnected
+            self._queue_poll()
+            while not self._stopped.is_set():
+                if idle(imap, IMAP_IDLE_RENEW):
+                    self._queue_poll()
+            return True
+        finally:
+            self._imap = None
+            try:
+                imap.logout()
+            except Exception:
+                pass
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                if not self._listen():
+                    return
+            except Exception as e:
+                if self._stopped.is_set():
+                    return
+                log_event("imap_idle_error", config_id=self.config_id, error=str(e))
+                self._stopped.wait(IMAP_IDLE_RETRY_DELAY)
+
+
+def main() -> None:
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    listeners: Dict[int, MailboxListener] = {}
+
+    while True:
+        try:
+            mailboxes = _active_imap_mailboxes()
+        except Exception as e:
+            log_event("imap_idle_refresh_error", error=str(e))
+            mailboxes = None
+
+        if mailboxes is not None:
+            for config_id, listener in list(listeners.items()):
+                if mailboxes.get(config_id) != listener.fingerprint:
+                    listener.stop()
+                    del listeners[config_id]
+
+            for config_id, fingerprint in mailboxes.items():
+                if config_id not in listeners:
+                    listener = MailboxListener(config_id, fingerprint)
+                    listener.start()
+                    listeners[config_id] = listener
+
+        time.sleep(IMAP_IDLE_REFRESH)
+
+
+if __name__ == "__main__":
+    main()
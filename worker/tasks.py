@@ -3,6 +3,7 @@ Celery Worker Tasks with Docker Sandboxing.
 Provides secure script execution in ephemeral containers.
 """
 import os
+import random
 import subprocess
 from datetime import datetime, timezone, timedelta, date
 import logging
@@ -16,6 +17,8 @@ import nmap
 import paramiko
 import winrm
 from celery import Celery
+from celery.exceptions import Retry
+from celery.signals import worker_process_init
 from sqlalchemy.orm import Session
 import redis
 from cryptography.fernet import Fernet
@@ -39,6 +42,21 @@ celery_app = Celery("inframate_worker", broker=CELERY_BROKER_URL, backend=CELERY
 # Celery configuration for Celery 6.0 compatibility
 celery_app.conf.broker_connection_retry_on_startup = True
 
+# Webhook deliveries run on their own queue (see the webhook-worker service)
+# so slow receivers never hold up scans, scripts or email processing
+WEBHOOK_QUEUE = "webhooks"
+# Network scans run on theirs (see the scan-worker service): a scan of a
+# large subnet is many shards that would otherwise fill every worker slot
+SCAN_QUEUE = "scans"
+celery_app.conf.task_routes = {
+    'worker.tasks.deliver_webhook_task': {'queue': WEBHOOK_QUEUE},
+    'worker.tasks.dispatch_webhook_outbox_task': {'queue': WEBHOOK_QUEUE},
+    'worker.tasks.scan_subnet_task': {'queue': SCAN_QUEUE},
+    'worker.tasks.scan_subnet_shard_task': {'queue': SCAN_QUEUE},
+    'worker.tasks.finalize_subnet_scan_task': {'queue': SCAN_QUEUE},
+    'worker.tasks.schedule_subnet_scans_task': {'queue': SCAN_QUEUE},
+}
+
 # Configuration
 SCRIPTS_DIR = os.environ.get("SCRIPTS_DIR", "/scripts_storage")
 SSH_TIMEOUT = int(os.environ.get("SSH_TIMEOUT", "30"))
@@ -739,12 +757,168 @@ def _execute_directly(
     return run_local(cmd)
 
 
+def _scan_shard(db: Session, subnet, cidr: str) -> dict:
+    """
+    Discover the hosts of one shard with the subnet's scan engine and
+    upsert them.
+
+    The shard's hosts and the subnet's shard counter commit together.
+    Failures are returned (not raised) so the scan callback still runs.
+    """
+    from sqlalchemy import func, update
+    from backend.core.subnet_scan import (
+        addresses_to_rescan, discover, record_shard_progress, upsert_scan_results, utc_now_naive
+    )
+    from backend.models import Subnet
+
+    record_shard_progress(subnet.id, cidr, "running")
+    hosts_found = 0
+    hosts_offline = 0
+    try:
+        addresses = None
+        if subnet.scan_rescan_cutoff is not None:
+            addresses = addresses_to_rescan(db, subnet.id, cidr, subnet.scan_rescan_cutoff)
+
+        # Batches are upserted as the engine produces them
+        for results in discover(subnet, cidr, addresses):
+            upsert_scan_results(db, subnet.id, results, scanned_at=utc_now_naive())
+            hosts_found += len(results)
+            hosts_offline += sum(1 for result in results if result.status != 'active')
+        db.execute(
+            update(Subnet)
+            .where(Subnet.id == subnet.id)
+            .values(scan_checkpoint=func.coalesce(Subnet.scan_checkpoint, 0) + 1)
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        detail = str(e)
+        if isinstance(e, nmap.PortScannerError):
+            status = "permission_denied" if "privileged" in detail.lower() else "nmap_error"
+        else:
+            status = "scan_error"
+        log_event(status, subnet_id=subnet.id, cidr=cidr, error=detail)
+        record_shard_progress(subnet.id, cidr, "failed", error=detail)
+        return {"status": "error", "cidr": cidr, "error": detail}
+
+    record_shard_progress(subnet.id, cidr, "done", hosts_found=hosts_found, hosts_offline=hosts_offline)
+    return {"status": "success", "cidr": cidr, "hosts_found": hosts_found, "hosts_offline": hosts_offline}
+
+
+def _scan_shard_in_site_slot(task, db: Session, subnet, cidr: str) -> dict:
+    """
+    Run _scan_shard within one of the site's SCAN_SITE_CONCURRENCY slots.
+
+    Retries ``task`` later while all slots are busy.
+    """
+    from backend.core.cache import acquire_slot, release_slot
+    from backend.core.subnet_scan import (
+        SCAN_SHARD_LEASE, SCAN_SITE_CONCURRENCY, SCAN_SLOT_RETRY_DELAY,
+        record_shard_progress, site_slot_key
+    )
+
+    slot_key = site_slot_key(subnet.entity_id)
+    token = acquire_slot(slot_key, SCAN_SITE_CONCURRENCY, SCAN_SHARD_LEASE)
+    if token is None:
+        record_shard_progress(subnet.id, cidr, "waiting")
+        raise task.retry(countdown=SCAN_SLOT_RETRY_DELAY * (1 + random.random()), max_retries=None)
+    try:
+        return _scan_shard(db, subnet, cidr)
+    finally:
+        release_slot(slot_key, token)
+
+
+def _finish_subnet_scan(db: Session, subnet, scan_started_at: datetime, shard_results: List[dict]) -> str:
+    """
+    Merge shard results; once every shard succeeded, mark the hosts the scan
+    did not see as available, clear the checkpoint and send the scan's
+    changes to "subnet.changes_detected" webhooks.
+    """
+    from backend.core.subnet_scan import mark_missing_hosts, summarize_changes
+    from backend.core.webhook_outbox import enqueue_webhook_event
+
+    hosts_found = sum(result.get("hosts_found", 0) for result in shard_results)
+    offline_hosts = sum(result.get("hosts_offline", 0) for result in shard_results)
+    failed = [result for result in shard_results if result.get("status") == "error"]
+
+    if failed:
+        # Keep the checkpoint: scanning again retries the failed shards only
+        log_event(
+            "subnet_scan_incomplete",
+            subnet_id=subnet.id,
+            cidr=str(subnet.cidr),
+            hosts_found=hosts_found,
+            failed_shards=[result["cidr"] for result in failed]
+        )
+        return (
+            f"Scan incomplete for {subnet.cidr}: {len(failed)} of {len(shard_results)} shards failed "
+            f"({failed[0]['error']}). Found {hosts_found} hosts."
+        )
+
+    # An incremental scan did not probe the hosts checked after its cutoff
+    hosts_gone = mark_missing_hosts(db, subnet.id, subnet.scan_rescan_cutoff or scan_started_at)
+    subnet.scan_checkpoint = None
+
+    summary = summarize_changes(db, subnet.id, scan_started_at)
+    if summary["counts"]:
+        enqueue_webhook_event(db, "subnet.changes_detected", {
+            "subnet_id": subnet.id,
+            "cidr": str(subnet.cidr),
+            "scan_started_at": scan_started_at.isoformat(),
+            **summary,
+        }, entity_id=subnet.entity_id)
+    db.commit()
+
+    log_event(
+        "subnet_scan_complete",
+        subnet_id=subnet.id,
+        cidr=str(subnet.cidr),
+        incremental=subnet.scan_rescan_cutoff is not None,
+        shards=len(shard_results),
+        hosts_found=hosts_found,
+        hosts_offline=offline_hosts,
+        hosts_gone=hosts_gone,
+        changes=summary["counts"]
+    )
+
+    return (
+        f"Scan complete for {subnet.cidr}. "
+        f"Found {hosts_found} hosts ({offline_hosts} offline, {hosts_gone} no longer active)."
+    )
+
+
+def _load_scan(db: Session, subnet_id: int, scan_started_at: str):
+    """The subnet if the scan started at ``scan_started_at`` is still its current one."""
+    from backend.models import Subnet
+
+    subnet = db.query(Subnet).filter(Subnet.id == subnet_id).first()
+    if not subnet or subnet.scan_started_at != datetime.fromisoformat(scan_started_at):
+        return None
+    return subnet
+
+
 @celery_app.task(bind=True)
-def scan_subnet_task(self, subnet_id: int):
-    """Scan a subnet for active hosts using nmap."""
+def scan_subnet_task(self, subnet_id: int, incremental: bool = False):
+    """
+    Scan a subnet for active hosts (nmap or the native engine, per subnet).
+
+    The subnet is split into /24 shards (SCAN_CHUNK_PREFIX). A single shard
+    is scanned here; larger subnets are scanned as a chord of
+    scan_subnet_shard_task merged by finalize_subnet_scan_task. Shards that
+    completed are skipped when an interrupted scan of the same kind is
+    started again within SCAN_RESUME_WINDOW.
+
+    An incremental scan only probes addresses not checked within the
+    subnet's ``rescan_after_minutes`` (a full scan if that is not set).
+    """
     import ipaddress as ipaddr_module
+    from celery import chord, group
     from backend.core.database import SessionLocal
-    from backend.models import Subnet, IPAddress
+    from backend.core.subnet_scan import (
+        SCAN_RESUME_WINDOW, get_scan_progress, reset_scan_progress, rescan_cutoff,
+        scan_chunks, utc_now_naive
+    )
+    from backend.models import Subnet
 
     db: Session = SessionLocal()
     try:
@@ -763,78 +937,105 @@ def scan_subnet_task(self, subnet_id: int):
             log_event("invalid_cidr", subnet_id=subnet_id, cidr=str(subnet.cidr), error=str(e))
             return f"Invalid CIDR format: {subnet.cidr}"
 
-        log_event("subnet_scan_start", subnet_id=subnet_id, cidr=cidr_str)
+        chunks = scan_chunks(validated_network)
+        now = utc_now_naive()
+        cutoff = rescan_cutoff(subnet, now) if incremental else None
+
+        # Resume an interrupted scan with the shards that did not complete
+        pending = []
+        if (
+            len(chunks) > 1
+            and subnet.scan_checkpoint is not None
+            and subnet.scan_started_at is not None
+            and (now - subnet.scan_started_at).total_seconds() < SCAN_RESUME_WINDOW
+            and (subnet.scan_rescan_cutoff is None) == (cutoff is None)
+        ):
+            done = {
+                shard for shard, info in get_scan_progress(subnet_id).items()
+                if info.get("state") == "done"
+            }
+            pending = [chunk for chunk in chunks if chunk not in done]
 
-        nm = nmap.PortScanner()
+        if pending:
+            scan_started_at = subnet.scan_started_at
+            log_event("subnet_scan_resume", subnet_id=subnet_id, cidr=cidr_str, pending=len(pending), chunks=len(chunks))
+        else:
+            pending = chunks
+            scan_started_at = now
+            subnet.scan_started_at = scan_started_at
+            subnet.scan_checkpoint = 0
+            subnet.scan_rescan_cutoff = cutoff
+            db.commit()
+            reset_scan_progress(subnet_id, chunks)
+            log_event(
+                "subnet_scan_start",
+                subnet_id=subnet_id,
+                cidr=cidr_str,
+                chunks=len(chunks),
+                incremental=cutoff is not None
+            )
 
-        offline_hosts = 0
-        try:
-            nm.scan(hosts=cidr_str, arguments='-sn -PR -R --max-retries 2')
-        except nmap.PortScannerError as e:
-            detail = str(e)
-            status = "permission_denied" if "privileged" in detail.lower() else "nmap_error"
-            log_event(status, subnet_id=subnet_id, error=detail)
-            return f"Scan failed: {detail}"
-        except Exception as e:
-            log_event("scan_error", subnet_id=subnet_id, error=str(e))
-            return f"Scan failed: {str(e)}"
+        if len(chunks) == 1:
+            shard_result = _scan_shard_in_site_slot(self, db, subnet, cidr_str)
+            return _finish_subnet_scan(db, subnet, scan_started_at, [shard_result])
+
+        started = scan_started_at.isoformat()
+        chord(
+            group(scan_subnet_shard_task.s(subnet_id, chunk, started) for chunk in pending),
+            finalize_subnet_scan_task.s(subnet_id, started)
+        ).apply_async()
+
+        return f"Scan of {cidr_str} started in {len(pending)} shards."
 
-        scanned_hosts = nm.all_hosts()
+    except Retry:
+        raise
+    except Exception as e:
+        db.rollback()
         log_event(
-            "subnet_scan_hosts_found",
+            "subnet_scan_error",
             subnet_id=subnet_id,
-            host_count=len(scanned_hosts)
+            error_type=type(e).__name__,
+            error_message=str(e)
         )
+        return f"Scan failed: {str(e)}"
+    finally:
+        db.close()
 
-        for host in scanned_hosts:
-            status = 'active' if nm[host].state() == 'up' else 'available'
-            if status != 'active':
-                offline_hosts += 1
-            hostname = nm[host].hostname() if nm[host].hostname() else None
-            mac = None
-            if 'addresses' in nm[host] and 'mac' in nm[host]['addresses']:
-                mac = nm[host]['addresses']['mac']
-
-            existing_ip = db.query(IPAddress).filter(
-                IPAddress.subnet_id == subnet_id,
-                IPAddress.address == host
-            ).first()
 
-            if existing_ip:
-                existing_ip.status = status
-                existing_ip.last_scanned_at = datetime.now(timezone.utc)
-                if hostname:
-                    existing_ip.hostname = hostname
-                if mac:
-                    existing_ip.mac_address = mac
-            else:
-                new_ip = IPAddress(
-                    address=host,
-                    subnet_id=subnet_id,
-                    status=status,
-                    hostname=hostname,
-                    mac_address=mac,
-                    last_scanned_at=datetime.now(timezone.utc)
-                )
-                db.add(new_ip)
+@celery_app.task(bind=True)
+def scan_subnet_shard_task(self, subnet_id: int, cidr: str, scan_started_at: str):
+    """
+    Scan one shard of a subnet scan (see scan_subnet_task).
 
-            # Commit per host to allow safe resume on interruption
-            db.commit()
+    Waits for a site slot by retrying, so a site never has more than
+    SCAN_SITE_CONCURRENCY shards probing its networks at once.
+    """
+    from backend.core.database import SessionLocal
 
-        log_event(
-            "subnet_scan_complete",
-            subnet_id=subnet_id,
-            cidr=str(subnet.cidr),
-            hosts_found=len(scanned_hosts),
-            hosts_offline=offline_hosts
-        )
+    db: Session = SessionLocal()
+    try:
+        subnet = _load_scan(db, subnet_id, scan_started_at)
+        if subnet is None:
+            # The subnet was deleted or a newer scan replaced this one
+            return {"status": "skipped", "cidr": cidr}
+        return _scan_shard_in_site_slot(self, db, subnet, cidr)
+    finally:
+        db.close()
 
-        return (
-            f"Scan complete for {subnet.cidr}. "
-            f"Found {len(scanned_hosts)} hosts ({offline_hosts} offline)."
-        )
 
+@celery_app.task(bind=True)
+def finalize_subnet_scan_task(self, shard_results: list, subnet_id: int, scan_started_at: str):
+    """Chord callback of a sharded subnet scan: merge the shard results."""
+    from backend.core.database import SessionLocal
+
+    db: Session = SessionLocal()
+    try:
+        subnet = _load_scan(db, subnet_id, scan_started_at)
+        if subnet is None:
+            return "Scan superseded"
+        return _finish_subnet_scan(db, subnet, subnet.scan_started_at, shard_results)
     except Exception as e:
+        db.rollback()
         log_event(
             "subnet_scan_error",
             subnet_id=subnet_id,
@@ -846,6 +1047,36 @@ def scan_subnet_task(self, subnet_id: int):
         db.close()
 
 
+@celery_app.task(bind=True)
+def schedule_subnet_scans_task(self):
+    """
+    Start the scans of subnets whose scan interval has passed (every minute
+    via beat). Subnets with ``rescan_after_minutes`` get incremental scans.
+    """
+    from backend.core.database import SessionLocal
+    from backend.core.subnet_scan import (
+        claim_scheduled_scan, find_due_subnets, scan_in_progress, utc_now_naive
+    )
+
+    db: Session = SessionLocal()
+    try:
+        started = []
+        for subnet in find_due_subnets(db, utc_now_naive()):
+            if scan_in_progress(subnet.id) or not claim_scheduled_scan(subnet):
+                continue
+            scan_subnet_task.delay(subnet.id, incremental=bool(subnet.rescan_after_minutes))
+            started.append(subnet.id)
+
+        if started:
+            log_event("subnet_scans_scheduled", subnet_ids=started)
+        return {"status": "success", "scans_started": len(started)}
+    except Exception as e:
+        log_event("subnet_scan_schedule_error", error=str(e))
+        return {"status": "error", "error": str(e)}
+    finally:
+        db.close()
+
+
 # ==================== EXPIRATION NOTIFICATION TASKS ====================
 
 @celery_app.task(bind=True)
@@ -1601,53 +1832,48 @@ def cleanup_expired_tokens_task(self):
 @celery_app.task(bind=True)
 def cleanup_old_audit_logs_task(self, days_to_keep: int = 90):
     """
-    Clean up old audit logs to prevent the audit_logs table from growing indefinitely.
-    By default, keeps the last 90 days of audit logs.
+    Apply audit log retention by dropping whole monthly partitions.
+
+    A partition is dropped once its entire month is older than the cutoff,
+    so between ``days_to_keep`` and ``days_to_keep`` + one month of logs is
+    retained. Stray rows in the default partition are deleted individually
+    (it only holds rows outside every monthly range).
 
     Args:
         days_to_keep: Number of days of audit logs to retain (default: 90)
 
     Returns summary of cleanup operations performed.
     """
+    from sqlalchemy import text
     from backend.core.database import SessionLocal
-    from backend.models import AuditLog
+    from backend.core.audit_partitions import AUDIT_LOGS_DEFAULT_PARTITION, drop_partitions_before
 
     db: Session = SessionLocal()
     try:
         now = datetime.now(timezone.utc)
         cutoff_date = now - timedelta(days=days_to_keep)
 
-        # Count logs before cleanup
-        total_before = db.query(AuditLog).count()
-        # Note: AuditLog uses 'timestamp' column, not 'created_at'
-        old_logs_count = db.query(AuditLog).filter(
-            AuditLog.timestamp < cutoff_date
-        ).count()
-
-        # Delete old audit logs
-        deleted_count = db.query(AuditLog).filter(
-            AuditLog.timestamp < cutoff_date
-        ).delete(synchronize_session=False)
+        dropped = drop_partitions_before(db, cutoff_date)
+        default_deleted = db.execute(
+            text(f"DELETE FROM {AUDIT_LOGS_DEFAULT_PARTITION} WHERE timestamp < :cutoff"),
+            {"cutoff": cutoff_date.replace(tzinfo=None)}
+        ).rowcount
 
         db.commit()
 
-        total_after = db.query(AuditLog).count()
-
         log_event(
             "audit_log_cleanup_complete",
             days_to_keep=days_to_keep,
             cutoff_date=cutoff_date.isoformat(),
-            total_before=total_before,
-            total_after=total_after,
-            deleted_count=deleted_count
+            dropped_partitions=dropped,
+            default_partition_deleted=default_deleted
         )
 
         return {
             "status": "success",
             "days_to_keep": days_to_keep,
-            "total_before": total_before,
-            "total_after": total_after,
-            "deleted_count": deleted_count
+            "dropped_partitions": dropped,
+            "default_partition_deleted": default_deleted
         }
 
     except Exception as e:
@@ -1662,6 +1888,318 @@ def cleanup_old_audit_logs_task(self, days_to_keep: int = 90):
         db.close()
 
 
+@celery_app.task(bind=True)
+def rollup_audit_logs_task(self):
+    """
+    Refresh the hourly and daily audit statistics rollups for every
+    complete hour since the previous run.
+    """
+    from backend.core.database import SessionLocal
+    from backend.core.audit import refresh_audit_rollups
+
+    db: Session = SessionLocal()
+    try:
+        result = refresh_audit_rollups(db)
+        db.commit()
+        return {"status": "success", **result}
+
+    except Exception as e:
+        db.rollback()
+        log_event(
+            "audit_rollup_error",
+            error_type=type(e).__name__,
+            error_message=str(e)
+        )
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True)
+def maintain_audit_log_partitions_task(self, months_ahead: int = 3):
+    """
+    Pre-create the audit log partitions for the current and upcoming months
+    so inserts never fall through to the default partition.
+    """
+    from backend.core.database import SessionLocal
+    from backend.core.audit_partitions import ensure_partitions
+
+    db: Session = SessionLocal()
+    try:
+        created = ensure_partitions(db, months_ahead=months_ahead)
+        db.commit()
+
+        if created:
+            log_event("audit_log_partitions_created", partitions=created)
+        return {"status": "success", "created": created}
+
+    except Exception as e:
+        db.rollback()
+        log_event(
+            "audit_log_partition_error",
+            error_type=type(e).__name__,
+            error_message=str(e)
+        )
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
+
+
+# ==================== EXPORT JOB TASKS ====================
+
+EXPORT_DIR = os.environ.get("EXPORT_DIR", "/exports")
+EXPORT_RETENTION_HOURS = int(os.environ.get("EXPORT_RETENTION_HOURS", "24"))
+# Rows between two progress updates of an export job
+EXPORT_PROGRESS_INTERVAL = 1000
+
+
+@celery_app.task(bind=True)
+def run_export_job_task(self, job_id: int):
+    """
+    Run a background export job and write its file to EXPORT_DIR.
+
+    Rows are streamed from a server-side cursor using the query builders and
+    column definitions of the export router. Progress is published through
+    the task state (PROGRESS, meta={"processed", "total"}).
+    """
+    from backend.core.database import SessionLocal
+    from backend.core.export_writers import iter_csv, write_xlsx
+    from backend.models import ExportJob, User
+    from backend.routers.export import (
+        EXPORT_BATCH_SIZE, EXPORT_JOB_TYPES, build_export_job_query
+    )
+
+    db: Session = SessionLocal()
+    tmp_path = None
+    try:
+        job = db.query(ExportJob).filter(ExportJob.id == job_id).first()
+        if not job:
+            log_event("export_job_not_found", job_id=job_id)
+            return {"status": "error", "message": "Export job not found"}
+
+        user = db.query(User).filter(User.id == job.requested_by_id).first()
+        if not user or not user.is_active:
+            job.status = "failed"
+            job.error_message = "Requesting user is no longer active"
+            job.completed_at = datetime.now(timezone.utc)
+            db.commit()
+            return {"status": "error", "message": job.error_message}
+
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        db.commit()
+
+        spec = EXPORT_JOB_TYPES[job.export_type]
+        query = build_export_job_query(db, job.export_type, job.filters or {}, user)
+        total = query.order_by(None).count()
+        self.update_state(state="PROGRESS", meta={"job_id": job_id, "processed": 0, "total": total})
+
+        processed = 0
+
+        def rows():
+            nonlocal processed
+            for obj in query.yield_per(EXPORT_BATCH_SIZE):
+                yield spec["row_builder"](obj)
+                processed += 1
+                if processed % EXPORT_PROGRESS_INTERVAL == 0:
+                    self.update_state(
+                        state="PROGRESS",
+                        meta={"job_id": job_id, "processed": processed, "total": total}
+                    )
+
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        filename = f"{job.export_type}_export_{job.id}_{timestamp}.{job.format}"
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        final_path = os.path.join(EXPORT_DIR, filename)
+        tmp_path = final_path + ".part"
+
+        if job.format == "xlsx":
+            with open(tmp_path, "wb") as output:
+                write_xlsx(rows(), output, spec.get("column_labels"))
+        else:
+            with open(tmp_path, "w", newline="", encoding="utf-8") as output:
+                for chunk in iter_csv(rows()):
+                    output.write(chunk)
+        os.replace(tmp_path, final_path)
+        tmp_path = None
+
+        now = datetime.now(timezone.utc)
+        job.status = "completed"
+        job.filename = filename
+        job.row_count = processed
+        job.completed_at = now
+        job.expires_at = now + timedelta(hours=EXPORT_RETENTION_HOURS)
+        db.commit()
+
+        log_event(
+            "export_job_complete",
+            job_id=job_id,
+            export_type=job.export_type,
+            format=job.format,
+            row_count=processed
+        )
+        return {"status": "success", "job_id": job_id, "row_count": processed}
+
+    except Exception as e:
+        db.rollback()
+        log_event(
+            "export_job_error",
+            job_id=job_id,
+            error_type=type(e).__name__,
+            error_message=str(e)
+        )
+        job = db.query(ExportJob).filter(ExportJob.id == job_id).first()
+        if job:
+            job.status = "failed"
+            job.error_message = str(e)
+            job.completed_at = datetime.now(timezone.utc)
+            db.commit()
+        return {"status": "error", "message": str(e)}
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        db.close()
+
+
+@celery_app.task(bind=True)
+def cleanup_expired_exports_task(self):
+    """
+    Delete export jobs past their retention date along with their files,
+    and remove partial files left behind by interrupted jobs.
+    """
+    from backend.core.database import SessionLocal
+    from backend.models import ExportJob
+
+    db: Session = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        expired_jobs = db.query(ExportJob).filter(ExportJob.expires_at < now).all()
+
+        files_deleted = 0
+        for job in expired_jobs:
+            if job.filename:
+                path = os.path.join(EXPORT_DIR, job.filename)
+                if os.path.exists(path):
+                    os.remove(path)
+                    files_deleted += 1
+            db.delete(job)
+        db.commit()
+
+        partial_deleted = 0
+        if os.path.isdir(EXPORT_DIR):
+            cutoff = now.timestamp() - EXPORT_RETENTION_HOURS * 3600
+            for name in os.listdir(EXPORT_DIR):
+                path = os.path.join(EXPORT_DIR, name)
+                if name.endswith(".part") and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    partial_deleted += 1
+
+        log_event(
+            "export_cleanup_complete",
+            jobs_deleted=len(expired_jobs),
+            files_deleted=files_deleted,
+            partial_files_deleted=partial_deleted
+        )
+        return {
+            "status": "success",
+            "jobs_deleted": len(expired_jobs),
+            "files_deleted": files_deleted,
+            "partial_files_deleted": partial_deleted
+        }
+
+    except Exception as e:
+        db.rollback()
+        log_event(
+            "export_cleanup_error",
+            error_type=type(e).__name__,
+            error_message=str(e)
+        )
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
+
+
+# ==================== WEBHOOK DELIVERY ====================
+
+WEBHOOK_OUTBOX_RETENTION_DAYS = int(os.environ.get("WEBHOOK_OUTBOX_RETENTION_DAYS", "7"))
+
+
+@celery_app.task(bind=True, acks_late=True)
+def deliver_webhook_task(self, outbox_id: int):
+    """
+    Make one delivery attempt for a webhook outbox row.
+
+    Failed attempts are rescheduled with an ETA instead of sleeping, so a
+    slow or failing receiver only occupies a worker for one request.
+    Duplicate messages are harmless: only one worker can claim a due row.
+    """
+    from backend.core.database import SessionLocal
+    from backend.core.webhook_outbox import deliver_outbox_event
+
+    db: Session = SessionLocal()
+    try:
+        result = deliver_outbox_event(db, outbox_id)
+    except Exception as e:
+        db.rollback()
+        log_event(
+            "webhook_delivery_error",
+            outbox_id=outbox_id,
+            error_type=type(e).__name__,
+            error_message=str(e)
+        )
+        # The row keeps its lease and is picked up again by the sweeper
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
+
+    # Failed attempts and deliveries held back by the circuit breaker or
+    # concurrency cap come back at retry_at
+    if "retry_at" in result:
+        deliver_webhook_task.apply_async(args=[result["outbox_id"]], eta=result["retry_at"])
+        result["retry_at"] = result["retry_at"].isoformat()
+    # A successful probe closed the circuit: deferred events are due now
+    for resume_id in result.pop("resume_ids", []):
+        deliver_webhook_task.delay(resume_id)
+    return result
+
+
+@celery_app.task(bind=True)
+def dispatch_webhook_outbox_task(self, limit: int = 500):
+    """
+    Re-queue outbox rows that are due but have no pending task (message
+    lost at commit time, worker killed mid-delivery) and purge old
+    delivered/failed rows.
+    """
+    from backend.core.database import SessionLocal
+    from backend.core.webhook_outbox import find_due_outbox_events, purge_outbox_events
+
+    db: Session = SessionLocal()
+    try:
+        outbox_ids = find_due_outbox_events(db, limit=limit)
+        purged = purge_outbox_events(
+            db, datetime.now(timezone.utc) - timedelta(days=WEBHOOK_OUTBOX_RETENTION_DAYS)
+        )
+        db.commit()
+
+        for outbox_id in outbox_ids:
+            deliver_webhook_task.delay(outbox_id)
+
+        if outbox_ids or purged:
+            log_event("webhook_outbox_dispatch", requeued=len(outbox_ids), purged=purged)
+        return {"status": "success", "requeued": len(outbox_ids), "purged": purged}
+
+    except Exception as e:
+        db.rollback()
+        log_event(
+            "webhook_outbox_dispatch_error",
+            error_type=type(e).__name__,
+            error_message=str(e)
+        )
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
+
+
 # ==================== CELERY BEAT SCHEDULE ====================
 # Configure periodic tasks (requires celery beat to be running)
 # Using crontab for precise scheduling instead of intervals
@@ -1680,6 +2218,22 @@ celery_app.conf.beat_schedule = {
         'schedule': crontab(hour=3, minute=0, day_of_week='sunday'),
         'args': (90,),  # Keep 90 days of logs
     },
+    # Roll up audit statistics for the hour that just ended
+    'rollup-audit-logs-hourly': {
+        'task': 'worker.tasks.rollup_audit_logs_task',
+        'schedule': crontab(minute=2),
+    },
+    # Pre-create upcoming audit log partitions daily at 3:30 AM UTC
+    'maintain-audit-log-partitions-daily': {
+        'task': 'worker.tasks.maintain_audit_log_partitions_task',
+        'schedule': crontab(hour=3, minute=30),
+        'args': (3,),  # Keep 3 months of partitions ready
+    },
+    # Remove expired export files hourly
+    'cleanup-expired-exports-hourly': {
+        'task': 'worker.tasks.cleanup_expired_exports_task',
+        'schedule': crontab(minute=15),
+    },
     # Check all expirations daily at 8:00 AM UTC
     'check-all-expirations-daily': {
         'task': 'worker.tasks.check_all_expirations_task',
@@ -1696,11 +2250,26 @@ celery_app.conf.beat_schedule = {
         'task': 'worker.tasks.check_sla_warnings_task',
         'schedule': crontab(minute='*/15', hour='6-22'),
     },
+    # Re-queue stranded webhook outbox rows every minute
+    'dispatch-webhook-outbox': {
+        'task': 'worker.tasks.dispatch_webhook_outbox_task',
+        'schedule': crontab(minute='*'),
+    },
     # Poll email inbox every minute
     'poll-email-inbox': {
         'task': 'worker.tasks.poll_email_inbox_task',
         'schedule': crontab(minute='*'),
     },
+    # Send buffered ticket notifications (fallback for lost flush tasks)
+    'flush-ticket-notifications': {
+        'task': 'worker.tasks.flush_ticket_notifications_task',
+        'schedule': crontab(minute='*'),
+    },
+    # Start due scheduled subnet scans every minute
+    'schedule-subnet-scans': {
+        'task': 'worker.tasks.schedule_subnet_scans_task',
+        'schedule': crontab(minute='*'),
+    },
 }
 
 celery_app.conf.timezone = 'UTC'
@@ -1769,6 +2338,258 @@ def check_sla_breaches_task(self):
 
 # ==================== EMAIL NOTIFICATION TASKS ====================
 
+@worker_process_init.connect
+def precompile_email_templates(**kwargs):
+    """Compile email templates once per worker process, before the first task."""
+    try:
+        from backend.core.email.templates import precompile_templates
+        log_event("email_templates_compiled", count=precompile_templates())
+    except Exception as e:
+        log_event("email_templates_compile_error", error=str(e))
+
+
+def _send_ticket_notifications(db: Session, notifications: list) -> dict:
+    """
+    Render and send ticket email notifications.
+
+    Settings, tickets, configurations and threading headers are loaded once
+    for the whole list; emails are then grouped per email configuration and
+    each group is sent through one ``EmailSender.send_many`` call (pooled
+    SMTP connections, or the shared Graph client). SentEmail rows are added
+    to ``db``; the caller commits.
+
+    Args:
+        notifications: Dicts with email_type, ticket_id, recipients and
+                       optional extra_data (see send_ticket_email_task)
+
+    Returns:
+        {"sent_count", "errors", "skipped" (reasons), "missing_tickets",
+        "failed" (the notifications again, with only the recipients that
+        could not be sent to)}
+    """
+    from backend.models import Ticket, User, TicketComment, SentEmail
+    from backend.core.email.sender import get_active_email_config, EmailSender
+    from backend.core.email.microsoft365 import close_graph_connections
+    from backend.core.email.thread_index import index_message_ids
+    from backend.core.email.templates import (
+        build_ticket_email_context, render_email_template, get_email_subject
+    )
+    from backend.routers.settings import get_setting_value
+    from sqlalchemy.orm import joinedload
+    import asyncio
+
+    summary = {"sent_count": 0, "errors": [], "skipped": [], "missing_tickets": [], "failed": []}
+
+    # Check if email notifications are globally enabled
+    if get_setting_value(db, "email_notifications_enabled", "false").lower() != "true":
+        log_event("email_notification_skipped", reason="globally_disabled", count=len(notifications))
+        summary["skipped"].append("email notifications disabled")
+        return summary
+
+    ticket_ids = {n["ticket_id"] for n in notifications}
+    tickets = {
+        t.id: t for t in db.query(Ticket).options(
+            joinedload(Ticket.requester), joinedload(Ticket.assigned_to)
+        ).filter(Ticket.id.in_(ticket_ids)).all()
+    }
+
+    site_name = get_setting_value(db, "site_name", "Inframate")
+    site_url = get_setting_value(db, "site_url", "http://localhost:3000")
+
+    # Comments of all notifications (including coalesced digest events) in one query
+    comment_ids = set()
+    for notification in notifications:
+        extra_data = notification.get("extra_data") or {}
+        comment_ids.add(extra_data.get("comment_id"))
+        comment_ids.update(event.get("comment_id") for event in extra_data.get("events", []))
+    comment_ids.discard(None)
+    comments = {
+        c.id: c for c in db.query(TicketComment).options(
+            joinedload(TicketComment.user)
+        ).filter(TicketComment.id.in_(comment_ids)).all()
+    } if comment_ids else {}
+
+    type_enabled = {}
+    configs_by_entity = {}
+    threading_by_ticket = {}
+    # (email_type, ticket_id, extra_data) -> (subject, html, text)
+    rendered = {}
+    # config id -> (config, [(send kwargs, SentEmail fields, notification index)])
+    groups = {}
+
+    def is_enabled(email_type: str) -> bool:
+        if email_type not in type_enabled:
+            type_enabled[email_type] = get_setting_value(db, f"email_notify_{email_type}", "true").lower() == "true"
+        return type_enabled[email_type]
+
+    for index, notification in enumerate(notifications):
+        email_type = notification["email_type"]
+        ticket_id = notification["ticket_id"]
+        extra_data = notification.get("extra_data") or {}
+
+        if email_type == "ticket_digest":
+            # Drop coalesced events whose type is disabled
+            events = [event for event in extra_data.get("events", []) if is_enabled(event["email_type"])]
+            if len(events) == 1:
+                email_type = events[0]["email_type"]
+                extra_data = {"comment_id": events[0].get("comment_id")}
+            else:
+                extra_data = {"events": events}
+            if not events:
+                log_event("email_notification_skipped", email_type="ticket_digest", reason="disabled")
+                summary["skipped"].append("notification type disabled")
+                continue
+
+        # Check if this email type is enabled
+        elif not is_enabled(email_type):
+            log_event("email_notification_skipped", email_type=email_type, reason="disabled")
+            summary["skipped"].append("notification type disabled")
+            continue
+
+        ticket = tickets.get(ticket_id)
+        if not ticket:
+            summary["missing_tickets"].append(ticket_id)
+            continue
+
+        # Get email configuration
+        if ticket.entity_id not in configs_by_entity:
+            configs_by_entity[ticket.entity_id] = get_active_email_config(db, ticket.entity_id)
+        config = configs_by_entity[ticket.entity_id]
+        if not config:
+            log_event("email_notification_skipped", email_type=email_type, reason="no_config")
+            summary["skipped"].append("no email configuration")
+            continue
+
+        # Render each distinct email once per batch
+        render_key = (email_type, ticket_id, json.dumps(extra_data, sort_keys=True))
+        if render_key not in rendered:
+            # Build context for template (plain values, memoized renders)
+            updates = None
+            if email_type == "ticket_digest":
+                # Coalesced updates, oldest first
+                updates = [
+                    (event["email_type"], comments.get(event.get("comment_id")))
+                    for event in extra_data["events"]
+                ]
+            context = build_ticket_email_context(
+                ticket,
+                comment=comments.get(extra_data.get("comment_id")),
+                updates=updates
+            )
+
+            # Render template
+            html_content, text_content = render_email_template(
+                email_type,
+                context,
+                site_name=site_name,
+                site_url=site_url
+            )
+
+            # Get subject
+            subject = get_email_subject(email_type, ticket.ticket_number, ticket.title)
+            rendered[render_key] = (subject, html_content, text_content)
+        subject, html_content, text_content = rendered[render_key]
+
+        # Get previous message ID for threading
+        if ticket_id not in threading_by_ticket:
+            last_sent = db.query(SentEmail.message_id).filter(
+                SentEmail.ticket_id == ticket_id
+            ).order_by(SentEmail.created_at.desc()).first()
+            threading_by_ticket[ticket_id] = last_sent.message_id if last_sent else None
+        in_reply_to = references = threading_by_ticket[ticket_id]
+
+        group = groups.setdefault(config.id, (config, []))[1]
+        for recipient_email in notification["recipients"]:
+            group.append((
+                {
+                    "to_email": recipient_email,
+                    "subject": subject,
+                    "body_html": html_content,
+                    "body_text": text_content,
+                    "ticket_id": ticket_id,
+                    "ticket_number": ticket.ticket_number,
+                    "in_reply_to": in_reply_to,
+                    "references": references,
+                },
+                {
+                    "email_config_id": config.id,
+                    "ticket_id": ticket_id,
+                    "comment_id": extra_data.get("comment_id"),
+                    "in_reply_to": in_reply_to,
+                    "references": references,
+                    "recipient_email": recipient_email,
+                    "subject": subject,
+                    "body_text": text_content,
+                    "body_html": html_content,
+                    "email_type": email_type,
+                },
+                index,
+            ))
+
+    if not groups:
+        return summary
+
+    # Send each configuration's emails together, on one event loop
+    results = []
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        for config, emails in groups.values():
+            sent = loop.run_until_complete(EmailSender(config).send_many([kwargs for kwargs, _, _ in emails]))
+            results.extend(zip(emails, sent))
+    finally:
+        loop.run_until_complete(close_graph_connections())
+        loop.close()
+
+    # Find recipient user IDs
+    recipient_emails = {fields["recipient_email"] for (_, fields, _), _ in results}
+    user_ids = dict(db.query(User.email, User.id).filter(User.email.in_(recipient_emails)).all())
+
+    now = datetime.now(timezone.utc)
+    sent_emails = []
+    # notification index -> recipients to retry
+    failed_recipients = {}
+    for (_, fields, index), (message_id, error) in results:
+        if error is None:
+            # Track sent email
+            sent_emails.append(SentEmail(
+                message_id=message_id,
+                recipient_user_id=user_ids.get(fields["recipient_email"]),
+                status="sent",
+                sent_at=now,
+                **fields
+            ))
+            summary["sent_count"] += 1
+        else:
+            summary["errors"].append(f"{fields['recipient_email']}: {error}")
+            failed_recipients.setdefault(index, []).append(fields["recipient_email"])
+            # Track failed email
+            sent_emails.append(SentEmail(
+                message_id=f"<failed-{uuid.uuid4().hex[:8]}@inframate.local>",
+                recipient_user_id=user_ids.get(fields["recipient_email"]),
+                status="failed",
+                error_message=error,
+                **fields
+            ))
+
+    # Flushed as one multi-row INSERT
+    db.add_all(sent_emails)
+
+    summary["failed"] = [
+        {**notifications[index], "recipients": recipients}
+        for index, recipients in sorted(failed_recipients.items())
+    ]
+
+    # Replies to these emails are matched to their ticket by Message-ID
+    index_message_ids(
+        db,
+        {e.message_id: e.ticket_id for e in sent_emails if e.status == "sent"},
+        source="sent"
+    )
+
+    return summary
+
+
 @celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
 def send_ticket_email_task(
     self,
@@ -1787,157 +2608,106 @@ def send_ticket_email_task(
         extra_data: Additional data (e.g., comment_id for comment notifications)
     """
     from backend.core.database import SessionLocal
-    from backend.models import Ticket, User, TicketComment, SentEmail, EmailConfiguration
-    from backend.core.email.sender import get_active_email_config, EmailSender
-    from backend.core.email.templates import render_email_template, get_email_subject
-    from backend.routers.settings import get_setting_value
-    import asyncio
 
     db: Session = SessionLocal()
     try:
-        # Check if this email type is enabled
-        setting_key = f"email_notify_{email_type}"
-        if get_setting_value(db, setting_key, "true").lower() != "true":
-            log_event("email_notification_skipped", email_type=email_type, reason="disabled")
-            return {"status": "skipped", "reason": "notification type disabled"}
+        result = _send_ticket_notifications(db, [{
+            "email_type": email_type,
+            "ticket_id": ticket_id,
+            "recipients": recipients,
+            "extra_data": extra_data,
+        }])
+
+        if result["missing_tickets"]:
+            return {"status": "error", "message": f"Ticket {ticket_id} not found"}
+        if result["skipped"]:
+            return {"status": "skipped", "reason": result["skipped"][0]}
 
-        # Check if email notifications are globally enabled
-        if get_setting_value(db, "email_notifications_enabled", "false").lower() != "true":
-            log_event("email_notification_skipped", email_type=email_type, reason="globally_disabled")
-            return {"status": "skipped", "reason": "email notifications disabled"}
+        db.commit()
 
-        # Get ticket
-        ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-        if not ticket:
-            return {"status": "error", "message": f"Ticket {ticket_id} not found"}
+        sent_count, errors = result["sent_count"], result["errors"]
+        log_event(
+            "email_notification_sent",
+            email_type=email_type,
+            ticket_id=ticket_id,
+            sent_count=sent_count,
+            error_count=len(errors)
+        )
 
-        # Get email configuration
-        config = get_active_email_config(db, ticket.entity_id)
-        if not config:
-            log_event("email_notification_skipped", email_type=email_type, reason="no_config")
-            return {"status": "skipped", "reason": "no email configuration"}
+        if errors and sent_count == 0:
+            raise Exception(f"All emails failed: {'; '.join(errors)}")
 
-        # Build context for template
-        context = {
-            "ticket": ticket,
-            "requester": ticket.requester,
-            "assigned_to": ticket.assigned_to
+        return {
+            "status": "success",
+            "sent_count": sent_count,
+            "errors": errors if errors else None
         }
 
-        # Add comment if applicable
-        if extra_data and extra_data.get("comment_id"):
-            comment = db.query(TicketComment).filter(
-                TicketComment.id == extra_data["comment_id"]
-            ).first()
-            if comment:
-                context["comment"] = comment
-                context["comment_author"] = comment.user
-
-        # Get site settings for template
-        site_name = get_setting_value(db, "site_name", "Inframate")
-        site_url = get_setting_value(db, "site_url", "http://localhost:3000")
-
-        # Render template
-        html_content, text_content = render_email_template(
-            email_type,
-            context,
-            site_name=site_name,
-            site_url=site_url
+    except Exception as e:
+        db.rollback()
+        log_event(
+            "email_notification_error",
+            email_type=email_type,
+            ticket_id=ticket_id,
+            error=str(e)
         )
+        raise self.retry(exc=e)
+    finally:
+        db.close()
 
-        # Get subject
-        subject = get_email_subject(email_type, ticket.ticket_number, ticket.title)
 
-        # Get previous message ID for threading
-        in_reply_to = None
-        references = None
-        last_sent = db.query(SentEmail).filter(
-            SentEmail.ticket_id == ticket_id
-        ).order_by(SentEmail.created_at.desc()).first()
-
-        if last_sent:
-            in_reply_to = last_sent.message_id
-            references = last_sent.message_id
-
-        # Send to each recipient
-        sender = EmailSender(config)
-        sent_count = 0
-        errors = []
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
+def send_ticket_emails_batch_task(self, notifications: list, attempt: int = 0):
+    """
+    Send many ticket notifications in one task, grouped per email
+    configuration so each group reuses the same SMTP connections.
 
-        for recipient_email in recipients:
-            try:
-                # Send email
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    message_id = loop.run_until_complete(sender.send(
-                        to_email=recipient_email,
-                        subject=subject,
-                        body_html=html_content,
-                        body_text=text_content,
-                        ticket_id=ticket_id,
-                        ticket_number=ticket.ticket_number,
-                        in_reply_to=in_reply_to,
-                        references=references
-                    ))
-                finally:
-                    loop.close()
-
-                # Find recipient user ID
-                recipient_user = db.query(User).filter(User.email == recipient_email).first()
-
-                # Track sent email
-                sent_email = SentEmail(
-                    email_config_id=config.id,
-                    ticket_id=ticket_id,
-                    comment_id=extra_data.get("comment_id") if extra_data else None,
-                    message_id=message_id,
-                    in_reply_to=in_reply_to,
-                    references=references,
-                    recipient_email=recipient_email,
-                    recipient_user_id=recipient_user.id if recipient_user else None,
-                    subject=subject,
-                    body_text=text_content,
-                    body_html=html_content,
-                    email_type=email_type,
-                    status="sent",
-                    sent_at=datetime.now(timezone.utc)
-                )
-                db.add(sent_email)
-                sent_count += 1
+    Use instead of one send_ticket_email_task per ticket for sweeps and
+    bulk updates.
 
-            except Exception as e:
-                errors.append(f"{recipient_email}: {str(e)}")
-                # Track failed email
-                sent_email = SentEmail(
-                    email_config_id=config.id,
-                    ticket_id=ticket_id,
-                    message_id=f"<failed-{uuid.uuid4().hex[:8]}@inframate.local>",
-                    recipient_email=recipient_email,
-                    subject=subject,
-                    body_text=text_content,
-                    email_type=email_type,
-                    status="failed",
-                    error_message=str(e)
-                )
-                db.add(sent_email)
+    Recipients that could not be sent to are queued again in a new batch
+    (up to max_retries times, default_retry_delay apart); the recipients
+    already sent to are not, so a partly failed batch sends no duplicates.
 
+    Args:
+        notifications: List of {"email_type", "ticket_id", "recipients",
+                       "extra_data"} dicts
+        attempt: Retries of these recipients so far
+    """
+    from backend.core.database import SessionLocal
+
+    db: Session = SessionLocal()
+    try:
+        result = _send_ticket_notifications(db, notifications)
         db.commit()
 
+        sent_count, errors = result["sent_count"], result["errors"]
         log_event(
-            "email_notification_sent",
-            email_type=email_type,
-            ticket_id=ticket_id,
+            "email_notification_batch_sent",
+            notification_count=len(notifications),
             sent_count=sent_count,
-            error_count=len(errors)
+            error_count=len(errors),
+            skipped_count=len(result["skipped"]),
+            missing_tickets=result["missing_tickets"] or None
         )
 
-        if errors and sent_count == 0:
-            raise Exception(f"All emails failed: {'; '.join(errors)}")
+        failed = result["failed"]
+        failed_count = sum(len(n["recipients"]) for n in failed)
+        if failed and attempt < self.max_retries:
+            send_ticket_emails_batch_task.apply_async(
+                (failed,), {"attempt": attempt + 1}, countdown=self.default_retry_delay
+            )
+        elif failed:
+            log_event(
+                "email_notification_retries_exhausted",
+                recipient_count=failed_count,
+                errors=errors[:10]
+            )
 
         return {
             "status": "success",
             "sent_count": sent_count,
+            "failed_count": failed_count,
             "errors": errors if errors else None
         }
 
@@ -1945,8 +2715,7 @@ def send_ticket_email_task(
         db.rollback()
         log_event(
             "email_notification_error",
-            email_type=email_type,
-            ticket_id=ticket_id,
+            notification_count=len(notifications),
             error=str(e)
         )
         raise self.retry(exc=e)
@@ -1954,6 +2723,49 @@ def send_ticket_email_task(
         db.close()
 
 
+@celery_app.task(bind=True)
+def flush_ticket_notifications_task(self):
+    """
+    Send buffered ticket notifications whose digest window has passed
+    (see backend.core.email.notification_buffer).
+
+    Queued when the first event of a window is buffered, and every minute
+    by beat as a fallback. Sending is handed to send_ticket_emails_batch_task
+    so failures are retried there.
+    """
+    from backend.core.cache import get_redis_client
+    from backend.core.email.notification_buffer import (
+        DIGEST_FLUSH_SCHEDULED_KEY, next_flush_in, pop_due_notifications, schedule_flush
+    )
+
+    client = get_redis_client()
+    if not client:
+        return {"status": "skipped", "reason": "redis unavailable"}
+
+    try:
+        client.delete(DIGEST_FLUSH_SCHEDULED_KEY)
+        notifications = pop_due_notifications()
+        if notifications:
+            send_ticket_emails_batch_task.delay(notifications)
+
+        # Windows still open: flush again when the earliest one ends
+        remaining = next_flush_in()
+        if remaining is not None:
+            schedule_flush(remaining)
+
+        if notifications:
+            log_event(
+                "email_notifications_flushed",
+                notification_count=len(notifications),
+                recipient_count=sum(len(n["recipients"]) for n in notifications)
+            )
+        return {"status": "success", "notification_count": len(notifications)}
+
+    except Exception as e:
+        log_event("email_notification_flush_error", error=str(e))
+        return {"status": "error", "message": str(e)}
+
+
 @celery_app.task(bind=True)
 def check_sla_warnings_task(self):
     """
@@ -1981,6 +2793,7 @@ def check_sla_warnings_task(self):
         ).all()
 
         warning_count = 0
+        warnings = []
         for ticket in tickets:
             # Calculate elapsed percentage
             if ticket.created_at and ticket.sla_due_date:
@@ -1995,17 +2808,20 @@ def check_sla_warnings_task(self):
                         # Get recipient email
                         recipient = ticket.assigned_to or ticket.requester
                         if recipient and recipient.email:
-                            # Queue email task
-                            send_ticket_email_task.delay(
-                                email_type="sla_warning",
-                                ticket_id=ticket.id,
-                                recipients=[recipient.email]
-                            )
+                            warnings.append({
+                                "email_type": "sla_warning",
+                                "ticket_id": ticket.id,
+                                "recipients": [recipient.email]
+                            })
                             ticket.sla_warning_sent = True
                             warning_count += 1
 
         db.commit()
 
+        # One task sends every warning over shared connections
+        if warnings:
+            send_ticket_emails_batch_task.delay(warnings)
+
         log_event(
             "sla_warnings_checked",
             warning_count=warning_count
@@ -2027,124 +2843,185 @@ def check_sla_warnings_task(self):
         db.close()
 
 
+# Seconds allowed for a Microsoft 365 poll, and the IMAP socket timeout
+# (the poll runs every minute)
+EMAIL_POLL_TIMEOUT = int(os.environ.get("EMAIL_POLL_TIMEOUT", "50"))
+
+
+async def _poll_inboxes(configs: list, timeout: float) -> list:
+    """
+    Fetch new emails from every mailbox concurrently on one event loop.
+
+    IMAP (blocking imaplib) runs in a thread, bounded by its socket timeout:
+    a thread cannot be stopped, and one left running would carry on with
+    the mailbox after the poll gave up on it. A Microsoft 365 fetch is
+    cancelled after ``timeout`` seconds. Fetches change nothing, so an
+    abandoned one loses no mail. Returns, per config, a FetchResult or the
+    exception.
+    """
+    import asyncio
+    from backend.core.email.receiver import EmailReceiver
+    from backend.core.email.microsoft365 import close_graph_connections
+
+    async def poll(config):
+        receiver = EmailReceiver(config, timeout=timeout)
+        if config.provider_type != "microsoft_365":
+            return await asyncio.to_thread(receiver.fetch_imap)
+        try:
+            return await asyncio.wait_for(receiver.fetch_m365(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"mailbox poll timed out after {timeout}s")
+
+    try:
+        return await asyncio.gather(*(poll(config) for config in configs), return_exceptions=True)
+    finally:
+        await close_graph_connections()
+
+
+async def _mark_inboxes_read(fetched: list, timeout: float) -> list:
+    """
+    Mark the messages of each (config, FetchResult) as read, concurrently.
+
+    Returns, per mailbox, None or the exception.
+    """
+    import asyncio
+    from backend.core.email.receiver import EmailReceiver
+    from backend.core.email.microsoft365 import close_graph_connections
+
+    async def mark(config, result):
+        receiver = EmailReceiver(config, timeout=timeout)
+        if config.provider_type != "microsoft_365":
+            return await asyncio.to_thread(
+                receiver.mark_imap_read, result.read_ids, result.sync_state.get("imap_uid_validity")
+            )
+        return await asyncio.wait_for(receiver.mark_m365_read(result.read_ids), timeout)
+
+    try:
+        return await asyncio.gather(*(mark(config, result) for config, result in fetched), return_exceptions=True)
+    finally:
+        await close_graph_connections()
+
+
 @celery_app.task(bind=True)
-def poll_email_inbox_task(self):
+def poll_email_inbox_task(self, config_ids: list = None):
     """
     Poll configured email inboxes for new messages.
     Creates InboundEmail records for processing.
+
+    Polls every active inbound mailbox, or only ``config_ids`` (the IMAP
+    IDLE listener, worker.imap_idle, queues a poll of the one mailbox that
+    received mail).
+
+    All mailboxes are polled concurrently. New emails are stored with one
+    INSERT ... ON CONFLICT (message_id) DO NOTHING, in the transaction that
+    advances each mailbox's sync state (IMAP UID, Microsoft 365 delta
+    link). Only after commit are the messages marked as read and the
+    emails actually inserted queued for processing as one group.
     """
+    from celery import group
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
     from backend.core.database import SessionLocal
     from backend.models import EmailConfiguration, InboundEmail
-    from backend.core.email.receiver import EmailReceiver
     from backend.routers.settings import get_setting_value
     import asyncio
 
-    db: Session = SessionLocal()
+    # Configurations are still read after commit, to mark messages as read
+    db: Session = SessionLocal(expire_on_commit=False)
     try:
         # Check if inbound email is enabled
         if get_setting_value(db, "email_inbound_enabled", "false").lower() != "true":
             return {"status": "skipped", "reason": "inbound email disabled"}
 
         # Get all active inbound configurations
-        configs = db.query(EmailConfiguration).filter(
+        query = db.query(EmailConfiguration).filter(
             EmailConfiguration.is_active == True,
             EmailConfiguration.is_inbound_enabled == True
-        ).all()
+        )
+        if config_ids:
+            query = query.filter(EmailConfiguration.id.in_(config_ids))
+        configs = query.all()
 
         if not configs:
             return {"status": "skipped", "reason": "no inbound configurations"}
 
-        total_fetched = 0
-        errors = []
-
-        for config in configs:
-            try:
-                receiver = EmailReceiver(config)
-
-                # Fetch emails
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    emails = loop.run_until_complete(receiver.fetch_new_emails())
-                finally:
-                    loop.close()
-
-                # Store each email for processing
-                for email_data in emails:
-                    # Check if already processed (by message_id)
-                    existing = db.query(InboundEmail).filter(
-                        InboundEmail.message_id == email_data["message_id"]
-                    ).first()
-
-                    if existing:
-                        continue
-
-                    # Check allowed domains
-                    allowed_domains = get_setting_value(db, "email_inbound_allowed_domains", "")
-                    if allowed_domains:
-                        sender_domain = email_data["from_email"].split("@")[-1].lower()
-                        allowed_list = [d.strip().lower() for d in allowed_domains.split(",") if d.strip()]
-                        if sender_domain not in allowed_list:
-                            # Store as ignored
-                            inbound = InboundEmail(
-                                email_config_id=config.id,
-                                message_id=email_data["message_id"],
-                                in_reply_to=email_data.get("in_reply_to"),
-                                references=email_data.get("references"),
-                                from_email=email_data["from_email"],
-                                from_name=email_data.get("from_name"),
-                                to_email=email_data["to_email"],
-                                subject=email_data["subject"],
-                                body_text=email_data.get("body_text"),
-                                body_html=email_data.get("body_html"),
-                                raw_headers=email_data.get("raw_headers"),
-                                processing_status="ignored",
-                                error_message=f"Sender domain not in allowed list"
-                            )
-                            db.add(inbound)
-                            continue
-
-                    # Create inbound email record
-                    inbound = InboundEmail(
-                        email_config_id=config.id,
-                        message_id=email_data["message_id"],
-                        in_reply_to=email_data.get("in_reply_to"),
-                        references=email_data.get("references"),
-                        from_email=email_data["from_email"],
-                        from_name=email_data.get("from_name"),
-                        to_email=email_data["to_email"],
-                        subject=email_data["subject"],
-                        body_text=email_data.get("body_text"),
-                        body_html=email_data.get("body_html"),
-                        raw_headers=email_data.get("raw_headers"),
-                        processing_status="pending"
-                    )
-                    db.add(inbound)
-                    db.flush()
+        allowed_domains = get_setting_value(db, "email_inbound_allowed_domains", "")
+        allowed_list = {d.strip().lower() for d in allowed_domains.split(",") if d.strip()}
 
-                    # Queue processing task
-                    process_inbound_email_task.delay(inbound.id)
-                    total_fetched += 1
+        results = asyncio.run(_poll_inboxes(configs, EMAIL_POLL_TIMEOUT))
 
-            except Exception as e:
-                errors.append(f"Config {config.id}: {str(e)}")
+        rows = {}
+        errors = []
+        fetched = []
+        for config, result in zip(configs, results):
+            if isinstance(result, BaseException):
+                errors.append(f"Config {config.id}: {str(result)}")
                 log_event(
                     "inbox_poll_error",
                     config_id=config.id,
-                    error=str(e)
+                    error=str(result)
                 )
+                continue
+
+            # Committed together with the emails
+            for column, value in result.sync_state.items():
+                setattr(config, column, value)
+            if result.read_ids:
+                fetched.append((config, result))
+
+            for email_data in result.emails:
+                ignored = bool(allowed_list) and (
+                    email_data["from_email"].split("@")[-1].lower() not in allowed_list
+                )
+                # Same message in several mailboxes: keep the first
+                rows.setdefault(email_data["message_id"], {
+                    "email_config_id": config.id,
+                    "message_id": email_data["message_id"],
+                    "in_reply_to": email_data.get("in_reply_to"),
+                    "references": email_data.get("references"),
+                    "from_email": email_data["from_email"],
+                    "from_name": email_data.get("from_name"),
+                    "to_email": email_data["to_email"],
+                    "subject": email_data["subject"],
+                    "body_text": email_data.get("body_text"),
+                    "body_html": email_data.get("body_html"),
+                    "raw_headers": email_data.get("raw_headers"),
+                    # Senders outside the allowed domains are stored as ignored
+                    "processing_status": "ignored" if ignored else "pending",
+                    "error_message": "Sender domain not in allowed list" if ignored else None,
+                })
+
+        pending_ids = []
+        if rows:
+            inserted = db.execute(
+                pg_insert(InboundEmail)
+                .values(list(rows.values()))
+                .on_conflict_do_nothing(index_elements=[InboundEmail.message_id])
+                .returning(InboundEmail.id, InboundEmail.processing_status)
+            ).all()
+            pending_ids = [row.id for row in inserted if row.processing_status == "pending"]
 
         db.commit()
 
+        if fetched:
+            marked = asyncio.run(_mark_inboxes_read(fetched, EMAIL_POLL_TIMEOUT))
+            for (config, _), error in zip(fetched, marked):
+                if isinstance(error, BaseException):
+                    # The emails are stored and the sync state has moved past
+                    # them; they only stay unread in the mailbox
+                    log_event("inbox_mark_read_error", config_id=config.id, error=str(error))
+
+        if pending_ids:
+            group(process_inbound_email_task.s(inbound_id) for inbound_id in pending_ids).apply_async()
+
         log_event(
             "inbox_poll_completed",
-            total_fetched=total_fetched,
+            total_fetched=len(pending_ids),
             error_count=len(errors)
         )
 
         return {
             "status": "success",
-            "fetched_count": total_fetched,
+            "fetched_count": len(pending_ids),
             "errors": errors if errors else None
         }
 
@@ -2171,6 +3048,8 @@ def process_inbound_email_task(self, inbound_email_id: int):
     from backend.core.database import SessionLocal
     from backend.models import InboundEmail, Ticket, TicketComment, User, Notification
     from backend.core.email.parser import detect_ticket_from_email, EmailParser
+    from backend.core.email.notification_buffer import queue_ticket_email
+    from backend.core.email.thread_index import index_message_ids
     from backend.routers.settings import get_setting_value
 
     db: Session = SessionLocal()
@@ -2242,11 +3121,12 @@ def process_inbound_email_task(self, inbound_email_id: int):
 
                 # Send email notification to requester (if not the sender)
                 if ticket.requester and ticket.requester.email and ticket.requester.email != inbound.from_email:
-                    send_ticket_email_task.delay(
+                    queue_ticket_email(
+                        db,
                         email_type="comment_added",
                         ticket_id=ticket_id,
                         recipients=[ticket.requester.email],
-                        extra_data={"comment_id": comment.id}
+                        comment_id=comment.id
                     )
             else:
                 # Ticket not found or deleted, create new
@@ -2281,13 +3161,17 @@ def process_inbound_email_task(self, inbound_email_id: int):
                 User.is_active == True
             ).all()
 
-            for admin in admins:
-                if admin.email:
-                    send_ticket_email_task.delay(
-                        email_type="ticket_created",
-                        ticket_id=ticket.id,
-                        recipients=[admin.email]
-                    )
+            admin_emails = [admin.email for admin in admins if admin.email]
+            if admin_emails:
+                queue_ticket_email(
+                    db,
+                    email_type="ticket_created",
+                    ticket_id=ticket.id,
+                    recipients=admin_emails
+                )
+
+        # Later replies quoting this email thread to the same ticket
+        index_message_ids(db, {inbound.message_id: result["ticket_id"]}, source="received")
 
         # Update inbound email status
         inbound.processing_status = "processed"